@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from load import free_port, serve, summarize, wait_ready
+
+
+# GET /api/program with If-None-Match (304s) or without (full bodies)
+MODES = ("full", "revalidate")
+
+
+def queries(n: int, seed: int) -> List[str]:
+    # Distinct programs, requests spread over them so most are cache hits
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        s, b, d = (rng.randrange(lo, hi) * 2.5 for lo, hi in ((20, 80), (16, 60), (28, 100)))
+        out.append(f"/api/program?s={s:g}&b={b:g}&d={d:g}&s0=20&b0=20&d0=60")
+    return out
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                   host: str, path: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}", *(f"{k}: {v}" for k, v in headers.items())]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split()[1])
+    response = {k.lower(): v.strip() for k, _, v in (h.partition(":") for h in head[1:] if h)}
+    body = await reader.readexactly(int(response.get("content-length", 0)))
+    return status, response, body
+
+
+async def warm(url: str, paths: List[str], encoding: str) -> None:
+    # Every program requested once, so the levels measure cached responses
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    try:
+        for path in paths:
+            await _request(reader, writer, parts.netloc, path, {"Accept-Encoding": encoding})
+    finally:
+        writer.close()
+
+
+async def client(url: str, paths: List[str], mode: str, encoding: str,
+                 end: float, rng: random.Random) -> Tuple[List[float], int, int]:
+    # One keep-alive connection sending requests back to back
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+    etags: Dict[str, str] = {}
+    latencies: List[float] = []
+    errors = 0
+    received = 0
+    try:
+        while time.perf_counter() < end:
+            path = rng.choice(paths)
+            headers = {"Accept-Encoding": encoding}
+            if mode == "revalidate" and path in etags:
+                headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            status, response, body = await _request(reader, writer, parts.netloc, path, headers)
+            latencies.append(time.perf_counter() - start)
+            received += len(body)
+            if status == 200:
+                etags[path] = response["etag"]
+            elif status != 304:
+                errors += 1
+    finally:
+        writer.close()
+    return latencies, errors, received
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the JSON API of app.py")
+    parser.add_argument("--connections", default="1,10,50",
+                        help="comma separated numbers of concurrent connections, one level each")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per level and mode")
+    parser.add_argument("--programs", type=int, default=100, help="distinct programs requested")
+    parser.add_argument("--encoding", default="gzip", help="Accept-Encoding of the requests")
+    parser.add_argument("--url", default=None, help="test a running app instead of starting one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    levels = [int(n) for n in args.connections.split(",")]
+    paths = queries(args.programs, args.seed)
+
+    with contextlib.ExitStack() as stack:
+        proc = None
+        if args.url is None:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}/"
+            proc = stack.enter_context(serve(port))
+        else:
+            url = args.url.rstrip("/") + "/"
+        wait_ready(url, proc)
+
+        async def load() -> Dict[str, Dict[str, Any]]:
+            await warm(url, paths, args.encoding)
+            results: Dict[str, Dict[str, Any]] = {}
+            print(f"{'mode':>10s} {'conns':>6s} {'req/s':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'KB/req':>7s}")
+            for mode in MODES:
+                for n in levels:
+                    end = time.perf_counter() + args.duration
+                    start = time.perf_counter()
+                    done = await asyncio.gather(*(client(url, paths, mode, args.encoding, end,
+                                                         random.Random(args.seed + i)) for i in range(n)))
+                    wall = time.perf_counter() - start
+                    latencies = [x for d in done for x in d[0]]
+                    received = sum(d[2] for d in done)
+                    results[f"api_{mode}_{n}"] = summarize(latencies)
+                    results[f"api_{mode}_{n}_throughput"] = {
+                        "requests_per_s": len(latencies) / wall,
+                        "errors": sum(d[1] for d in done),
+                        "kb_per_request": received / len(latencies) / 1024,
+                        "wall_s": wall,
+                    }
+                    r = results[f"api_{mode}_{n}"]
+                    print(f"{mode:>10s} {n:6d} {len(latencies) / wall:9.0f} {r['median'] * 1e3:8.2f} "
+                          f"{r['p99'] * 1e3:8.2f} {received / len(latencies) / 1024:7.2f}")
+            return results
+
+        results = asyncio.run(load())
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "connections": levels,
+            "duration": args.duration,
+            "programs": args.programs,
+            "encoding": args.encoding,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sys
+from typing import Any, Callable, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "gym_calculation"))
+# app.py uses paths relative to the repository root
+os.chdir(ROOT)
+
+from htmltools import TagList
+from shiny import reactive
+from shiny.render.transformer import OutputRenderer
+
+import compute
+
+
+DEFAULT_INPUTS = {
+    "gym_phase": "Week 2", "block": 1, "show_plates": False,
+    "rm1_s": 70, "rm1_b": 47.5, "rm1_d": 102.5,
+    "sw_s": 20, "sw_b": 20, "sw_d": 60,
+    "btn_acc": None, "btn_pre": None,
+    "sweep_lift": "squats", "sweep_field": "working", "sweep_week": "0", "sweep_rm": (40, 200),
+    "sweep_inc": ("2.5",), "sweep_prc": "", "sweep_working": "", "sweep_deload": "",
+    "log_week": "1", "log_lift": "squats", "log_sets": 1, "log_reps": 5, "log_weight": 60, "btn_log": None,
+}
+
+
+class _Inputs:
+    # input.<id>() backed by reactive.Values, unknown ids read as None
+    def __init__(self, values: Dict[str, Any]) -> None:
+        object.__setattr__(self, "_values", {k: reactive.Value(v) for k, v in values.items()})
+
+    def __getattr__(self, name: str) -> reactive.Value:
+        if name not in self._values:
+            self._values[name] = reactive.Value(None)
+        return self._values[name]
+
+
+class _Session:
+    user = None
+
+    def __init__(self, input: _Inputs) -> None:
+        self.input = input
+        self.routes: Dict[str, Callable[[Any], Any]] = {}
+
+    def _process_ui(self, ui: Any) -> Dict[str, Any]:
+        return {"deps": [], "html": TagList(ui).get_html_string()}
+
+    def download(self, **kwargs: Any) -> Callable[[Callable], None]:
+        return lambda fn: None
+
+    def on_ended(self, fn: Callable[[], Any]) -> None:
+        pass
+
+    def dynamic_route(self, name: str, handler: Callable[[Any], Any]) -> str:
+        self.routes[name] = handler
+        return f"session/headless/dynamic_route/{name}"
+
+    def send_input_message(self, id: str, message: Dict[str, Any]) -> None:
+        # The browser sends an updated value back as the input's new value
+        if "value" in message:
+            getattr(self.input, id).set(message["value"])
+
+
+class _Outputs:
+    # Like shiny's Outputs: every renderer runs in its own Effect, results and
+    # run counts are kept instead of being sent to a browser
+    def __init__(self, session: _Session) -> None:
+        self.session = session
+        self.renderers: Dict[str, OutputRenderer] = {}
+        self.values: Dict[str, Any] = {}
+        self.runs: Dict[str, int] = {}
+
+    def __call__(self, renderer: Optional[OutputRenderer] = None, **kwargs: Any):
+        def register(renderer: OutputRenderer) -> None:
+            name = kwargs.get("id") or renderer.__name__
+            renderer._set_metadata(self.session, name)
+            self.renderers[name] = renderer
+            self.runs[name] = 0
+
+            @reactive.Effect
+            def _obs():
+                self.runs[name] += 1
+                try:
+                    self.values[name] = renderer()
+                except Exception as e:
+                    self.values[name] = e
+
+        return register(renderer) if renderer is not None else register
+
+
+class HeadlessApp:
+    # Runs app.server() without a browser or websocket. Debouncing is turned
+    # off so one set() + flush is one keystroke.
+
+    def __init__(self, debounce_secs: float = 0, **inputs: Any) -> None:
+        import app
+        app.DEBOUNCE_SECS = debounce_secs
+        self.app = app
+        self.input = _Inputs({**DEFAULT_INPUTS, **inputs})
+        self.output = _Outputs(_Session(self.input))
+        self.app.server(self.input, self.output, self.output.session)
+
+    async def flush(self) -> None:
+        # Background jobs flush again when their result is in
+        await reactive.flush()
+        await compute.drain()
+
+    async def set(self, **values: Any) -> None:
+        for k, v in values.items():
+            getattr(self.input, k).set(v)
+        await self.flush()
+
+    def render(self, name: str) -> Any:
+        # Calls one renderer directly, reactive Calcs it reads stay cached
+        with reactive.isolate():
+            return self.output.renderers[name]()
+
+    def reset_runs(self) -> None:
+        for k in self.output.runs:
+            self.output.runs[k] = 0
+
+
+def run(coro: Callable[[], Any]) -> Any:
+    return asyncio.run(coro())
@@ -0,0 +1,57 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first render / by app.warm_up, never by `import app`
+DEFERRED = ("pandas", "numpy", "weight_engine")
+
+
+def profile(module: str = "app") -> Tuple[float, Dict[str, int]]:
+    # One cold interpreter: seconds to import `module` and the cumulative
+    # microseconds of every module it pulled in
+    env = {**os.environ, "PYTHONPATH": os.path.join(ROOT, "gym_calculation")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules[module] / 1e6, modules
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the import time of app.py against a budget")
+    parser.add_argument("--budget", type=float, default=0.75, help="seconds, median over --repeat runs")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="print the slowest top-level imports")
+    args = parser.parse_args(argv)
+
+    runs = [profile() for _ in range(args.repeat)]
+    seconds = statistics.median(s for s, _ in runs)
+    modules = runs[-1][1]
+
+    failures = []
+    for name in DEFERRED:
+        if name in modules:
+            failures.append(f"{name} is imported at startup")
+    if seconds > args.budget:
+        failures.append(f"import app took {seconds:.3f} s, budget {args.budget:.3f} s")
+
+    print(f"import app: {seconds:.3f} s (median of {args.repeat}, budget {args.budget:.3f} s)")
+    for name, us in sorted(modules.items(), key=lambda kv: -kv[1])[1:args.top + 1]:
+        print(f"  {name:40s} {us / 1e3:8.1f} ms")
+    for f in failures:
+        print(f"FAIL: {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
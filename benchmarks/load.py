@@ -0,0 +1,334 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import websockets
+
+from headless import DEFAULT_INPUTS, ROOT
+
+
+PARAMS = os.path.join(ROOT, "gym_calculation", "params")
+
+# <div id="main1" class="shiny-html-output"> and friends, in the page and in
+# the HTML of rendered UI
+OUTPUT_TAG = re.compile(r'<[^>]*\bclass="[^"]*\bshiny-[a-z-]*output\b[^"]*"[^>]*>')
+TAG_ID = re.compile(r'\bid="([^"]+)"')
+
+LIFTS = {"s": "squats", "b": "bench", "d": "deadlift"}
+
+
+def output_ids(html: str) -> List[str]:
+    ids = []
+    for tag in OUTPUT_TAG.findall(html):
+        m = TAG_ID.search(tag)
+        if m:
+            ids.append(m.group(1))
+    return ids
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    # Resident memory of the server process, Linux only
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(port: int) -> Iterator[subprocess.Popen]:
+    # app.py in its own process, like `shiny run`. Profiles stay in memory so
+    # the load test doesn't write to the working directory.
+    env = {**os.environ, "GYM_PROFILES": ":memory:"}
+    proc = subprocess.Popen([sys.executable, "-m", "shiny", "run", "--port", str(port),
+                             os.path.join("gym_calculation", "app.py")],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def wait_ready(url: str, proc: Optional[subprocess.Popen] = None, timeout: float = 60) -> str:
+    # The page once the server answers
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as r:
+                return r.read().decode()
+        except OSError:
+            if proc is not None and proc.poll() is not None:
+                raise RuntimeError(f"app.py exited with status {proc.returncode}")
+            if time.monotonic() > end:
+                raise
+            time.sleep(0.2)
+
+
+class Session:
+    # One simulated browser tab: sends what shiny.js would send and keeps
+    # every output the server renders visible
+
+    def __init__(self, ws_url: str, outputs: List[str], rng: random.Random, name: str) -> None:
+        self.ws_url = ws_url
+        self.rng = rng
+        self.name = name
+        self.inputs = dict(DEFAULT_INPUTS)
+        self.outputs = set(outputs)
+        self.buttons = {"btn_acc": 0, "btn_pre": 0, "btn_log": 0}
+        self.exercises: Dict[str, Any] = {}
+        for kind in ("acc", "prehab"):
+            with open(os.path.join(PARAMS, f"exercises_{kind}.json"), encoding="utf-8") as f:
+                self.exercises[kind] = json.load(f)
+        self.ws: Any = None
+        self._messages: "asyncio.Queue[Tuple[float, Dict[str, Any]]]" = asyncio.Queue()
+        self._reader: Optional[asyncio.Task] = None
+        # (action, seconds to the first rendered output, seconds to the last)
+        self.latencies: List[Tuple[str, float, float]] = []
+        self.values = 0
+        self.errors = 0
+
+    async def __aenter__(self) -> "Session":
+        self.ws = await websockets.connect(self.ws_url, max_size=None)
+        self._reader = asyncio.ensure_future(self._read())
+        data: Dict[str, Any] = {k: v for k, v in self.inputs.items() if v is not None}
+        data.update({f"{b}:shiny.action": 0 for b in self.buttons})
+        data.update({f".clientdata_output_{o}_hidden": False for o in self.outputs})
+        await self._send("init", data)
+        await self.settle("init", time.perf_counter())
+        await self._send("update", {"profile_id": self.name})
+        await self.settle("profile", time.perf_counter())
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        await self.ws.close()
+
+    async def _send(self, method: str, data: Dict[str, Any]) -> None:
+        await self.ws.send(json.dumps({"method": method, "data": data}))
+
+    async def _read(self) -> None:
+        async for raw in self.ws:
+            await self._messages.put((time.perf_counter(), json.loads(raw)))
+
+    async def settle(self, action: str, start: float, quiet: float = 1.0,
+                     wait_for: Optional[str] = None) -> None:
+        # Reads messages until none with rendered outputs (or `wait_for`) has
+        # come in for `quiet` seconds, i.e. past the debounce and background
+        # computations. Newly rendered outputs are made visible like the
+        # browser would.
+        first = last = None
+        while True:
+            try:
+                t, msg = await asyncio.wait_for(self._messages.get(), quiet)
+            except asyncio.TimeoutError:
+                break
+            hit = wait_for is not None and wait_for in msg
+            values = msg.get("values") or {}
+            if msg.get("errors"):
+                self.errors += len(msg["errors"])
+            new = []
+            for v in values.values():
+                if isinstance(v, dict) and isinstance(v.get("html"), str):
+                    new += [o for o in output_ids(v["html"]) if o not in self.outputs]
+            if new:
+                self.outputs.update(new)
+                await self._send("update", {f".clientdata_output_{o}_hidden": False for o in new})
+            if values or hit:
+                self.values += len(values)
+                first = t if first is None else first
+                last = t
+        if first is not None:
+            self.latencies.append((action, first - start, last - start))
+
+    async def type_number(self, key: str, value: float) -> None:
+        # One update per keystroke, as the numeric input sends them
+        text = f"{value:g}"
+        start = 0.0
+        for i in range(1, len(text) + 1):
+            if text[:i].endswith("."):
+                continue
+            start = time.perf_counter()
+            await self._send("update", {key: float(text[:i])})
+            await asyncio.sleep(self.rng.uniform(0.05, 0.2))
+        self.inputs[key] = value
+        await self.settle(f"type_{key[:-2]}", start)
+
+    async def open_modal(self, button: str, select: str, options: List[str], multiple: bool) -> None:
+        self.buttons[button] += 1
+        start = time.perf_counter()
+        await self._send("update", {f"{button}:shiny.action": self.buttons[button]})
+        await self.settle(f"modal_{button[4:]}", start, wait_for="modal")
+        picked = self.rng.sample(options, 2) if multiple else self.rng.choice(options)
+        start = time.perf_counter()
+        await self._send("update", {select: picked})
+        await self.settle(f"select_{button[4:]}", start)
+
+    async def step(self) -> None:
+        r = self.rng.random()
+        if r < 0.35:
+            phases = [p for p in ("Week 1", "Week 2", "Week 3", "Week 4") if p != self.inputs["gym_phase"]]
+            self.inputs["gym_phase"] = self.rng.choice(phases)
+            start = time.perf_counter()
+            await self._send("update", {"gym_phase": self.inputs["gym_phase"]})
+            await self.settle("phase", start)
+        elif r < 0.6:
+            k = self.rng.choice("sbd")
+            await self.type_number(f"rm1_{k}", self.rng.randrange(16, 80) * 2.5)
+        elif r < 0.75:
+            k = self.rng.choice("sbd")
+            await self.type_number(f"sw_{k}", self.rng.choice((20, 30, 40, 50, 60)))
+        elif r < 0.9:
+            k = self.rng.choice("sbd")
+            await self.open_modal("btn_acc", f"acc_{k}", self.exercises["acc"][LIFTS[k]], False)
+        else:
+            k = self.rng.choice("sbd")
+            await self.open_modal("btn_pre", f"pre_{k}", self.exercises["prehab"][LIFTS[k]], True)
+
+
+async def run_level(ws_url: str, outputs: List[str], n: int, duration: float, think: float,
+                    ramp: float, seed: int) -> Tuple[List[Session], float]:
+    sessions: List[Session] = []
+
+    async def user(i: int) -> None:
+        await asyncio.sleep(ramp * i / n)
+        rng = random.Random(seed * 100_003 + i)
+        s = Session(ws_url, outputs, rng, f"load-{n}-{i}")
+        sessions.append(s)
+        end = time.perf_counter() + duration
+        async with s:
+            while time.perf_counter() < end:
+                await s.step()
+                await asyncio.sleep(rng.expovariate(1 / think))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(n)))
+    return sessions, time.perf_counter() - start
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    # run.py's entries (median, min, number, repeat) plus the tail
+    x = np.asarray(seconds)
+    return {"median": float(np.median(x)), "min": float(x.min()), "number": 1, "repeat": len(x),
+            "p90": float(np.percentile(x, 90)), "p99": float(np.percentile(x, 99)), "max": float(x.max())}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test app.py with simulated concurrent sessions")
+    parser.add_argument("--sessions", default="1,5,10,25",
+                        help="comma separated numbers of concurrent sessions, one level each")
+    parser.add_argument("--duration", type=float, default=20, help="seconds every session keeps going per level")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a session's actions")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which a level's sessions connect")
+    parser.add_argument("--url", default=None, help="test a running app instead of starting one (no RSS then)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    levels = [int(n) for n in args.sessions.split(",")]
+
+    with contextlib.ExitStack() as stack:
+        proc = None
+        pid = None
+        if args.url is None:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}/"
+            proc = stack.enter_context(serve(port))
+            pid = proc.pid
+        else:
+            url = args.url.rstrip("/") + "/"
+        page = wait_ready(url, proc)
+        ws_url = "ws" + url[len("http"):] + "websocket/"
+        outputs = output_ids(page)
+
+        async def load() -> Dict[str, Dict[str, Any]]:
+            # One session first, so warm-up and first-use imports aren't
+            # counted against any level
+            async with Session(ws_url, outputs, random.Random(args.seed), "load-warm-up") as s:
+                await s.step()
+            await asyncio.sleep(1)
+            base = rss_mb(pid) if pid else None
+            results: Dict[str, Dict[str, Any]] = {}
+            if base is not None:
+                results["load_rss_idle"] = {"rss_mb": base}
+            print(f"{'sessions':>8s} {'actions/s':>10s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s} "
+                  f"{'RSS MB':>8s} {'MB/session':>10s}")
+            for n in levels:
+                sessions, wall = await run_level(ws_url, outputs, n, args.duration, args.think,
+                                                 args.ramp, args.seed)
+                rss = rss_mb(pid) if pid else None
+                by_action: Dict[str, List[float]] = {}
+                settled = []
+                for s in sessions:
+                    for action, first, last in s.latencies:
+                        if action in ("init", "profile"):
+                            continue
+                        by_action.setdefault(action, []).append(last)
+                        by_action.setdefault("first_output", []).append(first)
+                        settled.append(last)
+                if not settled:
+                    continue
+                for action, seconds in sorted(by_action.items()):
+                    results[f"load_{n}_{action}"] = summarize(seconds)
+                results[f"load_{n}_settled"] = overall = summarize(settled)
+                results[f"load_{n}_throughput"] = {
+                    "actions_per_s": len(settled) / wall,
+                    "outputs_per_s": sum(s.values for s in sessions) / wall,
+                    "errors": sum(s.errors for s in sessions),
+                    "wall_s": wall,
+                }
+                if rss is not None:
+                    results[f"load_{n}_rss"] = {"rss_mb": rss, "per_session_mb": (rss - base) / n}
+                print(f"{n:8d} {len(settled) / wall:10.2f} {overall['median'] * 1e3:8.1f} "
+                      f"{overall['p90'] * 1e3:8.1f} {overall['p99'] * 1e3:8.1f} "
+                      f"{rss if rss is not None else float('nan'):8.1f} "
+                      f"{(rss - base) / n if rss is not None else float('nan'):10.2f}")
+            return results
+
+        results = asyncio.run(load())
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "sessions": levels,
+            "duration": args.duration,
+            "think": args.think,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from headless import ROOT, HeadlessApp
+
+from config import load_model
+from create_schedule import ExerciseBucket, MonthlySchedule
+from gym_schedule import GymSchedule
+from one_rep_max import brzycki, epley, estimate, estimate_many
+from sweep import SweepVariant, compute_sweep
+from weight_calc import WeightCalc, WeightManager
+
+
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+PARAMS = os.path.join(ROOT, "gym_calculation", "params")
+
+
+def timeit(fn: Callable[[], object], repeat: int = 7, min_time: float = 0.05) -> Dict[str, float]:
+    # Seconds per call: the number of calls per round is scaled so a round
+    # takes at least min_time, the median over the rounds is the result
+    fn()
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t >= min_time or number >= 1_000_000:
+            break
+        number *= 2
+
+    rounds = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - t) / number)
+    return {"median": statistics.median(rounds), "min": min(rounds), "number": number, "repeat": repeat}
+
+
+def _calibration() -> None:
+    # Fixed pure Python + NumPy work, used to factor out how fast the machine
+    # happens to be during a run
+    sum(i * i for i in range(2_000))
+    np.sort(np.arange(20_000)[::-1])
+
+
+def bench_calculation() -> Dict[str, Dict[str, float]]:
+    wm = load_model(os.path.join(PARAMS, "weight_manager.json"), WeightManager)
+    acc = load_model(os.path.join(PARAMS, "exercises_acc.json"), ExerciseBucket)
+    pre = load_model(os.path.join(PARAMS, "exercises_prehab.json"), ExerciseBucket)
+    wc = WeightCalc(wm, s=70, b=47.5, d=102.5, s0=20, b0=20, d0=60)
+    weights = np.random.default_rng(0).uniform(20, 200, 1_000_000)
+    reps = np.random.default_rng(1).integers(1, 12, 1_000_000)
+
+    # 4 variants x 3 weight increases x 3 lifts x 281 1RMs, ~10k grid points
+    variants = [SweepVariant(name=f"v{i}", prc_working=[0.75 + i / 100, 0.8, 0.85]) for i in range(3)]
+    sweep_grid = {lift: (20, 720) for lift in ("squats", "bench", "deadlift")}
+
+    def schedule(part: str) -> Callable[[], object]:
+        # Templates are cached per MonthlySchedule, a new one measures the build
+        return lambda: getattr(MonthlySchedule(acc, pre), part)()
+
+    return {
+        "weight_calc_init": timeit(lambda: WeightCalc(wm, s=70, b=47.5, d=102.5, s0=20, b0=20, d0=60)),
+        "round_set": timeit(lambda: wc._round_set(71.3)),
+        "get_warmup_weights": timeit(lambda: wc._get_warmup_weights("squats", 72.5, 4)),
+        "schedule_main_part": timeit(schedule("main_part")),
+        "schedule_secondary_part": timeit(schedule("secondary_part")),
+        "schedule_sessions_week_four": timeit(schedule("sessions_week_four")),
+        "generate_sets": timeit(lambda: GymSchedule.generate_sets(3, 3, 1, 8)),
+        "epley_scalar": timeit(lambda: epley(100, 5)),
+        "brzycki_scalar": timeit(lambda: brzycki(100, 5)),
+        "estimate_epley_1m": timeit(lambda: estimate(weights, reps, "epley"), repeat=3),
+        "estimate_many_median_1m": timeit(lambda: estimate_many(weights, reps), repeat=3),
+        "sweep_10k": timeit(lambda: compute_sweep(wm, sweep_grid, 2.5, variants, (1.25, 2.5, 5))),
+    }
+
+
+def bench_render() -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    async def main():
+        headless = HeadlessApp()
+        await headless.flush()
+        for phase in ("Week 2", "Week 4"):
+            await headless.set(gym_phase=phase)
+            suffix = "deload" if phase == "Week 4" else "week"
+            for name in headless.output.renderers:
+                results[f"render_{name}_{suffix}"] = timeit(lambda: headless.render(name), repeat=5)
+
+        # The per-keystroke path: new input value -> reactive graph -> every
+        # output that depends on it re-rendered
+        await headless.set(gym_phase="Week 2")
+        values = iter(np.arange(40, 1_000_000, 0.5))
+        times = []
+        for _ in range(200):
+            t = time.perf_counter()
+            await headless.set(rm1_b=float(next(values)))
+            times.append(time.perf_counter() - t)
+        results["keystroke_rm1_b"] = {"median": statistics.median(times), "min": min(times),
+                                      "number": 1, "repeat": len(times)}
+
+    asyncio.run(main())
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    # The fastest round is the least affected by other load on the machine,
+    # and the calibration run scales for a machine that is slower overall
+    scale = 1.0
+    if "calibration" in results and "calibration" in baseline:
+        scale = results["calibration"]["min"] / baseline["calibration"]["min"]
+        print(f"calibration: x{scale:.2f} of the baseline machine speed")
+
+    regressions = []
+    for name, r in sorted(results.items()):
+        if name not in baseline or name == "calibration":
+            continue
+        ratio = r["min"] / baseline[name]["min"] / scale
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:45s} {r['min'] * 1e6:12.2f} us  x{ratio:5.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the calculation and render hot paths")
+    parser.add_argument("--output", default=None, help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=2.0,
+                        help="fail when a benchmark is this many times slower than the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--only", choices=["calculation", "render"], default=None)
+    args = parser.parse_args(argv)
+
+    results = {"calibration": timeit(_calibration)}
+    if args.only in (None, "calculation"):
+        results.update(bench_calculation())
+    if args.only in (None, "render"):
+        results.update(bench_render())
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline first")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than x{args.threshold} of the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from create_schedule import LIFT_NAMES, MonthlySchedule
+from log_ingest import EXERCISE_ALIASES
+from weight_engine import ProgramArrays
+
+
+# Lift of the per-week rows that sum up all lifts
+TOTAL = "Total"
+DELOAD_WEEK = 4
+
+
+class LoadSet(NamedTuple):
+    # `sets` x `reps` at `weight`, one_rm is the lift's 1RM (None if unknown)
+    week: Hashable
+    lift: str
+    sets: int
+    reps: int
+    weight: float
+    one_rm: Optional[float] = None
+
+
+@dataclass
+class LoadSums:
+    tonnage: float = 0.0
+    volume: int = 0
+    # Sum of weight / 1RM per rep, over the `rated` reps with a known 1RM
+    intensity: float = 0.0
+    rated: int = 0
+
+    @classmethod
+    def of(cls, s: LoadSet) -> "LoadSums":
+        volume = s.sets * s.reps
+        rated = s.one_rm is not None and s.one_rm > 0
+        return cls(volume * s.weight, volume,
+                   volume * s.weight / s.one_rm if rated else 0.0, volume if rated else 0)
+
+    def add(self, other: "LoadSums", sign: int = 1) -> None:
+        self.tonnage += sign * other.tonnage
+        self.volume += sign * other.volume
+        self.intensity += sign * other.intensity
+        self.rated += sign * other.rated
+
+    @property
+    def avg_intensity(self) -> Optional[float]:
+        # Average % of 1RM per rep
+        return 100 * self.intensity / self.rated if self.rated else None
+
+
+class LoadRollup:
+    # Tonnage, volume and intensity per (source, week, lift) and per
+    # (source, week), kept up to date set by set. Adding or removing a set
+    # touches two sums, replacing a plan only applies the sets that differ
+    # from the previous one. Reads never go over the sets themselves.
+
+    def __init__(self) -> None:
+        self._sums: Dict[Tuple[str, Hashable, str], LoadSums] = {}
+        # (source, key) -> sets of the plan last given to replace_plan
+        self._plans: Dict[Tuple[str, Hashable], Counter] = {}
+        # Bumped on every change
+        self.version = 0
+
+    def _apply(self, source: str, week: Hashable, lift: str, sums: LoadSums, sign: int) -> None:
+        for key in ((source, week, lift), (source, week, TOTAL)):
+            self._sums.setdefault(key, LoadSums()).add(sums, sign)
+        self.version += 1
+
+    def add(self, source: str, s: LoadSet, sign: int = 1) -> None:
+        self._apply(source, s.week, s.lift, LoadSums.of(s), sign)
+
+    def remove(self, source: str, s: LoadSet) -> None:
+        self.add(source, s, -1)
+
+    def add_sets(self, source: str, sets: Iterable[LoadSet]) -> None:
+        for s in sets:
+            self.add(source, s)
+
+    def replace_plan(self, source: str, key: Hashable, sets: Iterable[LoadSet]) -> bool:
+        # The sets planned under `key` (e.g. a lift) are now `sets`, returns
+        # whether anything changed
+        new = Counter(sets)
+        old = self._plans.get((source, key), Counter())
+        removed, added = old - new, new - old
+        for s, n in removed.items():
+            for _ in range(n):
+                self.remove(source, s)
+        for s, n in added.items():
+            for _ in range(n):
+                self.add(source, s)
+        self._plans[(source, key)] = new
+        return bool(removed or added)
+
+    def add_log(self, chunk: pd.DataFrame, one_rm: Optional[Mapping[str, float]] = None) -> int:
+        # A chunk of log_ingest.read_log (one row per set, an optional "sets"
+        # column) under source = lifter and week = the Monday of the date.
+        # one_rm: lift key -> 1RM for the intensity. The chunk is summed up
+        # first, so this is one update per lifter, week and lift.
+        lift = chunk["exercise"].astype(str).str.strip().str.lower().map(EXERCISE_ALIASES)
+        date = pd.to_datetime(chunk["date"], errors="coerce")
+        sets = pd.to_numeric(chunk["sets"], errors="coerce") if "sets" in chunk else 1
+        df = pd.DataFrame({
+            "lifter": chunk["lifter"].astype(str),
+            "lift": lift,
+            "week": (date - pd.to_timedelta(date.dt.weekday, unit="D")).dt.date.astype(str),
+            "weight": pd.to_numeric(chunk["weight"], errors="coerce"),
+            "volume": sets * pd.to_numeric(chunk["reps"], errors="coerce"),
+        }).dropna()
+        if df.empty:
+            return 0
+        df["tonnage"] = df["volume"] * df["weight"]
+        rm = df["lift"].map(dict(one_rm or {})).where(lambda x: x > 0)
+        df["intensity"] = (df["tonnage"] / rm).fillna(0.0)
+        df["rated"] = df["volume"].where(rm.notna(), 0)
+        sums = df.groupby(["lifter", "week", "lift"], sort=False)[["tonnage", "volume", "intensity", "rated"]].sum()
+        for (lifter, week, key), row in sums.iterrows():
+            self._apply(lifter, week, LIFT_NAMES[key],
+                        LoadSums(row.tonnage, int(row.volume), row.intensity, int(row.rated)), 1)
+        return len(df)
+
+    def get(self, source: str, week: Hashable, lift: str = TOTAL) -> LoadSums:
+        return self._sums.get((source, week, lift), LoadSums())
+
+    def sources(self) -> List[str]:
+        return sorted({source for source, _, _ in self._sums})
+
+    def to_frame(self, source: str) -> pd.DataFrame:
+        # One row per week and lift, the week's total after its lifts
+        rows = sorted(((week, lift == TOTAL, lift, s) for (src, week, lift), s in self._sums.items()
+                       if src == source and s.volume), key=lambda r: r[:3])
+        return pd.DataFrame(
+            [(week, lift, s.tonnage, s.volume, s.avg_intensity) for week, _, lift, s in rows],
+            columns=["week", "lift", "tonnage", "volume", "intensity"]
+        )
+
+
+def plan_sets(gym: MonthlySchedule, lift: str, program: ProgramArrays,
+              one_rm: Optional[float] = None) -> List[LoadSet]:
+    # Every set of the month that trains `lift` (key of LIFT_NAMES), with its
+    # weight from the lift's program (program_cache.cached_lift_program):
+    # the main sets of its session, the secondary sets of the session it's
+    # the secondary lift of and its deload sets
+    name = LIFT_NAMES[lift]
+    out = []
+    for w, (main, sec) in enumerate(zip(gym.main_part(), gym.secondary_part())):
+        for i, m in enumerate(gym.main_lifts):
+            if m == lift:
+                out += [LoadSet(w + 1, name, r.sets, r.reps, float(x), one_rm)
+                        for r, x in zip(main[i], program.main[w])]
+            if gym.secondary_lifts[m] == lift:
+                out += [LoadSet(w + 1, name, r.sets, r.reps, float(x), one_rm)
+                        for r, x in zip(sec[i], program.sec[w])]
+    deload = [r for r in gym.sessions_week_four()[0] if r.lift == name]
+    out += [LoadSet(DELOAD_WEEK, name, r.sets, r.reps, float(x), one_rm)
+            for r, x in zip(deload, program.deload)]
+    return out
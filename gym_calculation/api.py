@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import json
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route, Router
+
+from config import load_model, model_hash
+from create_schedule import MonthlySchedule
+from gym_schedule import SetTable
+from program_cache import ProgramCache, cached_lift_program
+from weight_calc import WeightManager
+
+
+# Bumped when the JSON layout changes, it's part of every ETag
+VERSION = 1
+# Content codings in order of preference when the client accepts several
+# equally
+CODINGS = ("gzip", "deflate", "identity")
+
+_LIFT_ARGS = {"squats": ("s", "s0"), "bench": ("b", "b0"), "deadlift": ("d", "d0")}
+
+
+class ProgramQuery(BaseModel):
+    # 1RMs and starting weights in kg, the block of the macrocycle (1-based)
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    s: float = Field(gt=0)
+    b: float = Field(gt=0)
+    d: float = Field(gt=0)
+    s0: float = Field(ge=0)
+    b0: float = Field(ge=0)
+    d0: float = Field(ge=0)
+    block: int = Field(1, ge=1)
+
+    def key(self) -> Tuple:
+        return (self.s, self.b, self.d, self.s0, self.b0, self.d0, self.block)
+
+
+@dataclass(eq=False)
+class Encoded:
+    # One serialized program, each content coding compressed on first use
+    etag: str
+    body: bytes
+    _codings: Dict[str, bytes] = field(default_factory=dict)
+
+    def encode(self, coding: str) -> bytes:
+        if coding == "identity":
+            return self.body
+        data = self._codings.get(coding)
+        if data is None:
+            # mtime=0 keeps the bytes (and so the ETag) the same across runs
+            data = gzip.compress(self.body, mtime=0) if coding == "gzip" else zlib.compress(self.body)
+            self._codings[coding] = data
+        return data
+
+    def etag_for(self, coding: str) -> str:
+        # Strong ETags must differ between codings of the same content
+        return f'"{self.etag}"' if coding == "identity" else f'"{self.etag}-{coding}"'
+
+
+def negotiate(accept_encoding: Optional[str]) -> str:
+    # Picks from CODINGS by the q-values of Accept-Encoding, identity if
+    # nothing else is acceptable
+    if not accept_encoding:
+        return "identity"
+    q: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        value = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                value = float(params[2:])
+            except ValueError:
+                value = 0.0
+        q[name.strip().lower()] = value
+    default = q.get("*")
+    scores = {c: q.get(c, default if default is not None else (1.0 if c == "identity" else 0.0))
+              for c in CODINGS}
+    best = max(CODINGS, key=lambda c: scores[c])
+    return best if scores[best] > 0 else "identity"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match calls for
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ProgramApi:
+    # GET /program?s=&b=&d=&s0=&b0=&d0=[&block=] -> the four-week program as
+    # JSON, served from a cache of serialized responses. The ETag is a hash of
+    # the query and the weight manager's config, a matching If-None-Match
+    # gets a 304 without a body.
+
+    def __init__(self, gym: MonthlySchedule, path_weight_manager: str,
+                 week_names: Mapping[int, str], session_names: Mapping[int, str],
+                 deload_names: Mapping[int, str], maxsize: int = 1024) -> None:
+        self.gym = gym
+        self.path_weight_manager = path_weight_manager
+        self.week_names = week_names
+        self.session_names = session_names
+        self.deload_names = deload_names
+        self.responses = ProgramCache(maxsize=maxsize)
+        self._wm: Optional[WeightManager] = None
+        self._wm_hash = ""
+        self.router = Router(routes=[Route("/program", self.program, methods=["GET"])])
+
+    def _config(self) -> Tuple[WeightManager, str]:
+        # load_model returns the same object until the file changes, so the
+        # hash is only computed again after a change
+        wm = load_model(self.path_weight_manager, WeightManager)
+        if wm is not self._wm:
+            self._wm, self._wm_hash = wm, model_hash(wm)
+        return wm, self._wm_hash
+
+    def _sets(self, table: SetTable, weights: Sequence[Optional[float]]) -> List[Dict[str, Any]]:
+        return [{"lift": r.lift, "sets": r.sets, "reps": r.reps,
+                 "weight": None if w is None else float(w)}
+                for r, w in zip(table, list(weights) + [None] * (len(table) - len(weights)))]
+
+    def build(self, query: ProgramQuery, wm: WeightManager, config: str) -> Encoded:
+        from macrocycle import project
+
+        gym = self.gym
+        one_rm, programs = {}, {}
+        for lift, (rm, start) in _LIFT_ARGS.items():
+            one_rm[lift] = project(getattr(query, rm), query.block - 1, wm).item()
+            programs[lift] = cached_lift_program(wm, lift, one_rm[lift], getattr(query, start),
+                                                 warmup_sets=(gym.sets_main - 1),
+                                                 warmup_sets_sec=(gym.sets_sec - 1))
+        weeks = []
+        for w, (main, sec) in enumerate(zip(gym.main_part(), gym.secondary_part())):
+            weeks.append({"week": w + 1, "name": self.week_names[w], "sessions": [
+                {"name": self.session_names[i],
+                 "main": self._sets(main[i], programs[lift].main[w]),
+                 "secondary": self._sets(sec[i], programs[gym.secondary_lifts[lift]].sec[w])}
+                for i, lift in enumerate(gym.main_lifts)
+            ]})
+        deload = [x for lift in gym.main_lifts for x in programs[lift].deload]
+        weeks.append({"week": 4, "name": self.week_names[3], "sessions": [
+            {"name": self.deload_names[i], "main": self._sets(table, deload if i == 0 else [])}
+            for i, table in enumerate(gym.sessions_week_four())
+        ]})
+        doc = {
+            "block": query.block,
+            "one_rm": one_rm,
+            "starting_weight": {lift: getattr(query, start) for lift, (_, start) in _LIFT_ARGS.items()},
+            "config": config,
+            "weeks": weeks,
+        }
+        etag = hashlib.sha256(json.dumps([VERSION, query.key(), config]).encode("utf-8")).hexdigest()[:32]
+        return Encoded(etag, json.dumps(doc, separators=(",", ":")).encode("utf-8"))
+
+    def get(self, query: ProgramQuery) -> Encoded:
+        wm, config = self._config()
+        return self.responses.get_or_create((query.key(), config), lambda: self.build(query, wm, config))
+
+    async def program(self, request: Request) -> Response:
+        try:
+            query = ProgramQuery(**request.query_params)
+        except ValidationError as e:
+            return JSONResponse({"detail": e.errors(include_url=False, include_context=False)}, status_code=400)
+        from macrocycle import MAX_BLOCKS
+
+        if query.block > MAX_BLOCKS:
+            return JSONResponse({"detail": f"block must be at most {MAX_BLOCKS}"}, status_code=400)
+        wm, config = self._config()
+        key = (query.key(), config)
+        entry = self.responses.peek(key)
+        if entry is None:
+            # A miss computes the programs, off the event loop
+            entry = self.responses.put(key, await run_in_threadpool(self.build, query, wm, config))
+
+        coding = negotiate(request.headers.get("accept-encoding"))
+        etag = entry.etag_for(coding)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        inm = request.headers.get("if-none-match")
+        if inm is not None and _matches(inm, etag):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(entry.encode(coding), media_type="application/json", headers=headers)
@@ -1,20 +1,49 @@
-from typing import Dict, List, Union
+import contextlib
+import functools
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 from htmltools import Tag
 
-import pandas as pd
 from pydantic import BaseModel
-from shiny import App, render, ui, reactive
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+from shiny import App, render, ui, reactive, req
+from shiny.types import SafeException
 import shinyswatch
 
-from create_schedule import MonthlySchedule
-from weight_calc import WeightCalc
+from api import ProgramApi
+from catalog import ExerciseCatalog, ExerciseIndex, serve_search
+from compute import SessionCompute
+from config import load_model
+from create_schedule import DELOAD_TITLES, LIFT_NAMES, SESSION_TITLES, WEEK_TITLES, ExerciseBucket, MonthlySchedule
+from gym_schedule import SetTable
+import instrumentation
+import profiles
+from plates import PlateInventory, plate_column, plate_table
+from program_cache import cached_lift_program, cached_weight_calc
+from reactive_utils import debounce
+from table_cache import prerender, render_html, selection_html, set_table_html, table_html
+from weight_calc import WeightCalc, WeightManager
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 START = 1
+DEBOUNCE_SECS = 0.4
+
+# Initial values of the numeric inputs
+DEFAULTS = {
+    "block": 1,
+    "sw_s": 20, "sw_b": 20, "sw_d": 60,
+    "rm1_s": 70, "rm1_b": 47.5, "rm1_d": 102.5,
+}
 
 
 class AppHelper(BaseModel):
     css_path: str
+    js_path: str
     id2week: Dict[int, str]
     headers_week: Dict[int, str]
     headers_sessions: Dict[int, str]
@@ -22,110 +51,205 @@ class AppHelper(BaseModel):
     path_weight_manager: str
     path_exercises_acc: str
     path_exercises_prehab: str
+    path_exercise_tags: str
+    path_plates: str
 
 
 a = {
     "css_path": "gym_calculation/params/style.css",
+    "js_path": "gym_calculation/params/profile.js",
     "id2week": {0: "Week 1", 1: "Week 2", 2: "Week 3", 3: "Week 4"},
-    "headers_week": {0: "Week 1: Accumulation", 1: "Week 2: Intensification", 2: "Week 3: Peaking", 3: "Week 4: Deload"},
-    "headers_sessions": {0: "Squats session", 1: "Bench session", 2: "Deadlift session"},
-    "headers_deload": {0: "Full body session", 1: "Upper body session", 2: "Lower Body Session"},
+    "headers_week": dict(enumerate(WEEK_TITLES)),
+    "headers_sessions": dict(enumerate(SESSION_TITLES)),
+    "headers_deload": dict(enumerate(DELOAD_TITLES)),
     "path_weight_manager": "gym_calculation/params/weight_manager.json",
     "path_exercises_acc": "gym_calculation/params/exercises_acc.json",
-    "path_exercises_prehab": "gym_calculation/params/exercises_prehab.json"
+    "path_exercises_prehab": "gym_calculation/params/exercises_prehab.json",
+    "path_exercise_tags": "gym_calculation/params/exercise_tags.json",
+    "path_plates": "gym_calculation/params/plates.json"
 }
 
 
 app_helper = AppHelper(**a)
 
 
-gym = MonthlySchedule(app_helper.path_exercises_acc,
-                      app_helper.path_exercises_prehab)
+gym = MonthlySchedule(load_model(app_helper.path_exercises_acc, ExerciseBucket),
+                      load_model(app_helper.path_exercises_prehab, ExerciseBucket))
 
 
-phases = {
-    "Week 1": (gym.main_part()[0], gym.secondary_part()[0]),
-    "Week 2": (gym.main_part()[1], gym.secondary_part()[1]),
-    "Week 3": (gym.main_part()[2], gym.secondary_part()[2]),
-    "Week 4": (gym.sessions_week_four)
-}
+def phase_tables(phase: str):
+    # Read-only templates shared by all sessions, built on first use
+    if phase == app_helper.id2week[3]:
+        return gym.sessions_week_four()
+    week = {v: k for k, v in app_helper.id2week.items()}[phase]
+    return gym.main_part()[week], gym.secondary_part()[week]
+
+
+@functools.lru_cache(maxsize=None)
+def exercise_index(bucket: str, lift: str) -> ExerciseIndex:
+    # bucket: "accessory" or "prehab"
+    return ExerciseIndex(getattr(getattr(gym, bucket), lift),
+                         load_model(app_helper.path_exercise_tags, ExerciseCatalog))
+
 
 def setup_weigth_calc(s: Union[float, int], b: Union[float, int], d: Union[float, int],
                       s0: Union[float, int], b0: Union[float, int], d0: Union[float, int]) -> WeightCalc:
-    return WeightCalc(
+    return cached_weight_calc(
         s=s, b=b, d=d,
         s0=s0, b0=b0, d0=d0,
-        weight_manager=app_helper.path_weight_manager,
+        weight_manager=load_model(app_helper.path_weight_manager, WeightManager),
         warmup_sets=(gym.sets_main - 1),
         warmup_sets_sec=(gym.sets_sec - 1)
     )
 
 
-app_ui = ui.page_fluid(
-    shinyswatch.theme.minty(),
-    ui.include_css(app_helper.css_path),
-    ui.markdown("<br>"),
-    ui.row(
+def parse_floats(text: Optional[str]) -> Optional[List[float]]:
+    # "0.7, 0.8 0.9" -> [0.7, 0.8, 0.9], None when empty
+    return [float(x) for x in (text or "").replace(",", " ").split()] or None
+
+
+def what_if_panel() -> Tag:
+    # Prescribed weights over a range of 1RMs, for the percentages of
+    # weight_manager.json next to edited ones (see sweep.py)
+    from sweep import FIELDS
+
+    return ui.row(
         ui.column(
-            6,
-            ui.h1("Sara's Workout Schedule"),
+            3,
+            ui.markdown("<br>"),
+            ui.input_select("sweep_lift", "Lift", LIFT_NAMES),
+            ui.input_select("sweep_field", "Weights", FIELDS, selected="working"),
+            ui.input_select("sweep_week", "Week",
+                            {"0": "All weeks", "1": "Week 1", "2": "Week 2", "3": "Week 3"}),
+            ui.input_slider("sweep_rm", "1RM", min=20, max=300, value=(40, 200), step=2.5),
+            ui.input_checkbox_group("sweep_inc", "Weight increase", ["1.25", "2.5", "5"],
+                                    selected=["2.5"], inline=True),
+            ui.h5("Try other percentages:"),
+            ui.input_text("sweep_prc", "Percentages of the lift", placeholder="e.g. 0.7, 0.8, 0.9"),
+            ui.input_text("sweep_working", "Working sets", placeholder="e.g. 0.8, 0.85, 0.9"),
+            ui.input_text("sweep_deload", "Deload", placeholder="e.g. 0.6"),
         ),
+        ui.column(9, ui.markdown("<br>"), ui.output_table("sweep_table")),
+    )
+
+
+def analytics_panel() -> Tag:
+    # Training load of this month's plan next to the sets logged here, see
+    # analytics.py
+    return ui.row(
         ui.column(
-            6,
-            ui.popover(
-                ui.input_action_button("btn", "Info", class_="btn-primary"),
-                "I'm not a professional trainer and this is not a recommendation. "
-                "This is just for my own personal use.",
-                id="btn_popover",
-            ),
-            align="right")),
-    ui.markdown("<br>"),
-    ui.layout_sidebar(
-        ui.sidebar(
-            ui.h5("Select the current phase:"),
-            ui.input_select("gym_phase",
-                            "",
-                            list(app_helper.id2week.values()),
-                            selected=app_helper.id2week[START]),
-            ui.input_action_button("btn_acc", "Change accessory lifts", class_="btn-primary"),
-            ui.input_action_button("btn_pre", "Change prehab exercises", class_="btn-primary"),             
+            3,
             ui.markdown("<br>"),
+            ui.h5("Log a set:"),
+            ui.input_select("log_week", "Week", {str(k + 1): v for k, v in app_helper.id2week.items()}),
+            ui.input_select("log_lift", "Lift", LIFT_NAMES),
+            ui.input_numeric("log_sets", "Sets", 1, min=1, step=1),
+            ui.input_numeric("log_reps", "Reps", 5, min=1, step=1),
+            ui.input_numeric("log_weight", "Weight (kg)", 60, min=0, step=2.5),
+            ui.input_action_button("btn_log", "Log set"),
+        ),
+        ui.column(4, ui.markdown("<br>"), ui.h5("Planned"), ui.output_table("load_planned")),
+        ui.column(4, ui.markdown("<br>"), ui.h5("Logged"), ui.output_table("load_logged")),
+    )
 
-            ui.row(
-                ui.h4("Starting weights:"),
-                ui.column(4, ui.input_numeric("sw_s", "Squats", 20, min=20, max=70, step=10)),
-                ui.column(4, ui.input_numeric("sw_b", "Bench", 20, min=20, max=70, step=10)),
-                ui.column(4, ui.input_numeric("sw_d", "Deadlift", 60, min=40, max=70, step=10))
-            ),
 
-            ui.row(
-                ui.h4("1RM for each lift:"),
-                ui.column(4, ui.input_numeric("rm1_s", "Squats", 70, min=20, step=2.5)),
-                ui.column(4, ui.input_numeric("rm1_b", "Bench", 47.5, min=20, step=2.5)),
-                ui.column(4, ui.input_numeric("rm1_d", "Deadlift", 102.5, min=20, step=2.5))
+def main_panel(*schedule) -> Tag:
+    # The admin tab only exists when instrumentation is turned on
+    tabs = [ui.nav("Schedule", *schedule), ui.nav("What-if", what_if_panel()),
+            ui.nav("Analytics", analytics_panel())]
+    if instrumentation.ENABLED:
+        tabs.append(ui.nav("Admin",
+                           ui.markdown("<br>"),
+                           ui.download_button("admin_json", "Download JSON"),
+                           ui.download_button("admin_prometheus", "Download Prometheus"),
+                           ui.markdown("<br>"),
+                           ui.output_table("admin_timings")))
+    return ui.navset_tab(*tabs)
+
+
+@functools.lru_cache(maxsize=None)
+def page() -> Tag:
+    from macrocycle import MAX_BLOCKS
+
+    return ui.page_fluid(
+        shinyswatch.theme.minty(),
+        ui.include_css(app_helper.css_path),
+        ui.include_js(app_helper.js_path),
+        ui.markdown("<br>"),
+        ui.row(
+            ui.column(
+                6,
+                ui.h1("Sara's Workout Schedule"),
             ),
-
-    ui.markdown("""
+            ui.column(
+                6,
+                ui.popover(
+                    ui.input_action_button("btn", "Info", class_="btn-primary"),
+                    "I'm not a professional trainer and this is not a recommendation. "
+                    "This is just for my own personal use.",
+                    id="btn_popover",
+                ),
+                align="right")),
+        ui.markdown("<br>"),
+        ui.layout_sidebar(
+            ui.sidebar(
+                ui.h5("Select the current phase:"),
+                ui.input_select("gym_phase",
+                                "",
+                                list(app_helper.id2week.values()),
+                                selected=app_helper.id2week[START]),
+                ui.input_numeric("block", "Block", DEFAULTS["block"],
+                                 min=1, max=MAX_BLOCKS, step=1),
+                ui.input_action_button("btn_acc", "Change accessory lifts", class_="btn-primary"),
+                ui.input_action_button("btn_pre", "Change prehab exercises", class_="btn-primary"),             
+                ui.input_checkbox("show_plates", "Show plates per side", False),
+                ui.markdown("<br>"),
+
+                ui.row(
+                    ui.h4("Starting weights:"),
+                    ui.column(4, ui.input_numeric("sw_s", "Squats", DEFAULTS["sw_s"], min=20, max=70, step=10)),
+                    ui.column(4, ui.input_numeric("sw_b", "Bench", DEFAULTS["sw_b"], min=20, max=70, step=10)),
+                    ui.column(4, ui.input_numeric("sw_d", "Deadlift", DEFAULTS["sw_d"], min=40, max=70, step=10))
+                ),
+
+                ui.row(
+                    ui.h4("1RM for each lift:"),
+                    ui.column(4, ui.input_numeric("rm1_s", "Squats", DEFAULTS["rm1_s"], min=20, step=2.5)),
+                    ui.column(4, ui.input_numeric("rm1_b", "Bench", DEFAULTS["rm1_b"], min=20, step=2.5)),
+                    ui.column(4, ui.input_numeric("rm1_d", "Deadlift", DEFAULTS["rm1_d"], min=20, step=2.5))
+                ),
+
+        ui.markdown("""
     
     1. <h6>Accumulation</h6> Higher volume and moderate intensity for muscle indurance
     2. <h6>Intensification</h6> Lower volume and higher intensity
     3. <h6>Peaking</h6> Very low volume and close to maximum strength
     4. <h6>Deload</h6> Reduced volume and intensity to regenerate
     """),
-    
-            width="450px"
-        ),
-        {"style": "background-color: #fff"},
-        ui.row(
-            ui.h3(ui.output_text("phase")),
-            align="center"
-        ),
-        ui.output_ui("ui_main_part")
+        
+                width="450px"
+            ),
+            {"style": "background-color: #fff"},
+            main_panel(
+                ui.row(
+                    ui.h3(ui.output_text("phase")),
+                    align="center"
+                ),
+                ui.output_ui("ui_main_part")
+            )
+        )
     )
-)
+
+
+def app_ui(request) -> Tag:
+    # Built on the first request (or by warm_up) instead of at import
+    return page()
 
 
 def server(input, output, session):
+    # Not imported at module level, they pull in NumPy and pandas (see warm_up)
+    from analytics import LoadRollup, LoadSet, plan_sets
+    from macrocycle import MAX_BLOCKS, project
 
     acc_squats = reactive.Value(gym.accessory.squats[0])
     acc_bench = reactive.Value(gym.accessory.bench[0])
@@ -136,6 +260,172 @@ def server(input, output, session):
 
     week2id = {k: v for k, v in zip(app_helper.id2week.values(), app_helper.id2week.keys())}
 
+    # Wall time per render function and Calc, with the inputs that changed
+    # since its last run as the invalidation cause (GYM_INSTRUMENT=1)
+    track = instrumentation.session_tracker({
+        **{k: getattr(input, k) for k in ("gym_phase", "block", "show_plates", "rm1_s", "rm1_b", "rm1_d", "sw_s", "sw_b", "sw_d")},
+        "acc_squats": acc_squats, "acc_bench": acc_bench, "acc_deadlift": acc_deadlift,
+        "pre_squats": pre_squats, "pre_bench": pre_bench, "pre_deadlift": pre_deadlift,
+    })
+
+    # One reactive node per lift (debounced 1RM and starting weight -> program)
+    # and per phase, so a change to e.g. rm1_b only reruns the bench tables
+    def debounced_input(x):
+        @debounce(DEBOUNCE_SECS)
+        def _value():
+            return x()
+        return _value
+
+    # Saved per user (the logged in user, else an id kept in the browser) and
+    # restored when the user comes back. Reads come from profiles.store's
+    # memory, writes go to disk in the background.
+    saved_inputs = ("block", "sw_s", "sw_b", "sw_d", "rm1_s", "rm1_b", "rm1_d")
+    saved_values = {
+        "acc_squats": acc_squats, "acc_bench": acc_bench, "acc_deadlift": acc_deadlift,
+        "pre_squats": pre_squats, "pre_bench": pre_bench, "pre_deadlift": pre_deadlift,
+    }
+    user = reactive.Value(None)
+
+    @reactive.Effect
+    @reactive.event(input.profile_id)
+    def _effect_restore():
+        user.set(session.user or input.profile_id())
+        profile = profiles.store.get(user())
+        for k in saved_inputs:
+            if k in profile:
+                ui.update_numeric(k, value=profile[k], session=session)
+        for k, value in saved_values.items():
+            if k in profile:
+                value.set(profile[k])
+
+    def saved(key: str, source):
+        # Changes after the session started, the initial values are either
+        # the defaults or the ones just restored
+        @reactive.Effect
+        @reactive.event(source, ignore_init=True)
+        def _effect_save():
+            req(user() is not None)
+            profiles.store.update(user(), **{key: source()})
+
+    for k in saved_inputs:
+        saved(k, getattr(input, k))
+    for k, value in saved_values.items():
+        saved(k, value)
+
+    @reactive.Calc
+    def block():
+        # 0-based block of the macrocycle, see macrocycle.MacroPlan
+        b = input.block()
+        return 0 if b is None else min(max(int(b), 1), MAX_BLOCKS) - 1
+
+    # Programs are computed in the shared pool, outside the reactive flush
+    compute = SessionCompute()
+    session.on_ended(compute.cancel_all)
+
+    def block_one_rm(one_rm):
+        # The 1RM projected to the selected block
+        @reactive.Calc
+        def _one_rm():
+            req(one_rm() is not None)
+            wm = load_model(app_helper.path_weight_manager, WeightManager)
+            return project(one_rm(), block(), wm).item()
+        return _one_rm
+
+    def lift_program(lift: str, one_rm, starting_weight):
+        # Only the selected block is computed, blocks visited before come from
+        # the program cache. The calc is timed around the job in the pool.
+        @compute.background(f"program_{lift}", track("calc", f"program_{lift}"))
+        def _program():
+            req(starting_weight() is not None)
+            wm = load_model(app_helper.path_weight_manager, WeightManager)
+            return functools.partial(
+                cached_lift_program,
+                wm,
+                lift, one_rm(), starting_weight(),
+                warmup_sets=(gym.sets_main - 1),
+                warmup_sets_sec=(gym.sets_sec - 1)
+            )
+        return _program
+
+    one_rms = {
+        "squats": block_one_rm(debounced_input(input.rm1_s)),
+        "bench": block_one_rm(debounced_input(input.rm1_b)),
+        "deadlift": block_one_rm(debounced_input(input.rm1_d)),
+    }
+    programs = {
+        "squats": lift_program("squats", one_rms["squats"], debounced_input(input.sw_s)),
+        "bench": lift_program("bench", one_rms["bench"], debounced_input(input.sw_b)),
+        "deadlift": lift_program("deadlift", one_rms["deadlift"], debounced_input(input.sw_d)),
+    }
+
+    # Training load, kept up to date by the sets that change instead of being
+    # summed up again. The tables only read the week totals.
+    load = LoadRollup()
+    # One per table, a planned change doesn't re-render the logged table
+    load_versions = {"Planned": reactive.Value(0), "Logged": reactive.Value(0)}
+
+    def bump_load(source: str) -> None:
+        with reactive.isolate():
+            load_versions[source].set(load.version)
+
+    def planned_load(lift: str):
+        # Only reruns for a new program, its 1RM changed before the program
+        # came in
+        @reactive.Effect
+        def _effect_plan():
+            program = programs[lift]()
+            with reactive.isolate():
+                one_rm = one_rms[lift]()
+            if load.replace_plan("Planned", lift, plan_sets(gym, lift, program, one_rm)):
+                bump_load("Planned")
+
+    for lift in gym.main_lifts:
+        planned_load(lift)
+
+    @reactive.Effect
+    @reactive.event(input.btn_log)
+    def _effect_log():
+        lift, sets, reps, weight = input.log_lift(), input.log_sets(), input.log_reps(), input.log_weight()
+        req(sets, reps, weight is not None)
+        load.add("Logged", LoadSet(int(input.log_week()), LIFT_NAMES[lift], int(sets), int(reps),
+                                   float(weight), one_rms[lift]()))
+        bump_load("Logged")
+
+    @reactive.Calc
+    @track("calc")
+    def week():
+        return week2id[input.gym_phase()]
+
+    @reactive.Calc
+    @track("calc")
+    def deload():
+        return input.gym_phase() == app_helper.id2week[3]
+
+    @reactive.Calc
+    @track("calc")
+    def tables():
+        return phase_tables(input.gym_phase())
+
+    def weights(lift: str, main: bool = True) -> List[float]:
+        p = programs[lift]()
+        return (p.main if main else p.sec)[week()].tolist()
+
+    def weight_column(lift: str, main: bool = True) -> List[str]:
+        return [WeightCalc._format_weight(i) for i in weights(lift, main)]
+
+    def with_plates(frame: "pd.DataFrame", values: List[Union[float, str]]) -> "pd.DataFrame":
+        # Plate table solved once per inventory, see plates.PlateTable
+        if input.show_plates():
+            table = plate_table(load_model(app_helper.path_plates, PlateInventory))
+            frame["plates (per side)"] = plate_column(table, values)
+        return frame
+
+    def lift_html(table: SetTable, values: List[Union[float, str]], weight: List[str]) -> str:
+        # Cached per table and weights, the plates column is rendered each time
+        if input.show_plates():
+            return table_html(with_plates(gym.with_weight(table, weight), values))
+        return set_table_html(table, weight)
+
 
 
     def get_session_columns(n: int, deload: bool = False) -> Tag:
@@ -160,6 +450,7 @@ def server(input, output, session):
 
     @output
     @render.ui
+    @track("render")
     def ui_main_part():
         if input.gym_phase() == "Week 4":
             return ui.row(
@@ -177,12 +468,14 @@ def server(input, output, session):
 
     @output
     @render.text
+    @track("render")
     def phase():
         nonlocal week2id
-        return app_helper.headers_week[week2id[input.gym_phase()]]
+        return f"Block {block() + 1}, {app_helper.headers_week[week2id[input.gym_phase()]]}"
 
     @output
     @render.text
+    @track("render")
     def session_header1():
         if input.gym_phase() == app_helper.id2week[3]:
             return app_helper.headers_deload[0]
@@ -191,6 +484,7 @@ def server(input, output, session):
 
     @output
     @render.text
+    @track("render")
     def session_header2():
         if input.gym_phase() == app_helper.id2week[3]:
             return app_helper.headers_deload[1]
@@ -199,6 +493,7 @@ def server(input, output, session):
 
     @output
     @render.text
+    @track("render")
     def session_header3():
         if input.gym_phase() == app_helper.id2week[3]:
             return app_helper.headers_deload[2]
@@ -206,147 +501,128 @@ def server(input, output, session):
             return app_helper.headers_sessions[2]
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def main1():
-        nonlocal week2id
-        wc = setup_weigth_calc(s=input.rm1_s(), b=input.rm1_b(), d=input.rm1_d(),
-                               s0=input.sw_s(), b0=input.sw_b(), d0=input.sw_d())
-        
-        if input.gym_phase() != "Week 4":
-            df = phases[input.gym_phase()][0][0]
-            w = [wc._format_weight(i) for i in wc.get_weights("squats")[week2id[input.gym_phase()]]]
-        else:
-            df = phases[input.gym_phase()]()[0]
-            w = []
-            for m in gym.main_lifts:
-                for j in [wc._format_weight(i) for i in wc.deload_weights[m]]:
-                    w.append(j)
-            w += [""] * 3
-        df["weight"] = w
-        return df
+        if not deload():
+            return lift_html(tables()[0][0], weights("squats"), weight_column("squats"))
+        w = []
+        for m in gym.main_lifts:
+            for j in programs[m]().deload.tolist():
+                w.append(j)
+        w += [""] * 3
+        formatted = [j if j == "" else WeightCalc._format_weight(j) for j in w]
+        return lift_html(tables()[0], w, formatted)
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def main2():
-        wc = setup_weigth_calc(s=input.rm1_s(), b=input.rm1_b(), d=input.rm1_d(),
-                               s0=input.sw_s(), b0=input.sw_b(), d0=input.sw_d())
-        nonlocal week2id
-
-        if input.gym_phase() != "Week 4":
-            df = phases[input.gym_phase()][0][1]
-            w = [wc._format_weight(i) for i in wc.get_weights("bench")[week2id[input.gym_phase()]]]
-            df["weight"] = w
-        else:
-            df = phases[input.gym_phase()]()[1]
-        return df
+        if not deload():
+            return lift_html(tables()[0][1], weights("bench"), weight_column("bench"))
+        return set_table_html(tables()[1])
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def main3():
-        wc = setup_weigth_calc(s=input.rm1_s(), b=input.rm1_b(), d=input.rm1_d(),
-                               s0=input.sw_s(), b0=input.sw_b(), d0=input.sw_d())
-        nonlocal week2id
-
-        if input.gym_phase() != "Week 4":
-            df = phases[input.gym_phase()][0][2]
-            w = [wc._format_weight(i) for i in wc.get_weights("deadlift")[week2id[input.gym_phase()]]]
-            df["weight"] = w
-
-        else:
-            df = phases[input.gym_phase()]()[2]
-        return df
+        if not deload():
+            return lift_html(tables()[0][2], weights("deadlift"), weight_column("deadlift"))
+        return set_table_html(tables()[2])
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def sec1():
-        nonlocal week2id
-        if input.gym_phase() != "Week 4":  # NOTE: to get around error
-            wc = setup_weigth_calc(s=input.rm1_s(), b=input.rm1_b(), d=input.rm1_d(),
-                                   s0=input.sw_s(), b0=input.sw_b(), d0=input.sw_d())
-            df = phases[input.gym_phase()][1][0]
-            w = [wc._format_weight(i) for i in wc.get_weights("deadlift", False)[week2id[input.gym_phase()]]]
-            df["weight"] = w
-            return df
+        if not deload():  # NOTE: to get around error
+            lift = gym.secondary_lifts["squats"]
+            return lift_html(tables()[1][0], weights(lift, main=False), weight_column(lift, main=False))
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def sec2():
-        nonlocal week2id
-        if input.gym_phase() != "Week 4":
-            wc = setup_weigth_calc(s=input.rm1_s(), b=input.rm1_b(), d=input.rm1_d(),
-                                   s0=input.sw_s(), b0=input.sw_b(), d0=input.sw_d())
-            df = phases[input.gym_phase()][1][1]
-            w = [wc._format_weight(i) for i in wc.get_weights("deadlift", False)[week2id[input.gym_phase()]]]
-            df["weight"] = w
-            return df
+        if not deload():
+            lift = gym.secondary_lifts["bench"]
+            return lift_html(tables()[1][1], weights(lift, main=False), weight_column(lift, main=False))
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def sec3():
-        nonlocal week2id
-        if input.gym_phase() != "Week 4":
-            wc = setup_weigth_calc(s=input.rm1_s(), b=input.rm1_b(), d=input.rm1_d(),
-                                   s0=input.sw_s(), b0=input.sw_b(), d0=input.sw_d())
-            df = phases[input.gym_phase()][1][2]
-            w = [wc._format_weight(i) for i in wc.get_weights("deadlift", False)[week2id[input.gym_phase()]]]
-            df["weight"] = w
-            return df
+        if not deload():
+            lift = gym.secondary_lifts["deadlift"]
+            return lift_html(tables()[1][2], weights(lift, main=False), weight_column(lift, main=False))
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def acc1():
-        return pd.DataFrame([acc_bench()])
+        return selection_html([acc_bench()])
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def acc2():
-        return pd.DataFrame([acc_deadlift()])
+        return selection_html([acc_deadlift()])
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def acc3():
-        return pd.DataFrame([acc_squats()])
+        return selection_html([acc_squats()])
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def pre1():
-        return pd.DataFrame(pre_squats())
+        return selection_html(pre_squats())
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def pre2():
-        return pd.DataFrame(pre_bench())
+        return selection_html(pre_bench())
 
     @output
-    @render.table
+    @render_html
+    @track("render")
     def pre3():
-        return pd.DataFrame(pre_deadlift())
+        return selection_html(pre_deadlift())
 
     @reactive.Effect
     @reactive.event(input.btn_acc)
     def _effect_change_acc():
+        # Only the current picks go out with the modal, the catalog is
+        # searched on the server as the user types
         m = ui.modal(
-            ui.input_select("acc_s", "Squats", gym.accessory.squats, selected=acc_squats()),
-            ui.input_select("acc_b", "Bench", gym.accessory.bench, selected=acc_bench()),
-            ui.input_select("acc_d", "Deadlift", gym.accessory.deadlift, selected=acc_deadlift()),
+            ui.input_selectize("acc_s", "Squats", [acc_squats()], selected=acc_squats()),
+            ui.input_selectize("acc_b", "Bench", [acc_bench()], selected=acc_bench()),
+            ui.input_selectize("acc_d", "Deadlift", [acc_deadlift()], selected=acc_deadlift()),
             title="Accessory Lifts",
             easy_close=True,
             size="m"
         )
         ui.modal_show(m)
+        serve_search(session, "acc_s", exercise_index("accessory", "squats"), acc_squats())
+        serve_search(session, "acc_b", exercise_index("accessory", "bench"), acc_bench())
+        serve_search(session, "acc_d", exercise_index("accessory", "deadlift"), acc_deadlift())
 
     @reactive.Effect
     @reactive.event(input.btn_pre)
     def _effect_change_pre():
         m = ui.modal(
-            ui.input_select("pre_s", "Squats", gym.prehab.squats, selected=pre_squats(), selectize=True, multiple=True),
-            ui.input_select("pre_b", "Bench", gym.prehab.bench, selected=pre_bench(), selectize=True, multiple=True),
-            ui.input_select("pre_d", "Deadlift", gym.prehab.deadlift, selected=pre_deadlift(), selectize=True, multiple=True),
+            ui.input_selectize("pre_s", "Squats", list(pre_squats()), selected=list(pre_squats()), multiple=True),
+            ui.input_selectize("pre_b", "Bench", list(pre_bench()), selected=list(pre_bench()), multiple=True),
+            ui.input_selectize("pre_d", "Deadlift", list(pre_deadlift()), selected=list(pre_deadlift()), multiple=True),
             title="Prehab Exercises",
             easy_close=True,
             size="m"
         )
         ui.modal_show(m)
+        serve_search(session, "pre_s", exercise_index("prehab", "squats"), list(pre_squats()))
+        serve_search(session, "pre_b", exercise_index("prehab", "bench"), list(pre_bench()))
+        serve_search(session, "pre_d", exercise_index("prehab", "deadlift"), list(pre_deadlift()))
 
     @reactive.Effect
     @reactive.event(input.acc_s)
@@ -384,5 +660,123 @@ def server(input, output, session):
         new = input.pre_d()
         pre_deadlift.set(new)
 
+    @reactive.Calc
+    @track("calc")
+    def what_if():
+        from sweep import SweepVariant, sweep
+
+        lift = input.sweep_lift()
+        req(lift, input.sweep_rm(), input.sweep_inc())
+        try:
+            edited = SweepVariant(name="edited", **{
+                f"prc_{lift}": parse_floats(input.sweep_prc()),
+                "prc_working": parse_floats(input.sweep_working()),
+                "prc_deload": (parse_floats(input.sweep_deload()) or [None])[0],
+            })
+        except ValueError:
+            raise SafeException("Percentages must be numbers, e.g. 0.7, 0.8, 0.9")
+        lo, hi = input.sweep_rm()
+        wm = load_model(app_helper.path_weight_manager, WeightManager)
+        try:
+            return sweep(wm, {k: (lo, hi) for k in LIFT_NAMES}, 2.5,
+                         [edited] if edited.overrides() else [],
+                         [float(x) for x in input.sweep_inc()])
+        except ValueError as e:
+            raise SafeException(str(e))
+
+    @output
+    @render.table
+    @track("render")
+    def sweep_table():
+        from sweep import heatmap
+
+        week = int(input.sweep_week() or 0)
+        return heatmap(what_if().table(input.sweep_lift(), input.sweep_field(), week - 1 if week else None))
+
+    def load_table(source: str) -> "pd.DataFrame":
+        import pandas as pd
+
+        # Nothing logged yet is an empty table, not a missing one
+        load_versions[source]()
+        df = load.to_frame(source)
+        return df.assign(
+            tonnage=df["tonnage"].map("{:,.0f} kg".format),
+            intensity=df["intensity"].map(lambda x: "" if pd.isna(x) else f"{x:.0f} %"),
+        )
+
+    @output
+    @render_html
+    @track("render")
+    def load_planned():
+        return table_html(load_table("Planned"))
+
+    @output
+    @render_html
+    @track("render")
+    def load_logged():
+        return table_html(load_table("Logged"))
+
+    if instrumentation.ENABLED:
+        @output
+        @render.table
+        def admin_timings():
+            reactive.invalidate_later(2)
+            return instrumentation.timings_frame()
+
+        @session.download(filename="timings.json", media_type="application/json")
+        def admin_json():
+            yield instrumentation.registry.to_json()
+
+        @session.download(filename="timings.prom", media_type="text/plain")
+        def admin_prometheus():
+            yield instrumentation.registry.to_prometheus()
+
+
+def warm_up() -> None:
+    # Everything the first session needs that isn't built at import: pandas
+    # and NumPy, the schedule templates, the page, the static tables and the
+    # default programs
+    import pandas  # noqa: F401
+
+    page()
+    for phase in app_helper.id2week.values():
+        phase_tables(phase)
+    prerender(gym)
+    for bucket in ("accessory", "prehab"):
+        for lift in gym.main_lifts:
+            exercise_index(bucket, lift)
+    profiles.store.load()
+    wm = load_model(app_helper.path_weight_manager, WeightManager)
+    for lift, k in (("squats", "s"), ("bench", "b"), ("deadlift", "d")):
+        cached_lift_program(wm, lift, DEFAULTS[f"rm1_{k}"], DEFAULTS[f"sw_{k}"],
+                            warmup_sets=(gym.sets_main - 1),
+                            warmup_sets_sec=(gym.sets_sec - 1))
+
 
 app = App(app_ui, server)
+
+# JSON API for scripts and other clients, next to the Shiny app on the same
+# Starlette app, see api.py
+api = ProgramApi(gym, app_helper.path_weight_manager, app_helper.headers_week,
+                 app_helper.headers_sessions, app_helper.headers_deload)
+app.starlette_app.router.routes.insert(0, Mount("/api", app=api.router))
+
+# GYM_SNAPSHOT=<dir built by snapshot.py> serves it at /snapshot/, values
+# outside its ranges fall back to /api
+if os.environ.get("GYM_SNAPSHOT"):
+    app.starlette_app.router.routes.insert(
+        0, Mount("/snapshot", app=StaticFiles(directory=os.environ["GYM_SNAPSHOT"], html=True)))
+
+_lifespan = app.starlette_app.router.lifespan_context
+
+
+@contextlib.asynccontextmanager
+async def _warm_up_lifespan(starlette_app: Any):
+    # Warmed in a background thread so startup isn't held up by it
+    async with _lifespan(starlette_app) as state:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+        yield state
+        await profiles.store.close()
+
+
+app.starlette_app.router.lifespan_context = _warm_up_lifespan
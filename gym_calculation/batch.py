@@ -0,0 +1,31 @@
+import functools
+from concurrent.futures import Executor, Future
+from typing import TYPE_CHECKING, List
+
+from weight_calc import WeightCalc
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Shared by the batch tools, export.py and snapshot.py
+
+# Weights are rounded to the increment, so there are few distinct values
+_format_weight = functools.lru_cache(maxsize=4096)(WeightCalc._format_weight)
+
+
+def format_weights(values: "np.ndarray") -> List[str]:
+    # One row of a program as the app shows it, e.g. "72.5kg"
+    return [_format_weight(w) for w in values.tolist()]
+
+
+class InlineExecutor(Executor):
+    # --workers 1: same code path without the process pool
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
@@ -0,0 +1,157 @@
+import bisect
+import heapq
+import json
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from htmltools import tags
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from program_cache import ProgramCache
+
+
+# Options sent per keystroke of a search select
+TOP_K = 20
+
+# Points per query word, doubled for a word of the name instead of a tag
+EXACT, PREFIX, FUZZY = 3, 2, 1
+# Shorter words are only matched exactly or by prefix
+FUZZY_MIN = 4
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class ExerciseTags(BaseModel):
+    equipment: List[str] = []
+    muscles: List[str] = []
+    pattern: List[str] = []
+
+    def words(self) -> List[str]:
+        return [w for tag in (*self.equipment, *self.muscles, *self.pattern) for w in words(tag)]
+
+
+class ExerciseCatalog(BaseModel):
+    # Exercise name -> tags, exercises without an entry have none
+    exercises: Dict[str, ExerciseTags] = {}
+
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _deletions(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class ExerciseIndex:
+    # Inverted index over the words of the exercise names and their tags,
+    # built once. A query matches the exercises that match every one of its
+    # words, exactly, by prefix or (for longer words) with one typo, best
+    # scores first and catalog order among equals.
+
+    def __init__(self, names: Sequence[str], catalog: Optional[ExerciseCatalog] = None) -> None:
+        self.names = list(names)
+        # Word -> exercise -> 2 if the word is in the name, 1 if in a tag
+        postings: Dict[str, Dict[int, int]] = {}
+        for i, name in enumerate(self.names):
+            tagged = catalog.exercises.get(name) if catalog is not None else None
+            for w in tagged.words() if tagged is not None else []:
+                postings.setdefault(w, {}).setdefault(i, 1)
+            for w in words(name):
+                postings.setdefault(w, {})[i] = 2
+        self._postings = postings
+        # Sorted, a prefix is a range found by bisection
+        self._vocabulary = sorted(postings)
+        # Every word with one letter dropped -> the words it came from. Two
+        # words are one edit apart if one is in the other's deletions or
+        # they share one (symmetric delete).
+        self._deletes: Dict[str, Set[str]] = {}
+        for w in self._vocabulary:
+            if len(w) >= FUZZY_MIN:
+                for d in _deletions(w):
+                    self._deletes.setdefault(d, set()).add(w)
+        self._results = ProgramCache(maxsize=1024)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _fuzzy(self, q: str) -> Set[str]:
+        found = set(self._deletes.get(q, ()))
+        for d in _deletions(q):
+            found.update(self._deletes.get(d, ()))
+            if d in self._postings and len(d) >= FUZZY_MIN:
+                found.add(d)
+        return found
+
+    def _match(self, q: str) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+
+        def add(word: str, points: int) -> None:
+            for i, weight in self._postings[word].items():
+                if points * weight > scores.get(i, 0):
+                    scores[i] = points * weight
+
+        lo = bisect.bisect_left(self._vocabulary, q)
+        hi = bisect.bisect_left(self._vocabulary, q[:-1] + chr(ord(q[-1]) + 1))
+        for word in self._vocabulary[lo:hi]:
+            add(word, EXACT if word == q else PREFIX)
+        if len(q) >= FUZZY_MIN:
+            for word in self._fuzzy(q):
+                add(word, FUZZY)
+        return scores
+
+    def _search(self, query: Tuple[str, ...], k: int) -> List[str]:
+        if not query:
+            return self.names[:k]
+        total: Optional[Dict[int, int]] = None
+        for q in query:
+            scores = self._match(q)
+            total = scores if total is None else {i: s + scores[i] for i, s in total.items() if i in scores}
+            if not total:
+                return []
+        best = heapq.nsmallest(k, total.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [self.names[i] for i, _ in best]
+
+    def search(self, query: str, k: int = TOP_K) -> List[str]:
+        key = (tuple(words(query)), k)
+        return self._results.get_or_create(key, lambda: self._search(*key))
+
+
+def search_select_config(id: str) -> str:
+    # selectize.js settings: one request per keystroke, the options come in
+    # ranked and fuzzy matches included, so the browser neither filters nor
+    # sorts them again
+    options = {
+        "maxOptions": TOP_K,
+        "score": "function() { return function() { return 1; }; }",
+        "sortField": "$order",
+    }
+    return str(tags.script(json.dumps(options), type="application/json",
+                           data_for=id, data_eval=json.dumps(["score"])))
+
+
+def serve_search(session, id: str, index: ExerciseIndex, selected: Union[str, Sequence[str]]) -> None:
+    # Turns the selectize input `id` (rendered with only the selected
+    # choices) into a search over `index`. Call after the input was sent.
+    picked = [selected] if isinstance(selected, str) else list(selected)
+
+    def handler(request: Request) -> JSONResponse:
+        query = request.query_params.get("query", "")
+        try:
+            k = int(request.query_params.get("maxop", TOP_K))
+        except ValueError:
+            return JSONResponse({"detail": "maxop must be an integer"}, status_code=400)
+        k = max(1, min(TOP_K, k))
+        names = index.search(query, k)
+        if not query:
+            # The first request, the selection must be among the options
+            names = names + [n for n in picked if n not in names]
+        return JSONResponse([{"value": n, "label": n} for n in names])
+
+    session.send_input_message(id, {
+        "config": search_select_config(id),
+        "url": session.dynamic_route(f"search_{id}", handler),
+        "value": selected if isinstance(selected, str) else picked,
+    })
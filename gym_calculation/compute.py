@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Set, TypeVar
+
+from shiny import reactive, req
+
+import instrumentation
+
+
+T = TypeVar("T")
+
+# GYM_COMPUTE=process for a process pool, jobs and results must pickle then
+POOL_KIND = os.environ.get("GYM_COMPUTE", "thread")
+MAX_WORKERS = int(os.environ.get("GYM_COMPUTE_WORKERS", os.cpu_count() or 1))
+SESSION_LIMIT = 2
+
+_executor: Optional[Executor] = None
+# Every running job of every session, for drain()
+_tasks: Set[asyncio.Task] = set()
+
+
+def executor() -> Executor:
+    # One pool per process, shared by all sessions
+    global _executor
+    if _executor is None:
+        if POOL_KIND == "process":
+            _executor = ProcessPoolExecutor(MAX_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(MAX_WORKERS, thread_name_prefix="compute")
+    return _executor
+
+
+async def drain() -> None:
+    # Waits until no job is running, including ones started by the flushes
+    # of finished jobs
+    while _tasks:
+        await asyncio.gather(*list(_tasks), return_exceptions=True)
+
+
+@dataclass
+class _Failed:
+    error: BaseException
+
+
+class _Slot:
+    def __init__(self) -> None:
+        self.result: reactive.Value[Any] = reactive.Value(None)
+        self.generation = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class SessionCompute:
+    # Runs jobs of one session in the shared pool, off the event loop and
+    # outside the reactive flush, so other sessions keep flushing while a job
+    # runs. Every slot only keeps its latest job: a new one cancels the job
+    # before it (or drops its result if it's already running). At most
+    # `limit` jobs of the session are in the pool at the same time.
+
+    def __init__(self, limit: int = SESSION_LIMIT) -> None:
+        self._limit = asyncio.Semaphore(limit)
+        self._slots: Dict[str, _Slot] = {}
+        self.cancelled = 0
+        self.discarded = 0
+
+    def background(self, name: str, track: Optional[Callable[[Callable], Callable]] = None
+                   ) -> Callable[[Callable[[], Callable[[], T]]], Callable[[], T]]:
+        # Decorates a function that reads its reactive inputs and returns the
+        # job (a callable without arguments) to run in the pool. The result is
+        # a reactive accessor for the job's latest result, req() fails until
+        # the first one is in. `track` (e.g. a session tracker's
+        # track("calc", name)) times each run of the job from the event loop,
+        # so the job itself stays a plain callable that pickles.
+        def decorator(fn: Callable[[], Callable[[], T]]) -> Callable[[], T]:
+            slot = self._slots.setdefault(name, _Slot())
+
+            @reactive.Effect
+            def _schedule():
+                job = fn()
+                slot.generation += 1
+                if slot.task is not None and not slot.task.done():
+                    slot.task.cancel()
+                    self.cancelled += 1
+                slot.task = asyncio.ensure_future(self._run(name, slot, slot.generation, job, track))
+                _tasks.add(slot.task)
+                slot.task.add_done_callback(_tasks.discard)
+
+            def value() -> T:
+                v = slot.result()
+                req(v is not None)
+                if isinstance(v, _Failed):
+                    raise v.error
+                return v
+
+            return value
+        return decorator
+
+    async def _run(self, name: str, slot: _Slot, generation: int, job: Callable[[], Any],
+                   track: Optional[Callable[[Callable], Callable]] = None) -> None:
+        async def execute() -> Any:
+            return await asyncio.get_running_loop().run_in_executor(executor(), job)
+
+        async with self._limit:
+            if generation != slot.generation:
+                return
+            start = time.perf_counter()
+            try:
+                value = await (execute if track is None else track(execute))()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                value = _Failed(e)
+            if instrumentation.ENABLED:
+                instrumentation.registry.record(name, "compute", time.perf_counter() - start, "executor")
+        if generation != slot.generation:
+            self.discarded += 1
+            return
+        async with reactive.lock():
+            slot.result.set(value)
+            await reactive.flush()
+
+    def cancel_all(self) -> None:
+        for slot in self._slots.values():
+            slot.generation += 1
+            if slot.task is not None:
+                slot.task.cancel()
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+@dataclass
+class _Entry:
+    mtime_ns: int
+    size: int
+    digest: str
+    model: BaseModel
+
+
+_cache: Dict[Tuple[str, Type[BaseModel]], _Entry] = {}
+_lock = threading.Lock()
+
+
+def _read(path: str) -> Tuple[bytes, str]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def load_model(path: str, model: Type[Model]) -> Model:
+    # One parsed and validated object per (file, model) and process. The file is
+    # only re-read when its mtime or size changes, and only re-validated when
+    # the content hash changes too (e.g. a `touch` keeps the parsed object).
+    key = (os.path.abspath(path), model)
+    st = os.stat(path)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and (entry.mtime_ns, entry.size) == (st.st_mtime_ns, st.st_size):
+            return entry.model
+
+        raw, digest = _read(path)
+        if entry is None or entry.digest != digest:
+            entry = _Entry(st.st_mtime_ns, st.st_size, digest, model(**json.loads(raw)))
+        else:
+            entry = _Entry(st.st_mtime_ns, st.st_size, digest, entry.model)
+        _cache[key] = entry
+        return entry.model
+
+
+def model_hash(model: BaseModel) -> str:
+    return hashlib.sha256(model.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
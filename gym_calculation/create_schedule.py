@@ -1,12 +1,23 @@
 from dataclasses import dataclass
 import json
-from typing import Dict, Optional, List, Union
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Optional, List, Sequence, Tuple, Union
 
-import numpy as np
-import pandas as pd
 from pydantic import BaseModel
 
-from gym_schedule import GymSchedule, DeloadSchedule
+from config import load_model
+from gym_schedule import GymSchedule, DeloadSchedule, SetTable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+LIFT_NAMES = {"squats": "Squats", "bench": "Bench", "deadlift": "Deadlift"}
+# Titles of the weeks, of the sessions of weeks 1-3 and of the deload
+# sessions, shared by the app, the exports and the snapshots
+WEEK_TITLES = ("Week 1: Accumulation", "Week 2: Intensification", "Week 3: Peaking", "Week 4: Deload")
+SESSION_TITLES = ("Squats session", "Bench session", "Deadlift session")
+DELOAD_TITLES = ("Full body session", "Upper body session", "Lower Body Session")
 
 
 # one: accumulation
@@ -23,13 +34,12 @@ class ExerciseBucket(BaseModel):
 
 class MonthlySchedule:
 
-    def __init__(self, accessory: str, prehab: str) -> None:
-
-        with open(accessory, "r", encoding="utf-8") as f:
-            self.accessory = ExerciseBucket(**json.load(f))
+    def __init__(self,
+                 accessory: Union[str, ExerciseBucket],
+                 prehab: Union[str, ExerciseBucket]) -> None:
 
-        with open(prehab, "r", encoding="utf-8") as f:
-            self.prehab = ExerciseBucket(**json.load(f))
+        self.accessory = MonthlySchedule._load_bucket(accessory)
+        self.prehab = MonthlySchedule._load_bucket(prehab)
 
         self.accumulation = GymSchedule(main_set_reps=8, accessory_set_reps=6)
         self.intensification = GymSchedule(main_set_reps=5, accessory_set_reps=4)
@@ -40,26 +50,53 @@ class MonthlySchedule:
         self.sets_main = len(self.accumulation.sets_main)
         self.sets_sec = len(self.accumulation.sets_accessory)
         self.secondary_lifts = self.accumulation.secondary_lifts
+
+        # Built once on first use, see _template
+        self._templates: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_bucket(bucket: Union[str, ExerciseBucket]) -> ExerciseBucket:
+        if isinstance(bucket, ExerciseBucket):
+            return bucket
+        return load_model(bucket, ExerciseBucket)
+
+    def _setup_df(self, table: SetTable) -> SetTable:
+        return table.rename_lifts(LIFT_NAMES)
     
-    def _setup_df(self, df: pd.DataFrame):
-        df.loc[df["lift"] == "squats", "lift"] = "Squats"
-        df.loc[df["lift"] == "bench", "lift"] = "Bench"
-        df.loc[df["lift"] == "deadlift", "lift"] = "Deadlift"
-        return df
-    
-    def _setup_exercise(self, set_method: GymSchedule, lift: str):
-        df = set_method(lift)
-        return self._setup_df(df)
-
-    def main_part(self):
-        return [[self._setup_exercise(gym_class.generate_main, m) for m in self.main_lifts]
-                for gym_class in [self.accumulation, self.intensification, self.peaking]]
-
-    def secondary_part(self):
-        return [[self._setup_exercise(gym_class.generate_secondary, m) for m in self.main_lifts]
-                for gym_class in [self.accumulation, self.intensification, self.peaking]]
-
-    def sessions_week_four(self):
-        f = self.deloading.full_body_session()
-        d = [f, self.deloading.upper_body_session(), self.deloading.lower_body_session()]
-        return [self._setup_df(df) for df in d]
+    def _setup_exercise(self, set_method: Callable[[str], SetTable], lift: str) -> SetTable:
+        table = set_method(lift)
+        return self._setup_df(table)
+
+    @staticmethod
+    def with_weight(table: SetTable, weight: Sequence[str]) -> "pd.DataFrame":
+        # Render boundary: a new frame with a weight column, the shared
+        # template itself is immutable
+        return table.to_frame(weight)
+
+    def _template(self, name: str, build: Callable[[], Tuple]) -> Tuple:
+        if name not in self._templates:
+            with self._lock:
+                if name not in self._templates:
+                    self._templates[name] = build()
+        return self._templates[name]
+
+    def _phases(self) -> Tuple[GymSchedule, GymSchedule, GymSchedule]:
+        return (self.accumulation, self.intensification, self.peaking)
+
+    def main_part(self) -> Tuple[Tuple[SetTable, ...], ...]:
+        return self._template("main", lambda: tuple(
+            tuple(self._setup_exercise(gym_class.generate_main, m) for m in self.main_lifts)
+            for gym_class in self._phases()))
+
+    def secondary_part(self) -> Tuple[Tuple[SetTable, ...], ...]:
+        return self._template("secondary", lambda: tuple(
+            tuple(self._setup_exercise(gym_class.generate_secondary, m) for m in self.main_lifts)
+            for gym_class in self._phases()))
+
+    def sessions_week_four(self) -> Tuple[SetTable, ...]:
+        def build():
+            f = self.deloading.full_body_session()
+            d = [f, self.deloading.upper_body_session(), self.deloading.lower_body_session()]
+            return tuple(self._setup_df(table) for table in d)
+        return self._template("deload", build)
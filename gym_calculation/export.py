@@ -0,0 +1,281 @@
+import argparse
+import csv
+import html
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from batch import InlineExecutor, format_weights
+from config import load_model
+from create_schedule import DELOAD_TITLES, SESSION_TITLES, WEEK_TITLES, ExerciseBucket, MonthlySchedule
+from gym_schedule import SetRow, SetTable
+from roster import compute_roster
+from table_cache import table_html
+from weight_calc import WeightManager
+from weight_engine import LIFTS
+
+
+PARAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "params")
+
+ROSTER_COLUMNS = ["athlete", "s", "b", "d", "s0", "b0", "d0"]
+CSV_COLUMNS = ["athlete", "week", "session", "part", "lift", "setup", "weight"]
+FORMATS = ("csv", "json", "html")
+
+# The app shows the bench accessory in the squats session and so on
+ACCESSORY_LIFTS = ("bench", "deadlift", "squats")
+
+# One plan: weeks -> sessions -> (part title, table, weights or None)
+Part = Tuple[str, SetTable, Optional[List[str]]]
+Plan = List[Tuple[str, List[Tuple[str, List[Part]]]]]
+
+
+def read_roster(path: str, chunksize: int = 1_000) -> Iterator[pd.DataFrame]:
+    # CSV or JSON Lines with the columns ROSTER_COLUMNS, in chunks
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        reader = pd.read_csv(path, chunksize=chunksize, dtype={"athlete": str})
+    elif ext in (".jsonl", ".ndjson"):
+        reader = pd.read_json(path, lines=True, chunksize=chunksize, dtype={"athlete": str})
+    else:
+        raise ValueError(f"Unsupported roster format {ext!r}, expected .csv or .jsonl")
+    with reader:
+        for chunk in reader:
+            missing = [c for c in ROSTER_COLUMNS if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"Roster is missing column(s) {missing}")
+            yield chunk[ROSTER_COLUMNS]
+
+
+def athlete_plan(gym: MonthlySchedule, main: np.ndarray, sec: np.ndarray, deload: np.ndarray) -> Plan:
+    # The tables the app shows for every phase. main/sec are (lift, week,
+    # set) and deload is (lift, 2) for one athlete, lifts ordered as LIFTS.
+    accessory = [SetTable((SetRow(getattr(gym.accessory, lift)[0]),), columns=("lift",))
+                 for lift in ACCESSORY_LIFTS]
+    prehab = [SetTable(tuple(SetRow(e) for e in getattr(gym.prehab, lift)[:2]), columns=("lift",))
+              for lift in LIFTS]
+
+    plan: Plan = []
+    for w, title in enumerate(WEEK_TITLES[:3]):
+        sessions = []
+        for i, lift in enumerate(LIFTS):
+            secondary = LIFTS.index(gym.secondary_lifts[lift])
+            sessions.append((SESSION_TITLES[i], [
+                ("Main lift", gym.main_part()[w][i], format_weights(main[i, w])),
+                ("Secondary lift", gym.secondary_part()[w][i], format_weights(sec[secondary, w])),
+                ("Accessory lift", accessory[i], None),
+                ("Prehab exercises", prehab[i], None),
+            ]))
+        plan.append((title, sessions))
+
+    full_body, upper_body, lower_body = gym.sessions_week_four()
+    plan.append((WEEK_TITLES[3], [
+        (DELOAD_TITLES[0], [("Full body", full_body, format_weights(deload.reshape(-1)) + [""] * 3)]),
+        (DELOAD_TITLES[1], [("Upper body", upper_body, None)]),
+        (DELOAD_TITLES[2], [("Lower body", lower_body, None)]),
+    ]))
+    return plan
+
+
+def _rows(table: SetTable, weights: Optional[List[str]]) -> Iterator[Tuple[str, str, str]]:
+    for j, r in enumerate(table.rows):
+        yield r.lift, r.setup if "setup" in table.columns else "", weights[j] if weights else ""
+
+
+def plan_csv(athlete: str, plan: Plan, writer: Any) -> None:
+    for week, (_, sessions) in enumerate(plan, start=1):
+        for session, parts in sessions:
+            for part, table, weights in parts:
+                for lift, setup, weight in _rows(table, weights):
+                    writer.writerow((athlete, week, session, part, lift, setup, weight))
+
+
+def plan_json(athlete: str, plan: Plan) -> Dict[str, Any]:
+    return {"athlete": athlete, "weeks": [
+        {"week": week, "title": title, "sessions": [
+            {"title": session, "parts": [
+                {"title": part, "sets": [{"lift": lift, "setup": setup, "weight": weight}
+                                         for lift, setup, weight in _rows(table, weights)]}
+                for part, table, weights in parts]}
+            for session, parts in sessions]}
+        for week, (title, sessions) in enumerate(plan, start=1)]}
+
+
+def _render(table: SetTable, weights: Optional[List[str]], cache: Dict[Tuple, str]) -> str:
+    # Athletes with close 1RMs share most of their tables, those are rendered
+    # once. Keyed by the table itself, the accessory and prehab tables are
+    # rebuilt for every athlete.
+    k = (table, None if weights is None else tuple(weights))
+    if k not in cache:
+        cache[k] = table_html(table.to_frame(weights))
+    return cache[k]
+
+
+def plan_html(athlete: str, plan: Plan, stylesheet: str = "style.css",
+              cache: Optional[Dict[Tuple, str]] = None) -> str:
+    # A static page with the app's theme and table markup
+    cache = {} if cache is None else cache
+    out = [
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8">',
+        f"<title>{html.escape(athlete)}</title>",
+        f'<link rel="stylesheet" href="{html.escape(stylesheet)}">',
+        '</head><body><div class="container-fluid">',
+        f"<h1>{html.escape(athlete)}</h1>",
+    ]
+    for title, sessions in plan:
+        out.append(f'<div class="row" align="center"><h3>{html.escape(title)}</h3></div>')
+        out.append('<div class="row" align="center">')
+        for session, parts in sessions:
+            out.append(f'<div class="col-sm-4"><h4>{html.escape(session)}</h4><p><em>15 min warmup</em></p>')
+            for part, table, weights in parts:
+                if len(parts) > 1:
+                    out.append(f"<h6>{html.escape(part)}</h6>")
+                out.append(_render(table, weights, cache))
+            out.append("</div>")
+        out.append("</div>")
+    out.append("</div></body></html>")
+    return "\n".join(out)
+
+
+def _file_name(athlete: str, offset: int) -> str:
+    # Unique and safe on every filesystem
+    return f"{offset:07d}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', athlete)[:80]}.html"
+
+
+# Worker side, one schedule and weight manager per process
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(weight_manager: str, accessory: str, prehab: str) -> None:
+    _worker["wm"] = load_model(weight_manager, WeightManager)
+    _worker["gym"] = MonthlySchedule(load_model(accessory, ExerciseBucket), load_model(prehab, ExerciseBucket))
+
+
+def _export_chunk(fmt: str, offset: int, roster: Dict[str, list], output: str) -> Tuple[int, str]:
+    # Returns (athletes, text to append to the output). HTML pages are
+    # written here directly, one file per athlete.
+    gym: MonthlySchedule = _worker["gym"]
+    program = compute_roster(
+        roster["s"], roster["b"], roster["d"], roster["s0"], roster["b0"], roster["d0"],
+        weight_manager=_worker["wm"],
+        warmup_sets=(gym.sets_main - 1),
+        warmup_sets_sec=(gym.sets_sec - 1)
+    )
+    athletes = roster["athlete"]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    cache: Dict[Tuple, str] = {}
+    for i, athlete in enumerate(athletes):
+        plan = athlete_plan(gym, program.main[i], program.sec[i], program.deload[i])
+        if fmt == "csv":
+            plan_csv(athlete, plan, writer)
+        elif fmt == "json":
+            buffer.write(json.dumps(plan_json(athlete, plan)) + "\n")
+        else:
+            with open(os.path.join(output, _file_name(athlete, offset + i)), "w", encoding="utf-8") as f:
+                f.write(plan_html(athlete, plan, cache=cache))
+    return len(athletes), buffer.getvalue()
+
+
+def export(roster: str, output: str, fmt: str = "csv",
+           workers: Optional[int] = None, chunk_size: int = 1_000,
+           weight_manager: str = os.path.join(PARAMS, "weight_manager.json"),
+           accessory: str = os.path.join(PARAMS, "exercises_acc.json"),
+           prehab: str = os.path.join(PARAMS, "exercises_prehab.json"),
+           progress: bool = True) -> int:
+    # Writes the plans of every athlete in `roster` and returns how many.
+    # csv/json: `output` is a file (JSON Lines, one athlete per line), html: a
+    # directory. At most 2 chunks per worker are in flight and finished
+    # chunks are written in roster order, so memory doesn't grow with the
+    # roster.
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+    workers = workers or os.cpu_count() or 1
+    init_args = (weight_manager, accessory, prehab)
+    if workers == 1:
+        _init_worker(*init_args)
+        executor: Executor = InlineExecutor()
+    else:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args)
+
+    if fmt == "html":
+        os.makedirs(output, exist_ok=True)
+        shutil.copyfile(os.path.join(PARAMS, "style.css"), os.path.join(output, "style.css"))
+        sink = None
+    else:
+        sink = open(output, "w", encoding="utf-8", newline="")
+        if fmt == "csv":
+            csv.writer(sink, lineterminator="\n").writerow(CSV_COLUMNS)
+
+    done = 0
+    start = time.perf_counter()
+    pending: Deque[Future] = deque()
+
+    def collect() -> None:
+        nonlocal done
+        n, text = pending.popleft().result()
+        if sink is not None:
+            sink.write(text)
+        done += n
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"\r{done:,} athletes  {done / elapsed:,.0f}/s  {elapsed:.1f} s",
+                  end="", file=sys.stderr, flush=True)
+
+    try:
+        offset = 0
+        for chunk in read_roster(roster, chunk_size):
+            records = {c: chunk[c].tolist() for c in ROSTER_COLUMNS}
+            records["athlete"] = [str(a) for a in records["athlete"]]
+            pending.append(executor.submit(_export_chunk, fmt, offset, records, output))
+            offset += len(chunk)
+            while len(pending) >= 2 * workers:
+                collect()
+        while pending:
+            collect()
+    finally:
+        for f in pending:
+            f.cancel()
+        executor.shutdown()
+        if sink is not None:
+            sink.close()
+    if progress:
+        print(file=sys.stderr)
+    return done
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write the four-week plan of every athlete in a roster")
+    parser.add_argument("roster", help=f"CSV or JSON Lines file with the columns {', '.join(ROSTER_COLUMNS)}")
+    parser.add_argument("output", help="output file for csv/json, output directory for html")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1_000, help="athletes per task")
+    parser.add_argument("--weight-manager", default=os.path.join(PARAMS, "weight_manager.json"))
+    parser.add_argument("--accessory", default=os.path.join(PARAMS, "exercises_acc.json"))
+    parser.add_argument("--prehab", default=os.path.join(PARAMS, "exercises_prehab.json"))
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    n = export(args.roster, args.output, args.format, args.workers, args.chunk_size,
+               args.weight_manager, args.accessory, args.prehab, progress=not args.quiet)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {n:,} plans to {args.output} in {elapsed:.1f} s ({n / max(elapsed, 1e-9):,.0f} athletes/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,65 @@
-from dataclasses import dataclass
-import json
-from typing import Dict, Optional, List, Union
+from dataclasses import dataclass, replace
+import math
+from typing import TYPE_CHECKING, Iterator, Mapping, Optional, List, Sequence, Tuple, Union
 
-import numpy as np
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass(frozen=True, slots=True)
+class SetRow:
+    lift: str
+    sets: Optional[int] = None
+    reps: Optional[int] = None
+
+    @classmethod
+    def from_setup(cls, lift: str, setup: str) -> "SetRow":
+        # "3x8" -> 3 sets of 8 reps, "" -> no prescribed sets
+        if not setup:
+            return cls(lift)
+        sets, reps = setup.split("x")
+        return cls(lift, int(sets), int(reps))
+
+    @property
+    def setup(self) -> str:
+        return "" if self.sets is None else f"{self.sets}x{self.reps}"
+
+
+@dataclass(frozen=True, slots=True)
+class SetTable:
+    # Immutable rows of one table, converted to a DataFrame only when rendered
+    # or exported
+    rows: Tuple[SetRow, ...]
+    columns: Tuple[str, ...] = ("lift", "setup")
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[SetRow]:
+        return iter(self.rows)
+
+    def rename_lifts(self, names: Mapping[str, str]) -> "SetTable":
+        return replace(self, rows=tuple(replace(r, lift=names.get(r.lift, r.lift)) for r in self.rows))
+
+    def to_frame(self, weight: Optional[Sequence[str]] = None) -> "pd.DataFrame":
+        # pandas is only imported once a table is rendered, it's most of the
+        # app's import time
+        import pandas as pd
+
+        data = {c: [getattr(r, c) for r in self.rows] for c in self.columns}
+        if weight is not None:
+            data["weight"] = list(weight)
+        return pd.DataFrame(data)
+
+
+def _linspace_int(start: int, stop: int, num: int) -> List[int]:
+    # Same values as np.linspace(start, stop, num, dtype=int) without NumPy
+    if num <= 0:
+        return []
+    if num == 1:
+        return [start]
+    step = (stop - start) / (num - 1)
+    return [math.floor(i * step + start) for i in range(num - 1)] + [stop]
 
 
 class GymSchedule:
@@ -47,28 +103,22 @@ class GymSchedule:
                       max_reps: int,
                       starting_with_bar: bool = True) -> Union[str, List[str]]:
         sets = ["1x5"] if starting_with_bar else []
-        sets += [f"1x{j}" for i, j in zip(range(warmup_sets),
-                                np.linspace(4, ending_reps, warmup_sets, dtype=int))]
+        sets += [f"1x{j}" for j in _linspace_int(4, ending_reps, warmup_sets)]
         sets += [f"{working_sets}x{max_reps}"]
         if len(sets) == 1:
              return sets[0]
         return sets
     
-    def generate_main(self, main_lift: str) -> pd.DataFrame:
-        sets = [(main_lift, i) for i in self.sets_main]
-        return pd.DataFrame(sets, columns=["lift", "setup"])
+    def generate_main(self, main_lift: str) -> SetTable:
+        return SetTable(tuple(SetRow.from_setup(main_lift, i) for i in self.sets_main))
 
-    def generate_secondary(self, main_lift: str) -> pd.DataFrame:
+    def generate_secondary(self, main_lift: str) -> SetTable:
         lift = self.secondary_lifts[main_lift]
-        sets = [(lift, i) for i in self.sets_accessory]
-        return pd.DataFrame(sets, columns=["lift", "setup"])
+        return SetTable(tuple(SetRow.from_setup(lift, i) for i in self.sets_accessory))
 
-    def generate_acc(self, main_lift: str):
+    def generate_acc(self, main_lift: str) -> SetTable:
         acc = [k for k in self.main_lifts if k not in [self.secondary_lifts[main_lift], main_lift]][0]
-        sets = []
-        for i in self.sets_accessory:
-            sets.append((acc, i))
-        return pd.DataFrame(sets, columns=["lift", "setup"])
+        return SetTable(tuple(SetRow.from_setup(acc, i) for i in self.sets_accessory))
 
 
 class DeloadSchedule(GymSchedule):
@@ -86,19 +136,19 @@ class DeloadSchedule(GymSchedule):
         session = []
         for m in self.main_lifts:
             for s in sets:
-                session.append((m, s))
+                session.append(SetRow.from_setup(m, s))
         prehab = [
             "Hip exercises (variations)",
             "Scapular Retraction",
             "Band Pull-Aparts",
         ]
         for p in prehab:
-            session.append((p, ""))
+            session.append(SetRow(p))
 
-        return pd.DataFrame(session, columns=["lift", "setup"])
+        return SetTable(tuple(session))
     
-    def _prehab_session(self, exercises: List[str]) -> pd.DataFrame:
-        return pd.DataFrame(exercises, columns=["lift"])
+    def _prehab_session(self, exercises: List[str]) -> SetTable:
+        return SetTable(tuple(SetRow(e) for e in exercises), columns=("lift",))
 
     def upper_body_session(self):
         exercises = [
@@ -0,0 +1,219 @@
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Opt-in: GYM_INSTRUMENT=1 shiny run gym_calculation/app.py
+# When off, the decorators below return the function unchanged.
+ENABLED = os.environ.get("GYM_INSTRUMENT", "").lower() not in ("", "0", "false", "no")
+
+BUFFER_SIZE = 1024
+PERCENTILES = (50, 90, 99)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class RingBuffer:
+    # The last `size` values, older ones are overwritten
+
+    def __init__(self, size: int = BUFFER_SIZE) -> None:
+        self._values: List[float] = []
+        self._size = size
+        self._next = 0
+
+    def append(self, value: float) -> None:
+        if len(self._values) < self._size:
+            self._values.append(value)
+        else:
+            self._values[self._next] = value
+        self._next = (self._next + 1) % self._size
+
+    def values(self) -> List[float]:
+        return list(self._values)
+
+    def percentiles(self, q=PERCENTILES) -> Dict[int, float]:
+        # Linear interpolation between the closest ranks, as np.percentile
+        if not self._values:
+            return {p: float("nan") for p in q}
+        values = sorted(self._values)
+        out = {}
+        for p in q:
+            pos = (len(values) - 1) * p / 100
+            lo = math.floor(pos)
+            hi = min(lo + 1, len(values) - 1)
+            out[p] = values[lo] + (values[hi] - values[lo]) * (pos - lo)
+        return out
+
+
+class Metric:
+
+    def __init__(self, name: str, kind: str) -> None:
+        self.name = name
+        self.kind = kind
+        self.calls = 0
+        self.total = 0.0
+        self.times = RingBuffer()
+        self.causes: Counter = Counter()
+
+    def record(self, seconds: float, cause: str) -> None:
+        self.calls += 1
+        self.total += seconds
+        self.times.append(seconds)
+        self.causes[cause] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pct = self.times.percentiles()
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "calls": self.calls,
+            "total_s": self.total,
+            **{f"p{p}_s": v for p, v in pct.items()},
+            "causes": dict(self.causes),
+        }
+
+
+class Registry:
+
+    def __init__(self) -> None:
+        # (name, kind) -> metric, e.g. a background job is both the compute
+        # slot and the calc that runs in it
+        self._metrics: Dict[Tuple[str, str], Metric] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, kind: str, seconds: float, cause: str = "") -> None:
+        with self._lock:
+            metric = self._metrics.get((name, kind))
+            if metric is None:
+                metric = self._metrics[(name, kind)] = Metric(name, kind)
+            metric.record(seconds, cause)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [m.snapshot() for m in sorted(self._metrics.values(), key=lambda m: -m.total)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def to_json(self) -> str:
+        return json.dumps({"time": time.time(), "metrics": self.snapshot()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        # Text exposition format, the samples of one metric family together
+        metrics = self.snapshot()
+        families = [
+            ("gym_calls_total", "counter", "Number of calls.", lambda m: [("", m["calls"])]),
+            ("gym_seconds_total", "counter", "Total wall time in seconds.", lambda m: [("", m["total_s"])]),
+            ("gym_seconds", "summary", "Wall time percentiles over the last calls.",
+             lambda m: [(f',quantile="{p / 100}"', m[f"p{p}_s"]) for p in PERCENTILES]),
+        ]
+        lines = []
+        for name, kind, text, samples in families:
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            for m in metrics:
+                labels = f'name="{m["name"]}",kind="{m["kind"]}"'
+                lines += [f"{name}{{{labels}{extra}}} {value}" for extra, value in samples(m)]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        # .prom/.txt as Prometheus text, anything else as JSON
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+registry = Registry()
+
+
+def _wrap(fn: F, name: str, kind: str, cause: Callable[[], str]) -> F:
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            why = cause()
+            t = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                registry.record(name, kind, time.perf_counter() - t, why)
+        return async_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        why = cause()
+        t = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            registry.record(name, kind, time.perf_counter() - t, why)
+    return wrapper  # type: ignore[return-value]
+
+
+def timed(kind: str, name: Optional[str] = None) -> Callable[[F], F]:
+    # For plain functions outside the reactive graph, e.g. WeightCalc.__init__
+    def decorator(fn: F) -> F:
+        if not ENABLED:
+            return fn
+        return _wrap(fn, name or fn.__qualname__, kind, lambda: "call")
+    return decorator
+
+
+def session_tracker(sources: Dict[str, Callable[[], Any]]) -> Callable[..., Callable[[F], F]]:
+    # Decorators for render functions and reactive Calcs of one session. The
+    # invalidation cause is the list of `sources` (inputs and reactive Values,
+    # read isolated) that changed since the function last ran, "init" for the
+    # first run and "reactive" when none of them changed.
+    if not ENABLED:
+        return lambda kind, name=None: (lambda fn: fn)
+
+    from shiny import reactive
+
+    def read(source: Callable[[], Any]) -> Any:
+        try:
+            return source()
+        except Exception:
+            # Inputs the browser hasn't sent yet
+            return None
+
+    last: Dict[str, Dict[str, Any]] = {}
+
+    def cause_of(name: str) -> Callable[[], str]:
+        def cause() -> str:
+            with reactive.isolate():
+                current = {k: read(v) for k, v in sources.items()}
+            previous = last.get(name)
+            last[name] = current
+            if previous is None:
+                return "init"
+            changed = [k for k, v in current.items() if previous[k] != v]
+            return ",".join(changed) if changed else "reactive"
+        return cause
+
+    def track(kind: str, name: Optional[str] = None) -> Callable[[F], F]:
+        def decorator(fn: F) -> F:
+            return _wrap(fn, name or fn.__name__, kind, cause_of(name or fn.__name__))
+        return decorator
+
+    return track
+
+
+def timings_frame() -> "pd.DataFrame":
+    # The admin tab table, times in milliseconds
+    import pandas as pd
+
+    rows = registry.snapshot()
+    df = pd.DataFrame(rows, columns=["name", "kind", "calls", "total_s", "p50_s", "p90_s", "p99_s", "causes"])
+    for c in ("total", "p50", "p90", "p99"):
+        df[f"{c} (ms)"] = (df.pop(f"{c}_s") * 1000).round(3)
+    df["causes"] = df["causes"].map(
+        lambda c: ", ".join(f"{k} ({v})" for k, v in sorted(c.items(), key=lambda kv: -kv[1])))
+    return df[["name", "kind", "calls", "total (ms)", "p50 (ms)", "p90 (ms)", "p99 (ms)", "causes"]]
@@ -0,0 +1,163 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from one_rep_max import estimate
+
+
+# Logged exercise name (lower case) -> lift key used by WeightCalc
+EXERCISE_ALIASES: Dict[str, str] = {
+    "squat": "squats",
+    "squats": "squats",
+    "back squat": "squats",
+    "back squats": "squats",
+    "low bar squat": "squats",
+    "high bar squat": "squats",
+    "bench": "bench",
+    "bench press": "bench",
+    "barbell bench press": "bench",
+    "flat bench press": "bench",
+    "deadlift": "deadlift",
+    "deadlifts": "deadlift",
+    "conventional deadlift": "deadlift",
+    "sumo deadlift": "deadlift",
+}
+
+# Lift key -> argument name of setup_weigth_calc
+LIFT_ARGS = {"squats": "s", "bench": "b", "deadlift": "d"}
+
+LOG_COLUMNS = ["lifter", "date", "exercise", "weight", "reps"]
+
+
+def read_log(path: str, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    # CSV or JSON Lines, read in chunks so memory is bounded by chunksize
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        reader = pd.read_csv(path, chunksize=chunksize)
+    elif ext in (".jsonl", ".ndjson"):
+        reader = pd.read_json(path, lines=True, chunksize=chunksize)
+    else:
+        raise ValueError(f"Unsupported log format {ext!r}, expected .csv or .jsonl")
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def normalize(chunk: pd.DataFrame, formula: str = "epley") -> pd.DataFrame:
+    # Keeps the rows of the three main lifts with a valid e1RM and adds the
+    # lift key and the e1RM
+    missing = [c for c in LOG_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Log is missing column(s) {missing}")
+    lift = chunk["exercise"].astype(str).str.strip().str.lower().map(EXERCISE_ALIASES)
+    df = pd.DataFrame({
+        "lifter": chunk["lifter"].astype(str),
+        "lift": lift,
+        "date": pd.to_datetime(chunk["date"]),
+        "e1rm": estimate(pd.to_numeric(chunk["weight"], errors="coerce"),
+                         pd.to_numeric(chunk["reps"], errors="coerce"),
+                         formula, errors="coerce")
+    })
+    return df.dropna(subset=["lift", "date", "e1rm"])
+
+
+@dataclass
+class _LiftState:
+    best: float = -np.inf
+    latest: Optional[np.datetime64] = None
+    # (date, e1rm) with decreasing e1rm, the only rows that can still be the
+    # trailing-window maximum
+    window: List[Tuple[np.datetime64, float]] = field(default_factory=list)
+
+
+class RollingE1RM:
+    # Rolling best and trailing-window best e1RM per lifter and lift. Each
+    # appended chunk only touches the lifter/lift pairs it contains, history
+    # is never rescanned.
+
+    def __init__(self, window_days: int = 28, formula: str = "epley") -> None:
+        self.window = np.timedelta64(window_days, "D")
+        self.formula = formula
+        self._state: Dict[Tuple[str, str], _LiftState] = {}
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> "RollingE1RM":
+        df = normalize(chunk, self.formula)
+        self.rows += len(df)
+        if df.empty:
+            return self
+
+        # Within the chunk only the rows that are the maximum of everything
+        # logged after them (per lifter and lift) can enter the window
+        df = df.sort_values(["lifter", "lift", "date"])
+        suffix_max = df.iloc[::-1].groupby(["lifter", "lift"], sort=False)["e1rm"].cummax().iloc[::-1]
+        keep = df["e1rm"].to_numpy() >= suffix_max.to_numpy()
+        candidates = df[keep]
+        best = df.groupby(["lifter", "lift"], sort=False)["e1rm"].max()
+
+        for key, rows in candidates.groupby(["lifter", "lift"], sort=False):
+            state = self._state.setdefault(key, _LiftState())
+            state.best = max(state.best, float(best[key]))
+            dates = rows["date"].to_numpy()
+            self._merge(state, list(zip(dates, rows["e1rm"].tolist())))
+        return self
+
+    def _merge(self, state: _LiftState, new: List[Tuple[np.datetime64, float]]) -> None:
+        latest = max(d for d, _ in new)
+        if state.latest is None or latest > state.latest:
+            state.latest = latest
+        start = state.latest - self.window
+        rows = sorted((r for r in state.window + new if r[0] > start), key=lambda r: r[0])
+        window: List[Tuple[np.datetime64, float]] = []
+        for r in reversed(rows):
+            if not window or r[1] > window[-1][1]:
+                window.append(r)
+        state.window = window[::-1]
+
+    def consume(self, chunks: Iterable[pd.DataFrame]) -> "RollingE1RM":
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def best(self, lifter: str, lift: str) -> float:
+        return self._get(lifter, lift).best
+
+    def trailing(self, lifter: str, lift: str, as_of: Optional[str] = None) -> Optional[float]:
+        # Best e1RM within window_days before `as_of` (default: the lifter's
+        # latest logged date for the lift), None if nothing was logged in it.
+        # Only rows that can still be a window maximum are kept, so `as_of`
+        # can't lie before the latest logged date.
+        state = self._get(lifter, lift)
+        end = state.latest if as_of is None else np.datetime64(pd.Timestamp(as_of))
+        if end < state.latest:
+            raise ValueError("as_of must not be before the latest logged date")
+        values = [e for d, e in state.window if end - self.window < d <= end]
+        return max(values) if values else None
+
+    def _get(self, lifter: str, lift: str) -> _LiftState:
+        try:
+            return self._state[(lifter, lift)]
+        except KeyError:
+            raise KeyError(f"No {lift} sets logged for {lifter!r}") from None
+
+    def lifters(self) -> List[str]:
+        return sorted({lifter for lifter, _ in self._state})
+
+    def one_rm(self, lifter: str, trailing: bool = True) -> Dict[str, float]:
+        # Keyword arguments for setup_weigth_calc / WeightCalc: {"s", "b", "d"}.
+        # Falls back to the all-time best when the window is empty.
+        out = {}
+        for lift, arg in LIFT_ARGS.items():
+            value = self.trailing(lifter, lift) if trailing else None
+            out[arg] = self.best(lifter, lift) if value is None else value
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [(lifter, lift, s.best, self.trailing(lifter, lift), s.latest)
+             for (lifter, lift), s in sorted(self._state.items())],
+            columns=["lifter", "lift", "best", "trailing", "latest"]
+        )
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import load_model
+from roster import roster_frame
+from weight_calc import WeightManager
+from weight_engine import LIFTS, ProgramArrays, compute_program
+
+
+# Three training weeks (accumulation, intensification, peaking) + deload,
+# as in MonthlySchedule
+WEEKS_PER_BLOCK = 4
+MAX_BLOCKS = 13
+
+Number = Union[float, int]
+PerLift = Union[Number, Sequence[Number]]
+
+
+@dataclass(frozen=True)
+class LinearProgression:
+    # kg added to each 1RM per block, weight_increase of the weight manager
+    # when None. One value for all lifts or one per lift (ordered as LIFTS).
+    increment: Optional[PerLift] = None
+
+    def project(self, one_rm: np.ndarray, wm: WeightManager) -> np.ndarray:
+        step = wm.weight_increase if self.increment is None else self.increment
+        return one_rm + np.asarray(step, dtype=float)
+
+
+@dataclass(frozen=True)
+class PercentProgression:
+    # Relative gain per block, e.g. 0.025 for 2.5 %
+    rate: PerLift = 0.025
+
+    def project(self, one_rm: np.ndarray, wm: WeightManager) -> np.ndarray:
+        return one_rm * (1 + np.asarray(self.rate, dtype=float))
+
+
+Progression = Union[LinearProgression, PercentProgression]
+
+
+def project(one_rm: Union[Number, np.ndarray], blocks: int, wm: WeightManager,
+            progression: Optional[Progression] = None) -> np.ndarray:
+    # 1RM after `blocks` blocks of projected gains, for a scalar or per lift
+    progression = progression or LinearProgression()
+    x = np.asarray(one_rm, dtype=float)
+    for _ in range(blocks):
+        x = progression.project(x, wm)
+    return x
+
+
+def block_of(week: int) -> Tuple[int, int]:
+    # Week of the plan (0-based) -> (block, week within the block)
+    return divmod(week, WEEKS_PER_BLOCK)
+
+
+class MacroPlan:
+    # N four-week blocks back to back. The 1RM of every block is projected
+    # from the block before it unless it was retested. Programs are computed
+    # per block on first use and kept as long as the block's inputs don't
+    # change, so a retest in block 5 only recomputes block 5 and the blocks
+    # after it whose projected 1RM moved.
+
+    def __init__(self,
+                 weight_manager: Union[str, WeightManager],
+                 one_rm: Sequence[Number],
+                 starting_weights: Sequence[Number],
+                 blocks: int = 3,
+                 progression: Optional[Progression] = None,
+                 warmup_sets: int = 4,
+                 warmup_sets_sec: int = 3) -> None:
+        if not 1 <= blocks <= MAX_BLOCKS:
+            raise ValueError(f"blocks must be between 1 and {MAX_BLOCKS}")
+        if isinstance(weight_manager, WeightManager):
+            self.weight_manager = weight_manager
+        else:
+            self.weight_manager = load_model(weight_manager, WeightManager)
+        self.blocks = blocks
+        self.progression = progression or LinearProgression()
+        self.starting_weights = tuple(float(x) for x in starting_weights)
+        self.warmup_sets = warmup_sets
+        self.warmup_sets_sec = warmup_sets_sec
+
+        self._start = np.asarray(one_rm, dtype=float)
+        # Block -> lift index -> retested 1RM
+        self._retests: Dict[int, Dict[int, float]] = {}
+        # Projected 1RMs, valid for blocks 0 .. len - 1
+        self._one_rm: List[np.ndarray] = []
+        # Block -> (1RMs it was computed from, program)
+        self._programs: Dict[int, Tuple[Tuple[float, ...], ProgramArrays]] = {}
+        # Number of block programs computed so far
+        self.computed = 0
+
+    @property
+    def weeks(self) -> int:
+        return self.blocks * WEEKS_PER_BLOCK
+
+    def _check(self, block: int) -> None:
+        if not 0 <= block < self.blocks:
+            raise IndexError(f"block {block} out of range for a {self.blocks} block plan")
+
+    def _invalidate(self, block: int) -> None:
+        # Later 1RMs are projected again on the next read, the programs are
+        # only recomputed if their 1RMs actually changed
+        del self._one_rm[block:]
+
+    def retest(self, block: int, s: Optional[Number] = None, b: Optional[Number] = None,
+               d: Optional[Number] = None) -> None:
+        # Tested 1RMs replace the projection from `block` on
+        self._check(block)
+        tested = {i: float(v) for i, v in enumerate((s, b, d)) if v is not None}
+        self._retests.setdefault(block, {}).update(tested)
+        self._invalidate(block)
+
+    def clear_retest(self, block: int) -> None:
+        if self._retests.pop(block, None) is not None:
+            self._invalidate(block)
+
+    def set_progression(self, progression: Progression) -> None:
+        self.progression = progression
+        self._invalidate(1)
+
+    def one_rm(self, block: int) -> np.ndarray:
+        self._check(block)
+        while len(self._one_rm) <= block:
+            i = len(self._one_rm)
+            x = self._start if i == 0 else self.progression.project(self._one_rm[-1], self.weight_manager)
+            x = np.array(x, dtype=float)
+            for lift, value in self._retests.get(i, {}).items():
+                x[lift] = value
+            x.flags.writeable = False
+            self._one_rm.append(x)
+        return self._one_rm[block]
+
+    def program(self, block: int) -> ProgramArrays:
+        one_rm = tuple(self.one_rm(block).tolist())
+        cached = self._programs.get(block)
+        if cached is not None and cached[0] == one_rm:
+            return cached[1]
+        p = compute_program(self.weight_manager, one_rm, self.starting_weights,
+                            self.warmup_sets, self.warmup_sets_sec)
+        self._programs[block] = (one_rm, p)
+        self.computed += 1
+        return p
+
+    def programs(self) -> Iterator[Tuple[int, ProgramArrays]]:
+        for block in range(self.blocks):
+            yield block, self.program(block)
+
+    def week(self, week: int) -> Tuple[int, int, ProgramArrays]:
+        # (block, week within the block, program of the block) of a 0-based
+        # week of the plan, only that block is computed
+        if not 0 <= week < self.weeks:
+            raise IndexError(f"week {week} out of range for a {self.weeks} week plan")
+        block, w = block_of(week)
+        return block, w, self.program(block)
+
+    def one_rm_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([self.one_rm(b) for b in range(self.blocks)], columns=list(LIFTS)) \
+            .rename_axis("block").reset_index()
+
+    def to_frame(self) -> pd.DataFrame:
+        # Long format like roster_frame with the block and the week of the
+        # plan (1-based) added
+        frames = []
+        for block, p in self.programs():
+            df = roster_frame(ProgramArrays(main=p.main[None], sec=p.sec[None], deload=p.deload[None]))
+            df = df.drop(columns="athlete")
+            df.insert(0, "block", block)
+            df.insert(1, "plan_week", block * WEEKS_PER_BLOCK + df["week"].astype(int))
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
@@ -1,6 +1,154 @@
-def epley(weight: float, reps: int) -> float:
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+ArrayLike = Union[float, int, Sequence[float], np.ndarray, pd.Series]
+
+
+# The formulas work on scalars as well as NumPy arrays / pandas Series
+
+
+def epley(weight, reps):
     return weight * (1 + (reps / 30))
 
 
-def brzycki(weight: float, reps: int) -> float:
+def brzycki(weight, reps):
     return weight / (1.0278 - (0.0278 * reps))
+
+
+def lombardi(weight, reps):
+    return weight * reps ** 0.10
+
+
+def mayhew(weight, reps):
+    return 100 * weight / (52.2 + 41.9 * np.exp(-0.055 * reps))
+
+
+def oconner(weight, reps):
+    return weight * (1 + 0.025 * reps)
+
+
+def wathan(weight, reps):
+    return 100 * weight / (48.8 + 53.8 * np.exp(-0.075 * reps))
+
+
+@dataclass(frozen=True)
+class Formula:
+    fn: Callable
+    # Reps at or above this are outside the formula's domain
+    max_reps: Optional[float] = None
+
+
+FORMULAS: Dict[str, Formula] = {
+    "epley": Formula(epley),
+    "brzycki": Formula(brzycki, max_reps=37),
+    "lombardi": Formula(lombardi),
+    "mayhew": Formula(mayhew),
+    "oconner": Formula(oconner),
+    "wathan": Formula(wathan),
+}
+
+# NaN-ignoring reductions over axis 0 of a (formula, set) array. np.nanmedian
+# and np.nanmean are several times slower on tens of millions of sets.
+
+
+def _mean(stacked: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(stacked)
+    if valid.all():
+        return stacked.mean(axis=0)
+    return np.where(valid, stacked, 0).sum(axis=0) / valid.sum(axis=0)
+
+
+def _median(stacked: np.ndarray) -> np.ndarray:
+    # Sorted in place, NaNs end up last
+    n = (~np.isnan(stacked)).sum(axis=0)
+    stacked.sort(axis=0)
+    lo = np.take_along_axis(stacked, ((n - 1) // 2)[None], axis=0)[0]
+    hi = np.take_along_axis(stacked, (n // 2)[None], axis=0)[0]
+    return (lo + hi) / 2
+
+
+AGGREGATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "median": _median,
+    "mean": _mean,
+    "max": lambda stacked: np.fmax.reduce(stacked, axis=0),
+    "min": lambda stacked: np.fmin.reduce(stacked, axis=0),
+}
+
+
+def register_formula(name: str, fn: Callable, max_reps: Optional[float] = None) -> None:
+    FORMULAS[name] = Formula(fn, max_reps)
+
+
+def _get(name: str) -> Formula:
+    try:
+        return FORMULAS[name]
+    except KeyError:
+        raise ValueError(f"Unknown formula {name!r}, expected one of {sorted(FORMULAS)}") from None
+
+
+def _invalid(weight: np.ndarray, reps: np.ndarray, max_reps: Optional[float]) -> np.ndarray:
+    bad = ~np.isfinite(weight) | ~np.isfinite(reps) | (weight < 0) | (reps < 1)
+    if max_reps is not None:
+        bad |= reps >= max_reps
+    return bad
+
+
+def _wrap(values: np.ndarray, like: ArrayLike):
+    if isinstance(like, pd.Series):
+        return pd.Series(values, index=like.index, name="e1rm")
+    if values.ndim == 0:
+        return values.item()
+    return values
+
+
+def estimate(weight: ArrayLike, reps: ArrayLike, formula: str = "epley", errors: str = "raise"):
+    # e1RM of every (weight, reps) pair. errors="raise" rejects invalid rows
+    # (negative weight, reps < 1 or outside the formula's range), "coerce"
+    # turns them into NaN.
+    if errors not in ("raise", "coerce"):
+        raise ValueError("errors must be 'raise' or 'coerce'")
+    f = _get(formula)
+    w = np.asarray(weight, dtype=float)
+    r = np.asarray(reps, dtype=float)
+    bad = _invalid(w, r, f.max_reps)
+    if bad.any():
+        if errors == "raise":
+            raise ValueError(f"{int(np.count_nonzero(bad))} set(s) outside the domain of {formula}")
+        r = np.where(bad, np.nan, r)
+    with np.errstate(invalid="ignore"):
+        out = np.asarray(f.fn(w, r), dtype=float)
+    return _wrap(out, weight)
+
+
+def estimate_many(weight: ArrayLike, reps: ArrayLike,
+                  formulas: Optional[Sequence[str]] = None,
+                  agg: Optional[str] = "median"):
+    # Several formulas at once. With agg=None a DataFrame with one column per
+    # formula is returned, otherwise the formulas are combined per set with
+    # the named aggregation, ignoring formulas a set is invalid for.
+    if agg is not None and agg not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation {agg!r}, expected one of {sorted(AGGREGATIONS)}")
+    names = list(formulas or FORMULAS)
+    w = np.asarray(weight, dtype=float)
+    r = np.asarray(reps, dtype=float)
+    # Validated once, only the per-formula rep limits differ
+    bad = _invalid(w, r, None)
+    stacked = np.empty((len(names),) + np.broadcast(w, r).shape)
+    for i, name in enumerate(names):
+        f = _get(name)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stacked[i, ...] = f.fn(w, r)
+        np.copyto(stacked[i, ...], np.nan, where=bad if f.max_reps is None else bad | (r >= f.max_reps))
+
+    if agg is None:
+        index = weight.index if isinstance(weight, pd.Series) else None
+        return pd.DataFrame(dict(zip(names, np.atleast_2d(stacked.T).T)), index=index)
+    limits = [_get(name).max_reps for name in names]
+    all_bad = bad if None in limits else bad | (r >= max(limits))
+    if np.any(all_bad):
+        raise ValueError(f"{int(np.count_nonzero(all_bad))} set(s) invalid for every formula")
+    return _wrap(AGGREGATIONS[agg](stacked), weight)
@@ -0,0 +1,13 @@
+// Sends a random id, kept in the browser, as input.profile_id so the server
+// can restore this browser's profile
+$(document).on("shiny:connected", function () {
+  var key = "gym_profile_id";
+  var id = window.localStorage.getItem(key);
+  if (!id) {
+    id = window.crypto && crypto.randomUUID
+      ? crypto.randomUUID()
+      : Date.now().toString(36) + Math.random().toString(36).slice(2);
+    window.localStorage.setItem(key, id);
+  }
+  Shiny.setInputValue("profile_id", id);
+});
@@ -0,0 +1,159 @@
+// Shows the tables pre-rendered by snapshot.py. Inputs outside the snapshot's
+// ranges are sent to the live app's JSON API instead (api.py).
+(function () {
+  var form = document.getElementById("inputs");
+  var cache = {};
+  var manifest;
+  var pending = 0;
+
+  function get(url, json) {
+    if (!(url in cache)) {
+      cache[url] = fetch(url).then(function (r) {
+        if (!r.ok) {
+          delete cache[url];
+          throw new Error(url + ": " + r.status);
+        }
+        return json ? r.json() : r.text();
+      });
+    }
+    return cache[url];
+  }
+
+  function onGrid(x, range) {
+    // range: [lowest, highest, step]
+    var n = (x - range[0]) / range[2];
+    return x >= range[0] && x <= range[1] && Math.abs(n - Math.round(n)) < 1e-9;
+  }
+
+  function values() {
+    var v = {};
+    ["week", "block", "sw_s", "sw_b", "sw_d", "rm1_s", "rm1_b", "rm1_d"].forEach(function (k) {
+      v[k] = Number(form.elements[k].value);
+    });
+    return v;
+  }
+
+  var ARGS = { squats: "s", bench: "b", deadlift: "d" };
+
+  function inSnapshot(v) {
+    return manifest.blocks.indexOf(v.block) >= 0 && manifest.lifts.every(function (lift) {
+      var r = manifest.ranges[lift];
+      return onGrid(v["rm1_" + ARGS[lift]], r.one_rm) && onGrid(v["sw_" + ARGS[lift]], r.starting_weight);
+    });
+  }
+
+  function session(title, parts) {
+    var html = '<div class="col-sm-4"><h4>' + title + "</h4><p><em>15 min warmup</em></p>";
+    parts.forEach(function (p) {
+      html += (p[0] ? "<h6>" + p[0] + "</h6>" : "") + p[1];
+    });
+    return html + "</div>";
+  }
+
+  function fromSnapshot(v) {
+    // One index per lift and block, then only the fragments of this week
+    return Promise.all(manifest.lifts.map(function (lift) {
+      return get("index/" + lift + "_" + v.block + ".json", true).then(function (index) {
+        return index[v["rm1_" + ARGS[lift]] + ":" + v["sw_" + ARGS[lift]]];
+      });
+    })).then(function (entries) {
+      var byLift = {};
+      manifest.lifts.forEach(function (lift, i) { byLift[lift] = entries[i]; });
+      var frag = function (id) { return get("fragments/" + id + ".html", false); };
+      var s = manifest.static;
+      if (v.week === 3) {
+        return Promise.all(manifest.lifts.map(function (lift) { return frag(byLift[lift].deload); }))
+          .then(function (rows) {
+            return [
+              [manifest.deload_sessions[0], [["", s.full_body_head + rows.join("") + s.full_body_rest + s.full_body_tail]]],
+              [manifest.deload_sessions[1], [["", s.upper_body]]],
+              [manifest.deload_sessions[2], [["", s.lower_body]]]
+            ];
+          });
+      }
+      return Promise.all(manifest.lifts.map(function (lift, i) {
+        var secondary = manifest.secondary_lifts[lift];
+        return Promise.all([frag(byLift[lift].main[v.week]), frag(byLift[secondary].sec[v.week])])
+          .then(function (t) {
+            return [manifest.sessions[i], [["Main lift", t[0]], ["Secondary lift", t[1]]]];
+          });
+      }));
+    });
+  }
+
+  function escape(s) {
+    return String(s).replace(/[&<>"]/g, function (c) {
+      return { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;" }[c];
+    });
+  }
+
+  function formatWeight(w) {
+    // WeightCalc._format_weight: whole kilos without decimals, otherwise one
+    // decimal rounded half to even like Python's round()
+    if (w === Math.round(w)) {
+      return w + "kg";
+    }
+    var t = w * 10;
+    var r = Math.round(t);
+    if (Math.abs(t - Math.floor(t) - 0.5) < 1e-9 && r % 2) {
+      r -= 1;
+    }
+    return r / 10 + "kg";
+  }
+
+  function table(sets, weights) {
+    var columns = weights ? ["lift", "setup", "weight"] : ["lift"];
+    var html = '<table class="dataframe table shiny-table w-auto">\n  <thead>\n    <tr style="text-align: right;">\n';
+    columns.forEach(function (c) { html += "      <th>" + c + "</th>\n"; });
+    html += "    </tr>\n  </thead>\n  <tbody>\n";
+    sets.forEach(function (s) {
+      var row = [s.lift, s.sets === null ? "" : s.sets + "x" + s.reps, s.weight === null ? "" : formatWeight(s.weight)];
+      html += "    <tr>\n";
+      row.slice(0, columns.length).forEach(function (x) { html += "      <td>" + escape(x) + "</td>\n"; });
+      html += "    </tr>\n";
+    });
+    return html + "  </tbody>\n</table>";
+  }
+
+  function fromLive(v) {
+    var q = ["s", "b", "d"].map(function (k) {
+      return k + "=" + v["rm1_" + k] + "&" + k + "0=" + v["sw_" + k];
+    }).join("&") + "&block=" + v.block;
+    return get(manifest.live_url + "api/program?" + q, true).then(function (program) {
+      return program.weeks[v.week].sessions.map(function (s, i) {
+        var weighted = v.week < 3 || i === 0;
+        var parts = [[v.week < 3 ? "Main lift" : "", table(s.main, weighted)]];
+        if (s.secondary) {
+          parts.push(["Secondary lift", table(s.secondary, true)]);
+        }
+        return [s.name, parts];
+      });
+    });
+  }
+
+  function update() {
+    var v = values();
+    var snapshot = inSnapshot(v);
+    var n = ++pending;
+    (snapshot ? fromSnapshot(v) : fromLive(v)).then(function (sessions) {
+      if (n !== pending) {
+        return;
+      }
+      document.getElementById("title").textContent = "Block " + v.block + ", " + manifest.weeks[v.week];
+      document.getElementById("sessions").innerHTML = sessions.map(function (s) {
+        return session(s[0], s[1]);
+      }).join("");
+      document.getElementById("source").textContent = snapshot ? "From the snapshot" : "Computed by the live app";
+    }).catch(function (e) {
+      if (n === pending) {
+        document.getElementById("source").textContent = "Not available: " + e.message;
+      }
+    });
+  }
+
+  get("manifest.json", true).then(function (m) {
+    manifest = m;
+    form.addEventListener("input", update);
+    update();
+  });
+})();
@@ -0,0 +1,158 @@
+import math
+from dataclasses import dataclass
+from functools import reduce
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from pydantic import BaseModel, field_validator
+
+from config import model_hash
+from program_cache import ProgramCache
+
+
+class PlateInventory(BaseModel):
+    bar: float = 20.0
+    # Plate weight (kg) -> number of plates, loaded in pairs so an odd one
+    # out is never used
+    plates: Dict[float, int]
+
+    @field_validator("plates")
+    @classmethod
+    def _positive(cls, v: Dict[float, int]) -> Dict[float, int]:
+        if any(w <= 0 or n < 0 for w, n in v.items()):
+            raise ValueError("plate weights must be positive and counts non-negative")
+        return v
+
+
+@dataclass(frozen=True)
+class Loading:
+    # Plates on one side of the bar, heaviest first
+    plates: Tuple[float, ...]
+
+    @property
+    def count(self) -> int:
+        return len(self.plates)
+
+    def __str__(self) -> str:
+        if not self.plates:
+            return "bar"
+        return " + ".join(f"{p:g}" for p in self.plates)
+
+
+Counts = Tuple[int, ...]
+
+
+class PlateTable:
+    # Every reachable weight of an inventory -> the few loadings with the
+    # fewest plates, solved once by dynamic programming over the plate sizes.
+    # Weights are looked up by their integer number of grid units per side.
+
+    def __init__(self, inventory: PlateInventory, candidates: int = 4) -> None:
+        self.inventory = inventory
+        sizes = sorted((w for w, n in inventory.plates.items() if n >= 2), reverse=True)
+        self.sizes = tuple(sizes)
+        self._per_side = tuple(inventory.plates[w] // 2 for w in sizes)
+        # Grams avoid float drift, the grid is the gcd of all plate sizes
+        grams = [round(w * 1000) for w in sizes]
+        self._unit = reduce(math.gcd, grams, 0) or 1
+        units = [g // self._unit for g in grams]
+
+        # Bounded knapsack, one plate size at a time. Keeping only the best
+        # `candidates` partial loadings per total keeps it small and still
+        # leaves alternatives for sequence().
+        table: Dict[int, List[Counts]] = {0: [()]}
+        for u, n in zip(units, self._per_side):
+            grown: Dict[int, List[Counts]] = {}
+            for total, loadings in table.items():
+                for c in range(n + 1):
+                    grown.setdefault(total + c * u, []).extend(v + (c,) for v in loadings)
+            table = {t: sorted(v, key=_rank)[:candidates] for t, v in grown.items()}
+        self._table = table
+        self._best = {t: self._loading(v[0]) for t, v in table.items()}
+
+    @property
+    def max_weight(self) -> float:
+        return self.inventory.bar + 2 * sum(w * n for w, n in zip(self.sizes, self._per_side))
+
+    def _key(self, weight: float) -> Optional[int]:
+        side = round((weight - self.inventory.bar) / 2 * 1000)
+        if side < 0 or side % self._unit:
+            return None
+        return side // self._unit
+
+    def _loading(self, counts: Counts) -> Loading:
+        return Loading(tuple(w for w, c in zip(self.sizes, counts) for _ in range(c)))
+
+    def candidates(self, weight: float) -> List[Loading]:
+        key = self._key(weight)
+        return [self._loading(c) for c in self._table.get(key, [])] if key is not None else []
+
+    def lookup(self, weight: float) -> Optional[Loading]:
+        # Fewest plates, None if the inventory can't make the weight
+        return self._best.get(self._key(weight))
+
+    def sequence(self, weights: Sequence[float]) -> List[Optional[Loading]]:
+        # Loadings for consecutive sets that minimise plates on the bar plus
+        # plates swapped between sets (starting from an empty bar). A Viterbi
+        # pass over the candidates of each weight, unreachable weights get
+        # None and start over from an empty bar.
+        out: List[Optional[Loading]] = []
+        run: List[List[Counts]] = []
+        for w in weights:
+            key = self._key(w)
+            options = self._table.get(key) if key is not None else None
+            if options:
+                run.append(options)
+                continue
+            out += self._best_path(run)
+            out.append(None)
+            run = []
+        return out + self._best_path(run)
+
+    def _best_path(self, run: List[List[Counts]]) -> List[Loading]:
+        if not run:
+            return []
+        empty = (0,) * len(self.sizes)
+        cost = [sum(v) + _changes(empty, v) for v in run[0]]
+        back: List[List[int]] = []
+        for prev, options in zip(run, run[1:]):
+            step_cost, step_back = [], []
+            for v in options:
+                j = min(range(len(prev)), key=lambda i: cost[i] + _changes(prev[i], v))
+                step_cost.append(cost[j] + _changes(prev[j], v) + sum(v))
+                step_back.append(j)
+            cost = step_cost
+            back.append(step_back)
+        i = min(range(len(cost)), key=cost.__getitem__)
+        path = [i]
+        for step_back in reversed(back):
+            i = step_back[i]
+            path.append(i)
+        return [self._loading(options[i]) for options, i in zip(run, reversed(path))]
+
+
+def _rank(counts: Counts) -> Tuple:
+    # Fewest plates first, then the heavier plates
+    return (sum(counts), tuple(-c for c in counts))
+
+
+def _changes(a: Counts, b: Counts) -> int:
+    # Plates taken off plus plates put on, per side
+    return sum(abs(x - y) for x, y in zip(a, b))
+
+
+plate_tables = ProgramCache(maxsize=16)
+
+
+def plate_table(inventory: PlateInventory) -> PlateTable:
+    # One table per inventory and process
+    return plate_tables.get_or_create(model_hash(inventory), lambda: PlateTable(inventory))
+
+
+def plate_column(table: PlateTable, weights: Sequence[Union[float, str]]) -> List[str]:
+    # Table column for a list of weights, non-numeric entries stay empty
+    numeric = [i for i, w in enumerate(weights) if not isinstance(w, str)]
+    loadings = table.sequence([weights[i] for i in numeric])
+    out = [""] * len(weights)
+    for i, loading in zip(numeric, loadings):
+        out[i] = "n/a" if loading is None else str(loading)
+    return out
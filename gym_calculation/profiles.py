@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import instrumentation
+
+
+# GYM_PROFILES=:memory: keeps profiles for the lifetime of the process only
+PATH = os.environ.get("GYM_PROFILES", "profiles.sqlite")
+# Seconds a change waits for more changes before the batch is written
+BATCH_SECS = 0.5
+# Longest wait before writing again after failed writes, the wait doubles
+# from BATCH_SECS with every failure in a row
+RETRY_MAX_SECS = 30.0
+
+log = logging.getLogger(__name__)
+
+Profile = Dict[str, Any]
+Row = Tuple[str, str, float]
+
+
+class ProfileStore:
+    # Per-user app state (numeric inputs, accessory and prehab picks) in a
+    # SQLite file. Reads only touch an in-memory copy of the table, loaded
+    # once. Updates change that copy right away and are written by a
+    # background task in batches, several changes to a profile within a
+    # batch are one row write.
+
+    def __init__(self, path: str = PATH, batch_secs: float = BATCH_SECS) -> None:
+        self.path = path
+        self.batch_secs = batch_secs
+        self._cache: Optional[Dict[str, Profile]] = None
+        self._load_lock = threading.Lock()
+        self._pending: Dict[str, Profile] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        # The connection is only used from this one thread
+        self._io = ThreadPoolExecutor(1, thread_name_prefix="profiles")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Number of batches written and of failed writes
+        self.writes = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles "
+                "(user TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _read_all(self) -> Dict[str, Profile]:
+        rows = self._connect().execute("SELECT user, data FROM profiles").fetchall()
+        return {user: json.loads(data) for user, data in rows}
+
+    @instrumentation.timed("io", "profile_write")
+    def _write(self, rows: List[Row]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO profiles (user, data, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(user) DO UPDATE SET data = excluded.data, updated = excluded.updated",
+                rows,
+            )
+        self.writes += 1
+
+    def load(self) -> None:
+        # Reads the whole table, once. warm_up does it before the first session
+        with self._load_lock:
+            if self._cache is None:
+                self._cache = self._io.submit(self._read_all).result()
+
+    def get(self, user: str) -> Profile:
+        if self._cache is None:
+            self.load()
+        return dict(self._cache.get(user, {}))
+
+    def update(self, user: str, **values: Any) -> None:
+        # Only touches memory, call it from the event loop
+        if self._cache is None:
+            self.load()
+        profile = self._cache.setdefault(user, {})
+        # Stored as JSON, so tuples (multiple selects) compare as lists
+        values = {k: list(v) if isinstance(v, tuple) else v for k, v in values.items()}
+        changed = {k: v for k, v in values.items() if profile.get(k) != v}
+        if not changed:
+            return
+        profile.update(changed)
+        self._pending[user] = profile
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+        self._wakeup.set()
+
+    def _take_batch(self) -> List[Row]:
+        batch, self._pending = self._pending, {}
+        now = time.time()
+        return [(user, json.dumps(profile), now) for user, profile in batch.items()]
+
+    async def _write_batch(self) -> None:
+        rows = self._take_batch()
+        if not rows:
+            return
+        try:
+            # Shielded, so close() cancelling the writer doesn't lose the batch
+            await asyncio.shield(asyncio.get_running_loop().run_in_executor(self._io, self._write, rows))
+        except sqlite3.Error:
+            # Back in the queue (a profile changed since keeps its newer
+            # state) for the next batch, the caller decides about the error
+            self.errors += 1
+            for user, _, _ in rows:
+                self._pending.setdefault(user, self._cache[user])
+            raise
+
+    async def _write_loop(self) -> None:
+        failures = 0
+        delay = self.batch_secs
+        while True:
+            await self._wakeup.wait()
+            # Changes coming in meanwhile end up in the same batch
+            await asyncio.sleep(delay)
+            self._wakeup.clear()
+            try:
+                await self._write_batch()
+            except sqlite3.Error as e:
+                # The traceback once, then a line per retry
+                if failures == 0:
+                    log.exception("Saving %d profile(s) failed, trying again", len(self._pending))
+                else:
+                    log.warning("Saving %d profile(s) failed %d times in a row: %s",
+                                len(self._pending), failures + 1, e)
+                failures += 1
+                delay = min(delay * 2, max(RETRY_MAX_SECS, self.batch_secs))
+                self._wakeup.set()
+            else:
+                if failures:
+                    log.info("Saved profiles again after %d failed write(s)", failures)
+                failures = 0
+                delay = self.batch_secs
+
+    async def flush(self) -> None:
+        # Writes what is pending now instead of after the batch delay, raises
+        # sqlite3.Error if that fails (the batch stays pending)
+        await self._write_batch()
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+        try:
+            await self.flush()
+        finally:
+            if self._conn is not None:
+                await asyncio.get_running_loop().run_in_executor(self._io, self._conn.close)
+                self._conn = None
+
+
+store = ProfileStore()
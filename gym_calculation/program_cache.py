@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Hashable, Optional, Sequence, Tuple, TypeVar, Union
+
+from config import model_hash
+from instrumentation import timed
+from weight_calc import WeightCalc, WeightManager
+
+if TYPE_CHECKING:
+    from weight_engine import ProgramArrays
+
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class ProgramCache:
+    # Process-wide, thread-safe LRU cache. Values are shared between sessions
+    # so they must not be mutated by the caller.
+
+    def __init__(self, maxsize: int = 512) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return self._data[key]
+            self._misses += 1
+
+        # Computed outside the lock, two threads missing on the same key at
+        # the same time both compute it and the last one wins
+        return self.put(key, factory())
+
+    def put(self, key: Hashable, value: T) -> T:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[object]:
+        # The cached value or None, without computing it. Counted as a hit or
+        # a miss, a miss is then filled in with put.
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return self._data[key]
+            self._misses += 1
+            return None
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+Number = Union[float, int]
+
+weight_calc_cache = ProgramCache()
+lift_program_cache = ProgramCache(maxsize=1024)
+
+
+def program_key(one_rm: Sequence[Number],
+                starting_weights: Sequence[Number],
+                warmup_sets: int,
+                warmup_sets_sec: int,
+                weight_manager: WeightManager) -> Tuple:
+    return (
+        tuple(float(x) for x in one_rm),
+        tuple(float(x) for x in starting_weights),
+        warmup_sets,
+        warmup_sets_sec,
+        model_hash(weight_manager)
+    )
+
+
+def cached_weight_calc(weight_manager: WeightManager,
+                       s: Number, b: Number, d: Number,
+                       s0: Number, b0: Number, d0: Number,
+                       warmup_sets: int = 4,
+                       warmup_sets_sec: int = 3,
+                       cache: ProgramCache = weight_calc_cache) -> WeightCalc:
+    key = program_key((s, b, d), (s0, b0, d0), warmup_sets, warmup_sets_sec, weight_manager)
+    return cache.get_or_create(key, lambda: WeightCalc(
+        weight_manager=weight_manager,
+        s=s, b=b, d=d,
+        s0=s0, b0=b0, d0=d0,
+        warmup_sets=warmup_sets,
+        warmup_sets_sec=warmup_sets_sec
+    ))
+
+
+def cached_lift_program(weight_manager: WeightManager,
+                        lift: str,
+                        one_rm: Number,
+                        starting_weight: Number,
+                        warmup_sets: int = 4,
+                        warmup_sets_sec: int = 3,
+                        cache: ProgramCache = lift_program_cache) -> "ProgramArrays":
+    # A single lift, so that a change to one lift does not touch the others.
+    # The lift axis is dropped: main/sec are (week, set), deload is (2,).
+    key = (lift,) + program_key((one_rm,), (starting_weight,), warmup_sets, warmup_sets_sec, weight_manager)
+
+    @timed("weight_calc", "lift_program")
+    def factory() -> "ProgramArrays":
+        from weight_engine import ProgramArrays, compute_program
+
+        p = compute_program(weight_manager, [one_rm], [starting_weight],
+                            warmup_sets, warmup_sets_sec, lifts=(lift,))
+        p = ProgramArrays(main=p.main[0], sec=p.sec[0], deload=p.deload[0])
+        for a in (p.main, p.sec, p.deload):
+            a.flags.writeable = False
+        return p
+
+    return cache.get_or_create(key, factory)
@@ -0,0 +1,55 @@
+import time
+from typing import Callable, Optional, TypeVar
+
+from shiny import reactive
+
+
+T = TypeVar("T")
+
+
+def debounce(delay_secs: float) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    # Reactive debounce: the returned Calc only invalidates once its source has
+    # stopped changing for `delay_secs`, so typing "102.5" is one change and not
+    # five. The first value is passed through straight away.
+    def wrapper(f: Callable[[], T]) -> Callable[[], T]:
+        when: reactive.Value[Optional[float]] = reactive.Value(None)
+        trigger = reactive.Value(0)
+        primed = False
+
+        @reactive.Calc
+        def cached():
+            return f()
+
+        @reactive.Effect(priority=102)
+        def primer():
+            nonlocal primed
+            try:
+                cached()
+            except Exception:
+                pass
+            finally:
+                if primed:
+                    when.set(time.monotonic() + delay_secs)
+                primed = True
+
+        @reactive.Effect(priority=101)
+        def timer():
+            deadline = when()
+            if deadline is None:
+                return
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                with reactive.isolate():
+                    when.set(None)
+                    trigger.set(trigger() + 1)
+            else:
+                reactive.invalidate_later(time_left)
+
+        @reactive.Calc
+        @reactive.event(trigger, ignore_none=False, ignore_init=False)
+        def debounced():
+            return cached()
+
+        return debounced
+
+    return wrapper
@@ -0,0 +1,94 @@
+from typing import Iterator, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import load_model
+from weight_calc import WeightManager
+from weight_engine import LIFTS, ProgramArrays, compute_programs
+
+
+ArrayLike = Union[Sequence[float], np.ndarray, pd.Series]
+
+PARTS = ("main", "secondary", "deload")
+WEEKS = (1, 2, 3)
+DELOAD_WEEK = 4
+
+
+def _as_manager(weight_manager: Union[str, WeightManager]) -> WeightManager:
+    if isinstance(weight_manager, WeightManager):
+        return weight_manager
+    return load_model(weight_manager, WeightManager)
+
+
+def _stack(a: ArrayLike, b: ArrayLike, c: ArrayLike) -> np.ndarray:
+    out = np.column_stack([np.asarray(a, dtype=float),
+                           np.asarray(b, dtype=float),
+                           np.asarray(c, dtype=float)])
+    if not np.isfinite(out).all():
+        raise ValueError("Roster values must be finite numbers")
+    return out
+
+
+def iter_roster(s: ArrayLike, b: ArrayLike, d: ArrayLike,
+                s0: ArrayLike, b0: ArrayLike, d0: ArrayLike,
+                weight_manager: Union[str, WeightManager],
+                warmup_sets: int = 4,
+                warmup_sets_sec: int = 3,
+                chunk_size: int = 50_000) -> Iterator[Tuple[int, ProgramArrays]]:
+    # Yields (offset of the first athlete, programs of the chunk) so memory
+    # stays bounded by chunk_size regardless of the roster size
+    wm = _as_manager(weight_manager)
+    one_rm = _stack(s, b, d)
+    starting_weights = _stack(s0, b0, d0)
+    if one_rm.shape != starting_weights.shape:
+        raise ValueError("1RMs and starting weights must have the same length")
+
+    for i in range(0, len(one_rm), chunk_size):
+        yield i, compute_programs(wm, one_rm[i:i + chunk_size], starting_weights[i:i + chunk_size],
+                                  warmup_sets, warmup_sets_sec)
+
+
+def compute_roster(s: ArrayLike, b: ArrayLike, d: ArrayLike,
+                   s0: ArrayLike, b0: ArrayLike, d0: ArrayLike,
+                   weight_manager: Union[str, WeightManager],
+                   warmup_sets: int = 4,
+                   warmup_sets_sec: int = 3,
+                   chunk_size: int = 10_000) -> ProgramArrays:
+    # Arrays indexed by (athlete, lift, week, set), lifts ordered as LIFTS.
+    # Working through the roster in chunks keeps the temporaries cache sized,
+    # which is faster than one pass over everything.
+    chunks = [p for _, p in iter_roster(s, b, d, s0, b0, d0, weight_manager, warmup_sets,
+                                        warmup_sets_sec, chunk_size)]
+    if not chunks:
+        return compute_programs(_as_manager(weight_manager), np.empty((0, 3)), np.empty((0, 3)),
+                                warmup_sets, warmup_sets_sec)
+    if len(chunks) == 1:
+        return chunks[0]
+    return ProgramArrays(
+        main=np.concatenate([p.main for p in chunks]),
+        sec=np.concatenate([p.sec for p in chunks]),
+        deload=np.concatenate([p.deload for p in chunks])
+    )
+
+
+def _long(values: np.ndarray, part: str, weeks: Sequence[int], offset: int) -> pd.DataFrame:
+    # values: (athlete, lift, week, set)
+    idx = np.indices(values.shape, dtype=np.int32).reshape(4, -1)
+    return pd.DataFrame({
+        "athlete": idx[0] + offset,
+        "lift": pd.Categorical.from_codes(idx[1], LIFTS),
+        "week": np.asarray(weeks, dtype=np.int8)[idx[2]],
+        "part": pd.Categorical.from_codes(np.full(idx.shape[1], PARTS.index(part), dtype=np.int8), PARTS),
+        "set": (idx[3] + 1).astype(np.int8),
+        "weight": values.reshape(-1)
+    })
+
+
+def roster_frame(program: ProgramArrays, offset: int = 0) -> pd.DataFrame:
+    # Long format: one row per athlete, lift, week, part and set
+    return pd.concat([
+        _long(program.main, "main", WEEKS, offset),
+        _long(program.sec, "secondary", WEEKS, offset),
+        _long(program.deload[:, :, None, :], "deload", (DELOAD_WEEK,), offset)
+    ], ignore_index=True)
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch import InlineExecutor, format_weights
+from config import load_model, model_hash
+from create_schedule import DELOAD_TITLES, LIFT_NAMES, SESSION_TITLES, WEEK_TITLES, ExerciseBucket, MonthlySchedule
+from export import PARAMS
+from gym_schedule import SetTable
+from macrocycle import MAX_BLOCKS, project
+from table_cache import table_html
+from weight_calc import WeightManager
+from weight_engine import LIFTS, compute_programs
+
+
+# Bumped when the layout of the snapshot changes
+VERSION = 1
+
+# Same limits and steps as the app's inputs
+RM1_STEP = 2.5
+SW_STEP = 10
+RM1_RANGE = (20.0, 250.0)
+SW_RANGES = {"squats": (20, 70), "bench": (20, 70), "deadlift": (40, 70)}
+
+# Program of one lift at one grid point: content hash of every fragment
+Entry = Dict[str, Any]
+
+
+def grid(lo: float, hi: float, step: float) -> np.ndarray:
+    return np.arange(lo, hi + step / 2, step)
+
+
+def key(one_rm: float, starting_weight: float) -> str:
+    # "72.5:20", the same as String() of the numbers in snapshot.js
+    return f"{one_rm:g}:{starting_weight:g}"
+
+
+def fragment_id(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()[:16]
+
+
+def _tbody(html: str) -> str:
+    # The <tr> rows of a table rendered by table_html
+    return html[html.index("<tbody>") + len("<tbody>\n"):html.index("  </tbody>")]
+
+
+def _split_table(html: str) -> Tuple[str, str]:
+    # (everything up to the rows, everything after them)
+    start = html.index("<tbody>") + len("<tbody>\n")
+    end = html.index("  </tbody>")
+    return html[:start], html[end:]
+
+
+# Worker side, one schedule and weight manager per process
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(weight_manager: str, accessory: str, prehab: str) -> None:
+    _worker["wm"] = load_model(weight_manager, WeightManager)
+    _worker["gym"] = MonthlySchedule(load_model(accessory, ExerciseBucket), load_model(prehab, ExerciseBucket))
+
+
+def _render(table: SetTable, weights: List[str], cache: Dict[Tuple, str]) -> str:
+    # Neighbouring 1RMs often round to the same weights, those are rendered
+    # once
+    k = (id(table), tuple(weights))
+    if k not in cache:
+        cache[k] = table_html(table.to_frame(weights))
+    return cache[k]
+
+
+def _build_chunk(lift: str, block: int, one_rm: List[float],
+                 starting_weights: List[float]) -> Tuple[str, int, Dict[str, Entry], Dict[str, str]]:
+    # Every (1RM, starting weight) pair of the chunk for one lift and block.
+    # Returns (lift, block, key -> entry, fragment id -> HTML).
+    gym: MonthlySchedule = _worker["gym"]
+    wm: WeightManager = _worker["wm"]
+    rm, sw = (np.array(x, dtype=float) for x in zip(*[(r, s) for r in one_rm for s in starting_weights]))
+    p = compute_programs(wm, project(rm, block - 1, wm)[:, None], sw[:, None],
+                         warmup_sets=(gym.sets_main - 1), warmup_sets_sec=(gym.sets_sec - 1), lifts=(lift,))
+    session = gym.main_lifts.index(lift)
+    # The session that has this lift as its secondary lift
+    secondary = [gym.secondary_lifts[m] for m in gym.main_lifts].index(lift)
+    full_body = gym.sessions_week_four()[0]
+    deload_rows = SetTable(tuple(r for r in full_body.rows if r.lift == LIFT_NAMES[lift]), full_body.columns)
+
+    cache: Dict[Tuple, str] = {}
+    fragments: Dict[str, str] = {}
+    entries: Dict[str, Entry] = {}
+
+    def add(html: str) -> str:
+        f = fragment_id(html)
+        fragments[f] = html
+        return f
+
+    for n, (r, s) in enumerate(zip(rm.tolist(), sw.tolist())):
+        entries[key(r, s)] = {
+            "main": [add(_render(gym.main_part()[w][session], format_weights(p.main[n, 0, w]), cache))
+                     for w in range(3)],
+            "sec": [add(_render(gym.secondary_part()[w][secondary], format_weights(p.sec[n, 0, w]), cache))
+                    for w in range(3)],
+            "deload": add(_tbody(_render(deload_rows, format_weights(p.deload[n, 0]), cache))),
+        }
+    return lift, block, entries, fragments
+
+
+def _static_fragments(gym: MonthlySchedule) -> Dict[str, Any]:
+    # The parts of Week 4 without per-lift weights. The full body table is
+    # its head, the rows of every main lift in order, the rest and its tail.
+    full_body, upper_body, lower_body = gym.sessions_week_four()
+    lifted = 2 * len(gym.main_lifts)
+    rest = SetTable(full_body.rows[lifted:], full_body.columns)
+    head, tail = _split_table(table_html(full_body.to_frame([""] * len(full_body))))
+    return {
+        "full_body_head": head,
+        "full_body_rest": _tbody(table_html(rest.to_frame([""] * len(rest)))),
+        "full_body_tail": tail,
+        "upper_body": table_html(upper_body.to_frame()),
+        "lower_body": table_html(lower_body.to_frame()),
+    }
+
+
+def build(output: str,
+          one_rm: Optional[Dict[str, Tuple[float, float]]] = None,
+          starting_weights: Optional[Dict[str, Tuple[float, float]]] = None,
+          blocks: Sequence[int] = (1,),
+          live_url: str = "../",
+          workers: Optional[int] = None,
+          chunk_size: int = 8,
+          weight_manager: str = os.path.join(PARAMS, "weight_manager.json"),
+          accessory: str = os.path.join(PARAMS, "exercises_acc.json"),
+          prehab: str = os.path.join(PARAMS, "exercises_prehab.json"),
+          progress: bool = True) -> Dict[str, int]:
+    # Pre-renders the weight tables of every phase for every 1RM and starting
+    # weight in the ranges (lowest, highest per lift, the app's steps) and
+    # block into `output`:
+    #   manifest.json              ranges, titles and the Week 4 parts
+    #   index/<lift>_<block>.json  "1RM:starting weight" -> fragment ids
+    #   fragments/<id>.html        every distinct table once
+    # plus index.html and snapshot.js to show them without a server.
+    one_rm = {lift: (one_rm or {}).get(lift, RM1_RANGE) for lift in LIFTS}
+    starting_weights = {lift: (starting_weights or {}).get(lift, SW_RANGES[lift]) for lift in LIFTS}
+    for b in blocks:
+        if not 1 <= b <= MAX_BLOCKS:
+            raise ValueError(f"Blocks must be between 1 and {MAX_BLOCKS}")
+    workers = workers or os.cpu_count() or 1
+    init_args = (weight_manager, accessory, prehab)
+    _init_worker(*init_args)
+    gym: MonthlySchedule = _worker["gym"]
+    if workers == 1:
+        executor: Executor = InlineExecutor()
+    else:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args)
+
+    os.makedirs(os.path.join(output, "index"), exist_ok=True)
+    os.makedirs(os.path.join(output, "fragments"), exist_ok=True)
+    ranges = {lift: {"one_rm": [*map(float, one_rm[lift]), RM1_STEP],
+                     "starting_weight": [*map(float, starting_weights[lift]), SW_STEP]}
+              for lift in LIFTS}
+    manifest = {
+        "version": VERSION,
+        "config": model_hash(_worker["wm"]),
+        "blocks": list(blocks),
+        "lifts": list(gym.main_lifts),
+        "secondary_lifts": gym.secondary_lifts,
+        "ranges": ranges,
+        "weeks": list(WEEK_TITLES),
+        "sessions": list(SESSION_TITLES),
+        "deload_sessions": list(DELOAD_TITLES),
+        "static": _static_fragments(gym),
+        "live_url": live_url,
+    }
+
+    written: set = set()
+    stats = {"entries": 0, "fragments": 0, "unique": 0}
+    start = time.perf_counter()
+    try:
+        futures = []
+        for lift in LIFTS:
+            rm = grid(*one_rm[lift], RM1_STEP).tolist()
+            sw = grid(*starting_weights[lift], SW_STEP).tolist()
+            for b in blocks:
+                for i in range(0, len(rm), chunk_size):
+                    futures.append(executor.submit(_build_chunk, lift, b, rm[i:i + chunk_size], sw))
+        indexes: Dict[Tuple[str, int], Dict[str, Entry]] = {}
+        for n, future in enumerate(futures, start=1):
+            lift, b, entries, fragments = future.result()
+            indexes.setdefault((lift, b), {}).update(entries)
+            stats["entries"] += len(entries)
+            stats["fragments"] += sum(len(e["main"]) + len(e["sec"]) + 1 for e in entries.values())
+            # Content addressed, a fragment seen before is already on disk
+            for f, html in fragments.items():
+                if f not in written:
+                    with open(os.path.join(output, "fragments", f"{f}.html"), "w", encoding="utf-8") as fh:
+                        fh.write(html)
+                    written.add(f)
+            if progress:
+                print(f"\r{n}/{len(futures)} chunks  {len(written):,} fragments  "
+                      f"{time.perf_counter() - start:.1f} s", end="", file=sys.stderr, flush=True)
+    finally:
+        executor.shutdown(cancel_futures=True)
+    if progress:
+        print(file=sys.stderr)
+
+    for (lift, b), entries in indexes.items():
+        with open(os.path.join(output, "index", f"{lift}_{b}.json"), "w", encoding="utf-8") as f:
+            json.dump(entries, f, separators=(",", ":"))
+    with open(os.path.join(output, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    for name in ("snapshot.html", "snapshot.js", "style.css"):
+        target = "index.html" if name == "snapshot.html" else name
+        shutil.copyfile(os.path.join(PARAMS, name), os.path.join(output, target))
+    stats["unique"] = len(written)
+    return stats
+
+
+def _range(text: str) -> Tuple[float, float]:
+    lo, _, hi = text.partition(":")
+    return float(lo), float(hi or lo)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render the app's weight tables for a range of inputs")
+    parser.add_argument("output", help="output directory, served as static files")
+    for lift, arg in zip(LIFTS, "sbd"):
+        parser.add_argument(f"--rm1-{arg}", type=_range, default=RM1_RANGE, metavar="LOW:HIGH",
+                            help=f"{lift} 1RMs, in {RM1_STEP:g} kg steps (default: {RM1_RANGE[0]:g}:{RM1_RANGE[1]:g})")
+        parser.add_argument(f"--sw-{arg}", type=_range, default=SW_RANGES[lift], metavar="LOW:HIGH",
+                            help=f"{lift} starting weights, in {SW_STEP} kg steps "
+                                 f"(default: {SW_RANGES[lift][0]}:{SW_RANGES[lift][1]})")
+    parser.add_argument("--blocks", default="1", help="comma separated blocks of the macrocycle")
+    parser.add_argument("--live-url", default="../",
+                        help="the running app, for values outside the ranges (default: the parent path)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=8, help="1RMs per task")
+    parser.add_argument("--weight-manager", default=os.path.join(PARAMS, "weight_manager.json"))
+    parser.add_argument("--accessory", default=os.path.join(PARAMS, "exercises_acc.json"))
+    parser.add_argument("--prehab", default=os.path.join(PARAMS, "exercises_prehab.json"))
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = build(args.output,
+                  {lift: getattr(args, f"rm1_{arg}") for lift, arg in zip(LIFTS, "sbd")},
+                  {lift: getattr(args, f"sw_{arg}") for lift, arg in zip(LIFTS, "sbd")},
+                  [int(b) for b in args.blocks.split(",")], args.live_url, args.workers, args.chunk_size,
+                  args.weight_manager, args.accessory, args.prehab, progress=not args.quiet)
+    print(f"Wrote {stats['entries']:,} programs ({stats['fragments']:,} tables, {stats['unique']:,} distinct) "
+          f"to {args.output} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import datetime
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from create_schedule import MonthlySchedule
+from roster import roster_frame
+from weight_engine import LIFTS, ProgramArrays
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS athletes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS one_rm_tests (
+    id INTEGER PRIMARY KEY,
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id),
+    lift TEXT NOT NULL,
+    date TEXT NOT NULL,
+    weight REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_one_rm_tests ON one_rm_tests (athlete_id, lift, date);
+CREATE TABLE IF NOT EXISTS planned_sets (
+    id INTEGER PRIMARY KEY,
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id),
+    lift TEXT NOT NULL,
+    date TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    part TEXT NOT NULL,
+    set_no INTEGER NOT NULL,
+    sets INTEGER,
+    reps INTEGER,
+    weight REAL
+);
+CREATE INDEX IF NOT EXISTS ix_planned_sets ON planned_sets (athlete_id, lift, date);
+CREATE TABLE IF NOT EXISTS completed_sets (
+    id INTEGER PRIMARY KEY,
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id),
+    lift TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sets INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    weight REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_completed_sets ON completed_sets (athlete_id, lift, date);
+"""
+
+PLANNED_COLUMNS = ["athlete_id", "lift", "date", "week", "part", "set_no", "sets", "reps", "weight"]
+COMPLETED_COLUMNS = ["athlete_id", "lift", "date", "sets", "reps", "weight"]
+
+Date = Union[str, datetime.date]
+
+
+def _iso(date: Date) -> str:
+    return date if isinstance(date, str) else date.isoformat()
+
+
+class ConnectionPool:
+    # A fixed number of connections handed out one thread at a time. SQLite
+    # serializes writers anyway; WAL lets readers run next to the writer.
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        for _ in range(size):
+            conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._pool.put(conn)
+            self._all.append(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self) -> None:
+        for conn in self._all:
+            conn.close()
+
+
+class TrainingStore:
+
+    def __init__(self, path: str, pool_size: int = 4) -> None:
+        self.pool = ConnectionPool(path, size=pool_size)
+        with self.pool.transaction() as conn:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    # Athletes
+
+    def add_athletes(self, names: Sequence[str]) -> List[int]:
+        # Ids in the order of `names`, existing athletes are reused
+        with self.pool.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO athletes (name) VALUES (?)", ((n,) for n in names))
+            ids = dict(conn.execute(
+                f"SELECT name, id FROM athletes WHERE name IN ({','.join('?' * len(names))})", list(names)
+            ).fetchall()) if names else {}
+        return [ids[n] for n in names]
+
+    def athlete_id(self, name: str) -> Optional[int]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT id FROM athletes WHERE name = ?", (name,)).fetchone()
+        return None if row is None else row[0]
+
+    # Writes
+
+    def add_one_rm_tests(self, rows: Iterable[Tuple[int, str, Date, float]]) -> None:
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO one_rm_tests (athlete_id, lift, date, weight) VALUES (?, ?, ?, ?)",
+                ((a, lift, _iso(d), float(w)) for a, lift, d, w in rows))
+
+    def add_completed_sets(self, rows: Iterable[Tuple[int, str, Date, int, int, float]]) -> None:
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO completed_sets (athlete_id, lift, date, sets, reps, weight) VALUES (?, ?, ?, ?, ?, ?)",
+                ((a, lift, _iso(d), int(s), int(r), float(w)) for a, lift, d, s, r, w in rows))
+
+    def add_planned_sets(self, athlete_ids: Sequence[int], program: ProgramArrays,
+                         gym: MonthlySchedule, start: Date) -> int:
+        # A whole roster's month (athlete_ids[i] <-> program athlete i) as one
+        # bulk transaction, returns the number of rows written
+        df = planned_frame(athlete_ids, program, gym, start)
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO planned_sets ({', '.join(PLANNED_COLUMNS)}) VALUES ({', '.join('?' * len(PLANNED_COLUMNS))})",
+                df.itertuples(index=False, name=None))
+        return len(df)
+
+    # Reads, all served by the (athlete, lift, date) indexes
+
+    def _query(self, table: str, columns: Sequence[str], athlete_id: int,
+               lift: Optional[str], start: Optional[Date], end: Optional[Date]) -> pd.DataFrame:
+        sql = f"SELECT {', '.join(columns)} FROM {table} WHERE athlete_id = ?"
+        params: list = [athlete_id]
+        if lift is not None:
+            sql += " AND lift = ?"
+            params.append(lift)
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(_iso(start))
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(_iso(end))
+        sql += " ORDER BY lift, date"
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=list(columns))
+
+    def history(self, athlete_id: int, lift: Optional[str] = None,
+                start: Optional[Date] = None, end: Optional[Date] = None) -> pd.DataFrame:
+        return self._query("completed_sets", COMPLETED_COLUMNS, athlete_id, lift, start, end)
+
+    def planned(self, athlete_id: int, lift: Optional[str] = None,
+                start: Optional[Date] = None, end: Optional[Date] = None) -> pd.DataFrame:
+        return self._query("planned_sets", PLANNED_COLUMNS, athlete_id, lift, start, end)
+
+    def one_rm_history(self, athlete_id: int, lift: Optional[str] = None,
+                       start: Optional[Date] = None, end: Optional[Date] = None) -> pd.DataFrame:
+        return self._query("one_rm_tests", ["athlete_id", "lift", "date", "weight"], athlete_id, lift, start, end)
+
+
+def _set_scheme(gym: MonthlySchedule) -> pd.DataFrame:
+    # (part, week, lift, set) -> (sets, reps) from the schedule templates
+    rows = []
+    for w, (main, sec) in enumerate(zip(gym.main_part(), gym.secondary_part()), start=1):
+        for i, lift in enumerate(LIFTS):
+            for j, r in enumerate(main[i].rows, start=1):
+                rows.append(("main", w, lift, j, r.sets, r.reps))
+            # The secondary table of session i trains the secondary lift of i
+            for j, r in enumerate(sec[i].rows, start=1):
+                rows.append(("secondary", w, gym.secondary_lifts[lift], j, r.sets, r.reps))
+    full_body = gym.deloading.full_body_session()
+    for lift in LIFTS:
+        for j, r in enumerate([r for r in full_body.rows if r.lift == lift], start=1):
+            rows.append(("deload", 4, lift, j, r.sets, r.reps))
+    return pd.DataFrame(rows, columns=["part", "week", "lift", "set", "sets", "reps"])
+
+
+def planned_frame(athlete_ids: Sequence[int], program: ProgramArrays,
+                  gym: MonthlySchedule, start: Date) -> pd.DataFrame:
+    df = roster_frame(program)
+    df = df.astype({"lift": str, "part": str, "week": int, "set": int})
+    df = df.merge(_set_scheme(gym), on=["part", "week", "lift", "set"], how="left")
+    start = pd.Timestamp(_iso(start))
+    week_dates = {w: (start + pd.Timedelta(days=7 * (w - 1))).date().isoformat() for w in range(1, 5)}
+    return pd.DataFrame({
+        "athlete_id": np.asarray(athlete_ids, dtype=np.int64)[df["athlete"].to_numpy()],
+        "lift": df["lift"],
+        "date": df["week"].map(week_dates),
+        "week": df["week"],
+        "part": df["part"],
+        "set_no": df["set"],
+        "sets": df["sets"].astype("Int64"),
+        "reps": df["reps"].astype("Int64"),
+        "weight": df["weight"],
+    })[PLANNED_COLUMNS].astype(object).where(lambda x: x.notna(), None)
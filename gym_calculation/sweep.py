@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.io.formats.style import Styler
+from pydantic import BaseModel
+
+from config import model_hash
+from program_cache import ProgramCache
+from weight_calc import WeightManager
+from weight_engine import LIFTS, round_to_increment, working_weights
+
+
+# Weights per grid point, deload has no week axis
+FIELDS = {
+    "top": "Top set",
+    "working": "Working sets",
+    "top_sec": "Secondary top set",
+    "working_sec": "Secondary working sets",
+    "deload": "Deload",
+}
+
+
+class SweepVariant(BaseModel):
+    # Percentages to try instead of the weight manager's, None keeps its value
+    name: str
+    prc_squats: Optional[List[float]] = None
+    prc_bench: Optional[List[float]] = None
+    prc_deadlift: Optional[List[float]] = None
+    prc_working: Optional[List[float]] = None
+    prc_deload: Optional[float] = None
+
+    def overrides(self) -> Dict:
+        return self.model_dump(exclude={"name"}, exclude_none=True)
+
+    def apply(self, wm: WeightManager) -> WeightManager:
+        return wm.model_copy(update=self.overrides())
+
+
+@dataclass(eq=False)
+class Sweep:
+    variants: Tuple[str, ...]
+    increments: Tuple[float, ...]
+    # (lift, point), a lift with a shorter range is padded with NaN
+    one_rm: np.ndarray
+    # Field -> (variant, increment, lift, point, week), deload without week
+    weights: Dict[str, np.ndarray]
+
+    @property
+    def size(self) -> int:
+        # Grid points: variants x increments x every lift's 1RMs
+        return len(self.variants) * len(self.increments) * int(np.count_nonzero(~np.isnan(self.one_rm)))
+
+    def _points(self, lift: str) -> Tuple[int, np.ndarray]:
+        i = LIFTS.index(lift)
+        return i, ~np.isnan(self.one_rm[i])
+
+    def table(self, lift: str, field: str = "working", week: Optional[int] = None) -> pd.DataFrame:
+        # One row per 1RM, one column per variant, weight increase and week
+        # (only the given 0-based week if there is one)
+        i, keep = self._points(lift)
+        data = self.weights[field][:, :, i][:, :, keep]
+        if data.ndim == 4 and week is not None:
+            data = data[..., week]
+        weeks = [None] if data.ndim == 3 else range(data.shape[-1])
+        if data.ndim == 3:
+            data = data[..., None]
+        columns = [
+            f"{v} +{inc:g}kg" + ("" if w is None else f" W{w + 1}")
+            for v in self.variants for inc in self.increments for w in weeks
+        ]
+        # (variant, increment, point, week) -> (point, variant, increment, week)
+        frame = pd.DataFrame(np.moveaxis(data, 2, 0).reshape(data.shape[2], -1), columns=columns)
+        frame.insert(0, "1RM", self.one_rm[i][keep])
+        return frame
+
+    def to_frame(self) -> pd.DataFrame:
+        # Long format, one row per grid point and week
+        frames = []
+        for v, variant in enumerate(self.variants):
+            for n, inc in enumerate(self.increments):
+                for i, lift in enumerate(LIFTS):
+                    _, keep = self._points(lift)
+                    weeks = self.weights["top"].shape[-1]
+                    df = pd.DataFrame({
+                        "variant": variant,
+                        "weight_increase": inc,
+                        "lift": lift,
+                        "one_rm": np.repeat(self.one_rm[i][keep], weeks),
+                        "week": np.tile(np.arange(1, weeks + 1), int(keep.sum())),
+                    })
+                    for field in FIELDS:
+                        x = self.weights[field][v, n, i][keep]
+                        df[field] = np.repeat(x, weeks) if field == "deload" else x.ravel()
+                    frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+
+def compute_sweep(wm: WeightManager,
+                  one_rm: Mapping[str, Tuple[float, float]],
+                  step: float = 2.5,
+                  variants: Sequence[SweepVariant] = (),
+                  increments: Sequence[float] = ()) -> Sweep:
+    # The working set rules of weight_engine over the whole grid in one
+    # broadcast: (variant, increment, lift, 1RM, week). The weight manager
+    # itself is always the first variant, "current". one_rm: (lowest,
+    # highest) per lift, in `step` kg steps.
+    variants = [SweepVariant(name="current"), *variants]
+    increments = tuple(float(x) for x in increments) or (wm.weight_increase,)
+    managers = [v.apply(wm) for v in variants]
+    weeks = len(wm.prc_working)
+    for m, v in zip(managers, variants):
+        if any(len(getattr(m, f"prc_{k}")) != weeks for k in (*LIFTS, "working")):
+            raise ValueError(f"variant {v.name!r} needs {weeks} percentages per lift")
+
+    ranges = [np.arange(lo, hi + step / 2, step) for lo, hi in (one_rm[lift] for lift in LIFTS)]
+    rm = np.full((len(LIFTS), max(len(r) for r in ranges)), np.nan)
+    for i, r in enumerate(ranges):
+        rm[i, :len(r)] = r
+
+    prc = np.array([[getattr(m, f"prc_{lift}") for lift in LIFTS] for m in managers])
+    prc_working = np.array([m.prc_working for m in managers])
+    prc_deload = np.array([m.prc_deload for m in managers])
+    inc = np.asarray(increments)
+
+    top, working, top_sec, working_sec = working_weights(
+        rm[None, None, :, :, None],
+        prc[:, None, :, None, :],
+        prc_working[:, None, None, None, :],
+        inc[None, :, None, None, None],
+    )
+    deload = round_to_increment(prc_deload[:, None, None, None] * rm[None, None],
+                                inc[None, :, None, None])
+    return Sweep(
+        variants=tuple(v.name for v in variants),
+        increments=increments,
+        one_rm=rm,
+        weights={"top": top, "working": working, "top_sec": top_sec,
+                 "working_sec": working_sec, "deload": deload},
+    )
+
+
+sweeps = ProgramCache(maxsize=32)
+
+
+def sweep(wm: WeightManager,
+          one_rm: Mapping[str, Tuple[float, float]],
+          step: float = 2.5,
+          variants: Sequence[SweepVariant] = (),
+          increments: Sequence[float] = ()) -> Sweep:
+    # Memoized by the grid, shared between sessions
+    key = (
+        model_hash(wm),
+        tuple((lift, *map(float, one_rm[lift])) for lift in LIFTS),
+        float(step),
+        tuple(model_hash(v) for v in variants),
+        tuple(float(x) for x in increments),
+    )
+    return sweeps.get_or_create(key, lambda: compute_sweep(wm, one_rm, step, variants, increments))
+
+
+def heatmap(frame: pd.DataFrame, low: str = "#f8f9fa", high: str = "#78c2ad") -> Styler:
+    # Background from `low` to `high` by weight over the whole table, the
+    # 1RM column stays plain
+    columns = [c for c in frame.columns if c != "1RM"]
+    values = frame[columns].to_numpy(dtype=float)
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    t = (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values)
+    a, b = (np.array([int(c[i:i + 2], 16) for i in (1, 3, 5)]) for c in (low, high))
+    rgb = np.rint(a + t[..., None] * (b - a)).astype(int)
+    css = pd.DataFrame([[f"background-color: #{r:02x}{g:02x}{b_:02x}" for r, g, b_ in row] for row in rgb],
+                       index=frame.index, columns=columns)
+    return frame.style.hide(axis="index") \
+        .format("{:g}", subset=columns).format("{:g}", subset=["1RM"]) \
+        .apply(lambda _: css, axis=None, subset=columns) \
+        .set_table_attributes('class="table shiny-table w-auto"')
@@ -0,0 +1,69 @@
+from typing import TYPE_CHECKING, Callable, Hashable, Optional, Sequence
+
+from shiny.render.transformer import TransformerMetadata, ValueFn, output_transformer, resolve_value_fn
+
+from gym_schedule import SetTable
+from program_cache import ProgramCache
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from create_schedule import MonthlySchedule
+
+
+# The arguments render.table passes to DataFrame.to_html
+TABLE_CLASSES = "table shiny-table w-auto"
+
+html_cache = ProgramCache(maxsize=1024)
+
+
+def table_html(frame: "pd.DataFrame") -> str:
+    # Same markup as render.table
+    return frame.to_html(index=False, classes=TABLE_CLASSES, border=0)
+
+
+@output_transformer
+async def HtmlTransformer(
+    _meta: TransformerMetadata,
+    _fn: ValueFn[Optional[str]],
+) -> Optional[dict]:
+    html = await resolve_value_fn(_fn)
+    if html is None:
+        return None
+    return {"deps": [], "html": html}
+
+
+def render_html(_fn: Optional[HtmlTransformer.ValueFn] = None):
+    # Like render.table, for functions that return the table's HTML already
+    # rendered, e.g. from html_cache. Goes into a ui.output_table container.
+    return HtmlTransformer(_fn)
+
+
+def cached_html(key: Hashable, build: Callable[[], "pd.DataFrame"]) -> str:
+    return html_cache.get_or_create(key, lambda: table_html(build()))
+
+
+def selection_html(selection: Sequence[str]) -> str:
+    # The accessory and prehab tables: one column "0" with the picked exercises
+    def build() -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame(list(selection))
+    return cached_html(("selection", tuple(selection)), build)
+
+
+def set_table_html(table: SetTable, weight: Optional[Sequence[str]] = None) -> str:
+    # SetTables are frozen, so the table itself is the key
+    key = ("set_table", table, None if weight is None else tuple(weight))
+    return cached_html(key, lambda: table.to_frame(weight))
+
+
+def prerender(gym: "MonthlySchedule") -> None:
+    # Every accessory option, the default prehab picks and the deload
+    # sessions, so that opening the modals or Week 4 renders nothing
+    for lift in gym.main_lifts:
+        for exercise in getattr(gym.accessory, lift):
+            selection_html([exercise])
+        selection_html(getattr(gym.prehab, lift)[:2])
+    for table in gym.sessions_week_four():
+        set_table_html(table)
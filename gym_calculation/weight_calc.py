@@ -1,10 +1,13 @@
-import json
-from typing import Dict, Optional, List, Union
+from typing import Dict, List, Union
 
-import numpy as np
-import pandas as pd
 from pydantic import BaseModel
 
+from config import load_model
+from instrumentation import timed
+
+# weight_engine (and with it NumPy) is imported on first use, so that
+# importing WeightManager for app.py stays cheap
+
 
 class WeightManager(BaseModel):
     weight_increase: float
@@ -17,15 +20,18 @@ class WeightManager(BaseModel):
 
 
 class WeightCalc:
+    @timed("weight_calc", "WeightCalc")
     def __init__(self,
-                 weight_manager: str,
+                 weight_manager: Union[str, WeightManager],
                  s: Union[float, int], b: Union[float, int], d: Union[float, int],
                  s0: Union[float, int], b0: Union[float, int], d0: Union[float, int],
                  warmup_sets: int = 4,
                  warmup_sets_sec: int = 3) -> None:
         
-        with open(weight_manager, "r", encoding="utf-8") as f:
-            self.weight_manager = WeightManager(**json.load(f))
+        if isinstance(weight_manager, WeightManager):
+            self.weight_manager = weight_manager
+        else:
+            self.weight_manager = load_model(weight_manager, WeightManager)
  
         self.warmup_sets = warmup_sets
         self.warmup_sets_sec = warmup_sets_sec
@@ -52,52 +58,33 @@ class WeightCalc:
         self._setup_weights()
     
     def _setup_weights(self):
-        # Main lifts
-        one_rep = {
-            k: [self._round_set(x * self.one_rm[k]) for x in self.prc[k]] for k in self.lifts
-        }
-        self.weights = {}
-        for k in self.lifts:
-            w = []
-            for x, y in zip(one_rep[k], self.weight_manager.prc_working):
-                self._round_set(x * y)
-                w.append(self._get_warmup_weights(k, x, self.warmup_sets) + [self._round_set(x * y)])
-            self.weights[k] = w
-
-        # Secondary lifts
-        one_rep_sec = {
-            k: [self._round_set(i*0.9) for i in one_rep[k]] for k in self.lifts
-        }
-        self.weights_sec = {}
-        for k in self.lifts:
-            w = []
-            for x, y in zip(one_rep_sec[k], self.weights[k]):
-                w.append(self._get_warmup_weights(k, x, self.warmup_sets_sec) + [self._round_set(y[-1]*0.9725)])
-            self.weights_sec[k] = w
-
-        # Deload week weights        
-        self.deload_weights = {}
-        for k in self.lifts:
-            self.deload_weights[k] = [self.weight_manager.starting_weights_deload[k]] + [self._round_set(self.weight_manager.prc_deload * self.one_rm[k])]
+        # All lifts and weeks in one pass, see weight_engine
+        from weight_engine import compute_program
+
+        self.program = compute_program(
+            self.weight_manager,
+            one_rm=[self.one_rm[k] for k in self.lifts],
+            starting_weights=[self.starting_weights[k] for k in self.lifts],
+            warmup_sets=self.warmup_sets,
+            warmup_sets_sec=self.warmup_sets_sec
+        )
+        self.weights = {k: self.program.main[i].tolist() for i, k in enumerate(self.lifts)}
+        self.weights_sec = {k: self.program.sec[i].tolist() for i, k in enumerate(self.lifts)}
+        self.deload_weights = {k: self.program.deload[i].tolist() for i, k in enumerate(self.lifts)}
 
     def _round_set(self, x: Union[int, float]):
-        # Based on 2.5
-        y = round(x, -1) - 10
-        y = [y + self.weight_manager.weight_increase*i for i in range(10)]
-        z = [abs(i - x) for i in y]
-        z = np.where(pd.Series(z) == min(z))[0][0]        
-        return y[z]
+        # Based on weight_increase (2.5)
+        from weight_engine import round_to_increment
+
+        return round_to_increment(x, self.weight_manager.weight_increase).item()
 
     def _get_warmup_weights(self, lift: str, x: Union[float, int], s: int):
         # FIXME: ugly hardcoding
-        if lift != "bench":
-            y = np.linspace(self.starting_weights[lift], x, s)
-            y = [self._round_set(i) for i in y]
-            y = [round(i, -1) if i < 40 else i for i in y]
-        else:
-            y = np.linspace(self.starting_weights[lift] + 10, x, s - 1)
-            y = [self.starting_weights[lift]] + [self._round_set(i) for i in y]
-        return y
+        from weight_engine import warmup_weights
+
+        return warmup_weights(self.starting_weights[lift], x, s,
+                              self.weight_manager.weight_increase,
+                              bench=(lift == "bench")).tolist()
 
     def get_weights(self, lift: str, main: bool = True):
         if main:
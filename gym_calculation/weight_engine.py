@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from weight_calc import WeightManager
+
+
+LIFTS = ("squats", "bench", "deadlift")
+SEC_FACTOR = 0.9
+SEC_WORKING_FACTOR = 0.9725
+
+
+@dataclass
+class ProgramArrays:
+    # main:   (athlete, lift, week, set) -> warmup sets + one working set
+    # sec:    (athlete, lift, week, set) -> warmup sets + one working set
+    # deload: (athlete, lift, 2)         -> starting weight, deload weight
+    main: np.ndarray
+    sec: np.ndarray
+    deload: np.ndarray
+
+    def __len__(self) -> int:
+        return self.main.shape[0]
+
+
+def round_to_increment(x: Union[float, np.ndarray], increment: Union[float, np.ndarray]) -> np.ndarray:
+    # Closed form of the old candidate search: grid points starting ten below
+    # the nearest multiple of ten and going up in `increment` steps, the
+    # nearest one wins and ties go to the lower one. The old search stopped
+    # at ten points, which only reach x for increments of about 2 kg and up,
+    # smaller increments get as many points as it takes (the same result for
+    # larger ones).
+    x = np.asarray(x, dtype=float)
+    base = np.round(x, -1) - 10
+    last = np.maximum(8, np.ceil(20 / np.asarray(increment)))
+    k = np.clip(np.floor((x - base) / increment), 0, last)
+    lo = base + increment * k
+    hi = base + increment * (k + 1)
+    return np.where(np.abs(hi - x) < np.abs(lo - x), hi, lo)
+
+
+def warmup_weights(start: np.ndarray, top: np.ndarray, sets: int,
+                   increment: float, bench: bool = False) -> np.ndarray:
+    # `start` and `top` broadcast against each other, the sets are added as
+    # the last axis.
+    start, top = np.broadcast_arrays(np.asarray(start, dtype=float), np.asarray(top, dtype=float))
+    if not bench:
+        y = round_to_increment(np.linspace(start, top, sets, axis=-1), increment)
+        return np.where(y < 40, np.round(y, -1), y)
+    y = round_to_increment(np.linspace(start + 10, top, sets - 1, axis=-1), increment)
+    return np.concatenate([start[..., None], y], axis=-1)
+
+
+def working_weights(one_rm: np.ndarray, prc: np.ndarray, prc_working: np.ndarray,
+                    increment: Union[float, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Top and working set of the main and the secondary lift, everything
+    # broadcasts (weeks are the last axis of prc and prc_working)
+    top = round_to_increment(prc * one_rm, increment)
+    working = round_to_increment(top * prc_working, increment)
+    top_sec = round_to_increment(top * SEC_FACTOR, increment)
+    working_sec = round_to_increment(working * SEC_WORKING_FACTOR, increment)
+    return top, working, top_sec, working_sec
+
+
+def compute_programs(wm: "WeightManager",
+                     one_rm: np.ndarray,
+                     starting_weights: np.ndarray,
+                     warmup_sets: int = 4,
+                     warmup_sets_sec: int = 3,
+                     lifts: Sequence[str] = LIFTS) -> ProgramArrays:
+    # one_rm and starting_weights: (athlete, lift) with lifts ordered as `lifts`
+    one_rm = np.atleast_2d(np.asarray(one_rm, dtype=float))
+    starting_weights = np.atleast_2d(np.asarray(starting_weights, dtype=float))
+    inc = wm.weight_increase
+
+    prc = np.array([getattr(wm, f"prc_{lift}") for lift in lifts], dtype=float)
+    prc_working = np.asarray(wm.prc_working, dtype=float)
+    bench = [i for i, lift in enumerate(lifts) if lift == "bench"]
+    start = starting_weights[:, :, None]
+
+    # (athlete, lift, week)
+    top, working, top_sec, working_sec = working_weights(one_rm[:, :, None], prc[None], prc_working, inc)
+
+    def sets(top: np.ndarray, working: np.ndarray, n: int) -> np.ndarray:
+        out = np.empty(top.shape + (n + 1,))
+        out[..., :n] = warmup_weights(start, top, n, inc)
+        if bench:
+            out[:, bench, :, :n] = warmup_weights(start[:, bench], top[:, bench], n, inc, bench=True)
+        out[..., n] = working
+        return out
+
+    deload_start = np.array([wm.starting_weights_deload[lift] for lift in lifts], dtype=float)
+    deload = np.stack([
+        np.broadcast_to(deload_start, one_rm.shape),
+        round_to_increment(wm.prc_deload * one_rm, inc)
+    ], axis=-1)
+
+    return ProgramArrays(
+        main=sets(top, working, warmup_sets),
+        sec=sets(top_sec, working_sec, warmup_sets_sec),
+        deload=deload
+    )
+
+
+def compute_program(wm: "WeightManager",
+                    one_rm: Sequence[float],
+                    starting_weights: Sequence[float],
+                    warmup_sets: int = 4,
+                    warmup_sets_sec: int = 3,
+                    lifts: Sequence[str] = LIFTS) -> ProgramArrays:
+    # Single athlete, the leading axis is dropped
+    p = compute_programs(wm, np.asarray(one_rm)[None], np.asarray(starting_weights)[None],
+                         warmup_sets, warmup_sets_sec, lifts)
+    return ProgramArrays(main=p.main[0], sec=p.sec[0], deload=p.deload[0])
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The app's modules import each other as top-level modules and read their
+# configs relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "gym_calculation"))
+os.chdir(ROOT)
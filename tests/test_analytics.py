@@ -0,0 +1,43 @@
+import pytest
+
+from analytics import TOTAL, LoadRollup, LoadSet
+
+
+def test_replace_plan_applies_only_the_difference():
+    load = LoadRollup()
+    plan = [LoadSet(1, "Squats", 3, 5, 100.0, 125.0), LoadSet(1, "Squats", 1, 5, 80.0, 125.0)]
+    assert load.replace_plan("Planned", "squats", plan)
+    version = load.version
+    assert load.get("Planned", 1, "Squats").tonnage == 1900
+    assert load.get("Planned", 1).volume == 20
+
+    # Same plan again: nothing to apply
+    assert not load.replace_plan("Planned", "squats", list(plan))
+    assert load.version == version
+
+    # One set changed: one removal and one addition
+    plan[0] = LoadSet(1, "Squats", 3, 5, 102.5, 125.0)
+    assert load.replace_plan("Planned", "squats", plan)
+    assert load.version == version + 2
+    assert load.get("Planned", 1, "Squats").tonnage == pytest.approx(1937.5)
+    assert load.get("Planned", 1, TOTAL).tonnage == pytest.approx(1937.5)
+
+
+def test_replace_plan_keeps_other_keys():
+    load = LoadRollup()
+    load.replace_plan("Planned", "squats", [LoadSet(1, "Squats", 3, 5, 100.0)])
+    load.replace_plan("Planned", "bench", [LoadSet(1, "Bench", 3, 5, 60.0)])
+    load.replace_plan("Planned", "squats", [])
+    assert load.get("Planned", 1, "Squats").volume == 0
+    assert load.get("Planned", 1).tonnage == 900
+    assert list(load.to_frame("Planned")["lift"]) == ["Bench", TOTAL]
+
+
+def test_replace_plan_counts_repeated_sets():
+    load = LoadRollup()
+    s = LoadSet(2, "Deadlift", 1, 5, 140.0, 180.0)
+    load.replace_plan("Planned", "deadlift", [s, s])
+    load.replace_plan("Planned", "deadlift", [s])
+    sums = load.get("Planned", 2, "Deadlift")
+    assert (sums.volume, sums.tonnage) == (5, 700)
+    assert sums.avg_intensity == pytest.approx(100 * 140 / 180)
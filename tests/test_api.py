@@ -0,0 +1,100 @@
+import asyncio
+import gzip
+import json
+import zlib
+from urllib.parse import urlencode
+
+import pytest
+from starlette.requests import Request
+
+from api import ProgramApi, negotiate
+from config import load_model
+from create_schedule import ExerciseBucket, MonthlySchedule
+
+QUERY = {"s": 100, "b": 80, "d": 140, "s0": 20, "b0": 20, "d0": 60}
+
+
+@pytest.fixture(scope="module")
+def api():
+    gym = MonthlySchedule(load_model("gym_calculation/params/exercises_acc.json", ExerciseBucket),
+                          load_model("gym_calculation/params/exercises_prehab.json", ExerciseBucket))
+    names = {i: f"name {i}" for i in range(4)}
+    return ProgramApi(gym, "gym_calculation/params/weight_manager.json", names, names, names)
+
+
+def get(api, query=QUERY, **headers):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/program",
+        "query_string": urlencode(query).encode(),
+        "headers": [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    return asyncio.run(api.program(Request(scope)))
+
+
+def test_program_json(api):
+    r = get(api)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    doc = json.loads(r.body)
+    assert doc["one_rm"] == {"squats": 100, "bench": 80, "deadlift": 140}
+    assert len(doc["weeks"]) == 4
+    # Top set of week 1, see test_weight_calc
+    assert doc["weeks"][0]["sessions"][0]["main"][3]["weight"] == 70
+
+
+def test_etag_revalidation(api):
+    r = get(api)
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "no-cache"
+    cached = get(api, if_none_match=etag)
+    assert cached.status_code == 304
+    assert cached.body == b""
+    assert cached.headers["etag"] == etag
+    assert get(api, if_none_match=f"W/{etag}").status_code == 304
+    assert get(api, if_none_match='"other"').status_code == 200
+    assert get(api, {**QUERY, "s": 102.5}).headers["etag"] != etag
+
+
+def test_content_codings(api):
+    plain = get(api)
+    packed = get(api, accept_encoding="gzip, deflate")
+    assert packed.headers["content-encoding"] == "gzip"
+    assert packed.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(packed.body) == plain.body
+    assert packed.headers["etag"] != plain.headers["etag"]
+    # The gzip ETag doesn't revalidate the identity response
+    assert get(api, if_none_match=packed.headers["etag"]).status_code == 200
+    deflated = get(api, accept_encoding="deflate")
+    assert zlib.decompress(deflated.body) == plain.body
+
+
+def test_negotiate():
+    assert negotiate(None) == "identity"
+    assert negotiate("deflate, gzip;q=0.5") == "deflate"
+    assert negotiate("gzip;q=0, identity") == "identity"
+    assert negotiate("*") == "gzip"
+
+
+@pytest.mark.parametrize("query", [{**QUERY, "s": "x"}, {**QUERY, "b": -1}, {"s": 100}, {**QUERY, "block": 999}])
+def test_bad_queries(api, query):
+    r = get(api, query)
+    assert r.status_code == 400
+    assert "detail" in json.loads(r.body)
+
+
+def test_responses_are_cached(api):
+    get(api, {**QUERY, "d": 150})
+    before = api.responses.info()
+    get(api, {**QUERY, "d": 150}, accept_encoding="gzip")
+    after = api.responses.info()
+    assert after.hits == before.hits + 1
+    assert after.misses == before.misses
+
+
+def test_miss_counted_once(api):
+    before = api.responses.info()
+    get(api, {**QUERY, "d": 160})
+    after = api.responses.info()
+    assert (after.hits, after.misses) == (before.hits, before.misses + 1)
@@ -0,0 +1,93 @@
+import json
+from urllib.parse import urlencode
+
+import pytest
+from starlette.requests import Request
+
+from catalog import TOP_K, ExerciseCatalog, ExerciseIndex, ExerciseTags, serve_search
+from config import load_model
+from create_schedule import ExerciseBucket
+
+NAMES = [f"Exercise {i}" for i in range(TOP_K + 5)]
+
+ACC = "gym_calculation/params/exercises_acc.json"
+TAGS = "gym_calculation/params/exercise_tags.json"
+
+
+class Session:
+    # The parts of a Shiny session serve_search uses
+    def __init__(self):
+        self.routes = {}
+
+    def send_input_message(self, id, message):
+        pass
+
+    def dynamic_route(self, name, handler):
+        self.routes[name] = handler
+        return name
+
+
+@pytest.fixture
+def search():
+    session = Session()
+    serve_search(session, "acc", ExerciseIndex(NAMES, ExerciseCatalog()), [])
+    handler = session.routes["search_acc"]
+
+    def get(**params):
+        request = Request({"type": "http", "method": "GET", "query_string": urlencode(params).encode(),
+                           "headers": []})
+        return handler(request)
+    return get
+
+
+@pytest.mark.parametrize("maxop, n", [(5, 5), (1000, TOP_K), (0, 1), (-3, 1)])
+def test_maxop_clamped(search, maxop, n):
+    r = search(query="", maxop=maxop)
+    assert r.status_code == 200
+    assert len(json.loads(r.body)) == n
+
+
+@pytest.mark.parametrize("maxop", ["x", "2.5", ""])
+def test_bad_maxop(search, maxop):
+    assert search(query="", maxop=maxop).status_code == 400
+
+
+
+@pytest.fixture
+def index():
+    # All accessories, tagged as in the app
+    bucket = load_model(ACC, ExerciseBucket)
+    return ExerciseIndex(bucket.squats + bucket.bench + bucket.deadlift, load_model(TAGS, ExerciseCatalog))
+
+
+def test_prefix(index):
+    assert index.search("Dead") == ["Romanian Deadlifts"]
+    assert index.search("good morn") == ["Good Mornings", "Seated Good Mornings"]
+    assert index.search("squ") == index.search("squats")
+
+
+def test_every_word_must_match(index):
+    # "tri" prefixes the triceps tag of the presses only
+    assert index.search("press tri") == ["Overhead Press", "Dumbbell Press", "Close-Grip Bench Press"]
+    assert index.search("tri press") == index.search("press tri")
+    assert index.search("press curl") == []
+
+
+def test_name_beats_tag():
+    index = ExerciseIndex(["Leg Press", "Squats"],
+                          ExerciseCatalog(exercises={"Leg Press": ExerciseTags(pattern=["squat"])}))
+    assert index.search("squats") == ["Squats", "Leg Press"]
+    assert index.search("squ") == ["Squats", "Leg Press"]
+
+
+def test_one_typo(index):
+    # Transposed letters share a deletion with the word (symmetric delete)
+    squats = ["Pause Squats", "Platz Squats", "Front Squats", "Goblet Squats"]
+    assert index.search("sqaut")[:4] == squats
+    assert index.search("sqauts")[:4] == squats
+    assert index.search("deadlitfs") == ["Romanian Deadlifts"]
+    # A dropped letter
+    assert index.search("prss") == ["Leg Press", "Overhead Press", "Dumbbell Press", "Close-Grip Bench Press"]
+    # Two edits, or too short for typos
+    assert index.search("sqaaut") == []
+    assert index.search("lgs") == []
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from shiny import reactive
+from shiny.types import SilentException
+
+import compute
+
+
+def read(fn):
+    with reactive.isolate():
+        return fn()
+
+
+def test_tracked_job_still_pickles(monkeypatch):
+    # GYM_COMPUTE=process: the job goes to another process as it is, the
+    # timing stays on the event loop
+    async def main():
+        runs = []
+
+        def track(execute):
+            async def timed():
+                runs.append("start")
+                return await execute()
+            return timed
+
+        c = compute.SessionCompute()
+        x = reactive.Value(2)
+
+        @c.background("square", track)
+        def square():
+            return functools.partial(pow, x(), 2)
+
+        await reactive.flush()
+        await compute.drain()
+        x.set(5)
+        await reactive.flush()
+        await compute.drain()
+        return read(square), runs
+
+    pool = ProcessPoolExecutor(1)
+    monkeypatch.setattr(compute, "_executor", pool)
+    try:
+        assert asyncio.run(main()) == (25, ["start", "start"])
+    finally:
+        pool.shutdown()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ThreadPoolExecutor(4)
+    monkeypatch.setattr(compute, "_executor", pool)
+    yield pool
+    pool.shutdown()
+
+
+def sleep_then(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def test_newer_job_wins_over_a_slow_one(pool):
+    async def main():
+        c = compute.SessionCompute()
+        job = reactive.Value((0.3, "old"))
+
+        @c.background("slow")
+        def result():
+            return functools.partial(sleep_then, *job())
+
+        await reactive.flush()
+        await asyncio.sleep(0.05)
+        # The old job is still running in the pool when the new one starts
+        job.set((0.01, "new"))
+        await reactive.flush()
+        await compute.drain()
+        first = read(result)
+        # Long after the old job finished
+        await asyncio.sleep(0.4)
+        await compute.drain()
+        return first, read(result), c.cancelled
+
+    assert asyncio.run(main()) == ("new", "new", 1)
+
+
+def test_session_limit(pool):
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return True
+
+    async def main(limit):
+        c = compute.SessionCompute(limit=limit)
+        results = [c.background(f"job{i}")(lambda: job) for i in range(4)]
+        await reactive.flush()
+        await compute.drain()
+        return [read(r) for r in results]
+
+    assert asyncio.run(main(1)) == [True] * 4
+    assert peak[0] == 1
+    peak[0] = 0
+    asyncio.run(main(2))
+    assert peak[0] == 2
+
+
+def test_cancel_all_drops_running_jobs(pool):
+    async def main():
+        c = compute.SessionCompute()
+        result = c.background("slow")(lambda: functools.partial(sleep_then, 0.1, "late"))
+        await reactive.flush()
+        c.cancel_all()
+        await compute.drain()
+        await asyncio.sleep(0.15)
+        with pytest.raises(SilentException):
+            read(result)
+
+    asyncio.run(main())
+
+
+def test_failed_job_raises_on_read(pool):
+    async def main():
+        c = compute.SessionCompute()
+        result = c.background("bad")(lambda: functools.partial(int, "x"))
+        await reactive.flush()
+        await compute.drain()
+        with pytest.raises(ValueError):
+            read(result)
+
+    asyncio.run(main())
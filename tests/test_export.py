@@ -0,0 +1,83 @@
+import csv
+import json
+
+import pytest
+
+from config import load_model
+from create_schedule import SESSION_TITLES, ExerciseBucket, MonthlySchedule
+from export import CSV_COLUMNS, athlete_plan, export, plan_html
+from roster import compute_roster
+from weight_calc import WeightCalc
+
+WM = "gym_calculation/params/weight_manager.json"
+
+
+@pytest.fixture
+def roster(tmp_path):
+    path = tmp_path / "roster.csv"
+    path.write_text("athlete,s,b,d,s0,b0,d0\n"
+                    "sara,100,80,140,20,20,60\n"
+                    "kim,102,80,140,20,20,60\n"
+                    "alex/1,150,110,200,40,20,60\n")
+    return str(path)
+
+
+def calc(s, b, d, s0, b0, d0):
+    return WeightCalc(WM, s, b, d, s0, b0, d0, warmup_sets=4, warmup_sets_sec=3)
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, 1000), (1, 2), (2, 1)])
+def test_csv(roster, tmp_path, workers, chunk_size):
+    out = tmp_path / "plans.csv"
+    assert export(roster, str(out), "csv", workers=workers, chunk_size=chunk_size, progress=False) == 3
+    with open(out, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CSV_COLUMNS
+    assert [r[0] for r in rows[1:]] == sorted([r[0] for r in rows[1:]], key=["sara", "kim", "alex/1"].index)
+
+    squats = [r for r in rows[1:] if r[0] == "alex/1" and r[1] == "2" and r[2] == SESSION_TITLES[0]
+              and r[3] == "Main lift"]
+    assert [r[6] for r in squats] == [WeightCalc._format_weight(w)
+                                      for w in calc(150, 110, 200, 40, 20, 60).weights["squats"][1]]
+    assert all(r[5] for r in squats)
+
+
+def test_json(roster, tmp_path):
+    out = tmp_path / "plans.jsonl"
+    export(roster, str(out), "json", workers=1, progress=False)
+    plans = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [p["athlete"] for p in plans] == ["sara", "kim", "alex/1"]
+    assert len(plans[0]["weeks"]) == 4
+    deadlift = plans[0]["weeks"][0]["sessions"][2]["parts"][0]
+    assert deadlift["title"] == "Main lift"
+    assert [s["weight"] for s in deadlift["sets"]] == [WeightCalc._format_weight(w)
+                                                      for w in calc(100, 80, 140, 20, 20, 60).weights["deadlift"][0]]
+
+
+def test_html(roster, tmp_path):
+    out = tmp_path / "html"
+    export(roster, str(out), "html", workers=1, progress=False)
+    assert sorted(p.name for p in out.iterdir()) == [
+        "0000000_sara.html", "0000001_kim.html", "0000002_alex_1.html", "style.css"]
+    sara = (out / "0000000_sara.html").read_text()
+    assert "<h1>sara</h1>" in sara and '<link rel="stylesheet" href="style.css">' in sara
+    # 4 tables per session in weeks 1-3, one per deload session
+    assert sara.count("<table") == 3 * 3 * 4 + 3
+
+
+def test_html_cache_is_shared_safely():
+    gym = MonthlySchedule(load_model("gym_calculation/params/exercises_acc.json", ExerciseBucket),
+                          load_model("gym_calculation/params/exercises_prehab.json", ExerciseBucket))
+    program = compute_roster([100, 102, 150], [80, 80, 110], [140, 140, 200], [20, 20, 40], [20, 20, 20],
+                             [60, 60, 60], WM, gym.sets_main - 1, gym.sets_sec - 1)
+    cache = {}
+    pages = [plan_html(str(i), athlete_plan(gym, program.main[i], program.sec[i], program.deload[i]), cache=cache)
+             for i in range(3)]
+    assert pages == [plan_html(str(i), athlete_plan(gym, program.main[i], program.sec[i], program.deload[i]))
+                     for i in range(3)]
+    # Fewer tables rendered than shown
+    assert len(cache) < sum(p.count("<table") for p in pages)
+
+def test_unknown_format(roster, tmp_path):
+    with pytest.raises(ValueError):
+        export(roster, str(tmp_path / "plans.txt"), "txt", progress=False)
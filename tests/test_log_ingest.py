@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from log_ingest import RollingE1RM, normalize
+from one_rep_max import epley
+
+
+def random_log(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "lifter": rng.choice(["sara", "kim"], n),
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 200, n), unit="D"),
+        "exercise": rng.choice(["Back squat", "bench press", "Deadlift", "curl"], n),
+        "weight": rng.integers(20, 80, n) * 2.5,
+        "reps": rng.integers(1, 10, n),
+    })
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 500])
+def test_matches_a_full_rescan(chunk):
+    log = random_log(500)
+    # Chunks out of date order
+    rolling = RollingE1RM(window_days=28)
+    for start in range(0, len(log), chunk):
+        rolling.update(log.iloc[start:start + chunk])
+    assert rolling.rows == len(normalize(log))
+
+    df = normalize(log)
+    for (lifter, lift), rows in df.groupby(["lifter", "lift"]):
+        latest = rows["date"].max()
+        recent = rows[rows["date"] > latest - pd.Timedelta(days=28)]
+        assert rolling.best(lifter, lift) == pytest.approx(rows["e1rm"].max())
+        assert rolling.trailing(lifter, lift) == pytest.approx(recent["e1rm"].max())
+        # The kept rows decrease in e1RM as the dates go up
+        window = rolling._state[(lifter, lift)].window
+        assert all(a[0] <= b[0] and a[1] > b[1] for a, b in zip(window, window[1:]))
+
+
+def test_trailing_window_moves_on():
+    log = pd.DataFrame({
+        "lifter": "sara",
+        "date": ["2024-01-01", "2024-01-20", "2024-02-10"],
+        "exercise": "squat",
+        "weight": [120, 100, 90],
+        "reps": [1, 1, 1],
+    })
+    rolling = RollingE1RM(window_days=28).update(log)
+    assert rolling.trailing("sara", "squats") == pytest.approx(epley(100, 1))
+    assert rolling.trailing("sara", "squats", as_of="2024-03-01") == pytest.approx(epley(90, 1))
+    assert rolling.trailing("sara", "squats", as_of="2024-04-01") is None
+    assert rolling.best("sara", "squats") == pytest.approx(epley(120, 1))
+    with pytest.raises(ValueError):
+        rolling.trailing("sara", "squats", as_of="2024-01-01")
+    with pytest.raises(KeyError):
+        rolling.best("sara", "bench")
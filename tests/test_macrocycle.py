@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from config import load_model
+from macrocycle import MAX_BLOCKS, MacroPlan, PercentProgression, project
+from weight_calc import WeightManager
+from weight_engine import compute_program
+
+WM = "gym_calculation/params/weight_manager.json"
+
+
+@pytest.fixture
+def plan():
+    return MacroPlan(load_model(WM, WeightManager), [100, 80, 140], [20, 20, 60], blocks=8)
+
+
+def test_one_week_computes_one_block(plan):
+    block, week, p = plan.week(22)
+    assert (block, week) == (5, 2)
+    assert plan.computed == 1
+    # Projected with weight_increase per block, like the app's project()
+    wm = plan.weight_manager
+    assert plan.one_rm(5).tolist() == project([100, 80, 140], 5, wm).tolist()
+    expected = compute_program(wm, plan.one_rm(5), [20, 20, 60])
+    assert np.array_equal(p.main, expected.main)
+
+
+def test_retest_recomputes_only_later_blocks(plan):
+    dict(plan.programs())
+    assert plan.computed == 8
+    plan.retest(5, b=90)
+    programs = dict(plan.programs())
+    # Blocks 5, 6 and 7, the ones before come from the cache
+    assert plan.computed == 11
+    assert plan.one_rm(4)[1] == 80 + 4 * 2.5
+    assert plan.one_rm(5)[1] == 90
+    assert plan.one_rm(7)[1] == 95
+    assert programs[4] is plan.program(4)
+    assert plan.computed == 11
+
+
+def test_retest_at_the_projection_recomputes_nothing(plan):
+    dict(plan.programs())
+    plan.retest(3, s=float(plan.one_rm(3)[0]))
+    dict(plan.programs())
+    assert plan.computed == 8
+
+
+def test_clear_retest_and_progression(plan):
+    dict(plan.programs())
+    plan.retest(6, d=200)
+    dict(plan.programs())
+    plan.clear_retest(6)
+    dict(plan.programs())
+    # 6 and 7 for the retest, again for the clear
+    assert plan.computed == 12
+    assert plan.one_rm(6)[2] == 140 + 6 * 2.5
+    plan.set_progression(PercentProgression(0.05))
+    dict(plan.programs())
+    # Block 0 keeps its 1RMs
+    assert plan.computed == 19
+    assert plan.one_rm(1).tolist() == pytest.approx([105, 84, 147])
+
+
+def test_ranges(plan):
+    with pytest.raises(IndexError):
+        plan.week(plan.weeks)
+    with pytest.raises(IndexError):
+        plan.retest(8, s=100)
+    with pytest.raises(ValueError):
+        MacroPlan(plan.weight_manager, [100, 80, 140], [20, 20, 60], blocks=MAX_BLOCKS + 1)
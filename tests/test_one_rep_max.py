@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from one_rep_max import FORMULAS, Formula, epley, estimate, estimate_many
+
+
+def test_estimate_many_aggregates_formulas():
+    df = estimate_many([100, 80], [5, 3], formulas=["epley", "oconner"], agg=None)
+    assert list(df.columns) == ["epley", "oconner"]
+    mean = estimate_many([100, 80], [5, 3], formulas=["epley", "oconner"], agg="mean")
+    assert np.allclose(mean, df.mean(axis=1))
+
+
+def test_estimate_many_keeps_series_index():
+    weight = pd.Series([100.0, 80.0], index=[3, 7])
+    out = estimate_many(weight, [5, 3])
+    assert isinstance(out, pd.Series)
+    assert list(out.index) == [3, 7]
+
+
+def test_estimate_many_ignores_formulas_out_of_range():
+    # Brzycki is undefined from 37 reps, the others still count
+    out = estimate_many([50], [40], formulas=["epley", "brzycki"], agg="median")
+    assert np.allclose(out, estimate([50], [40], "epley"))
+    df = estimate_many([50], [40], formulas=["epley", "brzycki"], agg=None)
+    assert np.isnan(df["brzycki"].iloc[0])
+
+
+@pytest.mark.parametrize("weight, reps", [([-1], [5]), ([100], [0]), ([np.nan], [5]), ([100], [np.inf])])
+def test_estimate_many_rejects_invalid_sets(weight, reps):
+    with pytest.raises(ValueError, match="invalid for every formula"):
+        estimate_many(weight, reps)
+
+
+def test_estimate_many_rejects_sets_invalid_for_every_formula():
+    with pytest.raises(ValueError, match="1 set"):
+        estimate_many([50, 50], [5, 40], formulas=["brzycki"])
+
+
+def test_estimate_many_unknown_names():
+    with pytest.raises(ValueError, match="Unknown aggregation"):
+        estimate_many([100], [5], agg="mode")
+    with pytest.raises(ValueError, match="Unknown formula"):
+        estimate_many([100], [5], formulas=["nope"])
+
+
+def test_estimate_many_mixed_rep_limits(monkeypatch):
+    # Valid as long as one formula covers the reps
+    monkeypatch.setitem(FORMULAS, "e50", Formula(epley, max_reps=50))
+    monkeypatch.setitem(FORMULAS, "e10", Formula(epley, max_reps=10))
+    out = estimate_many([50, 100], [40, 5], formulas=["brzycki", "e50", "e10"])
+    assert np.allclose(out[0], epley(50, 40))
+    assert np.isfinite(out[1])
+    with pytest.raises(ValueError, match="1 set"):
+        estimate_many([50], [60], formulas=["brzycki", "e50", "e10"])
@@ -0,0 +1,57 @@
+import pytest
+from pydantic import ValidationError
+
+from plates import Loading, PlateInventory, PlateTable, plate_column
+
+FULL = PlateInventory(plates={20: 2, 15: 2, 10: 2, 5: 2, 2.5: 2, 1.25: 2})
+
+
+def plates(table, weights):
+    return [None if x is None else x.plates for x in table.sequence(weights)]
+
+
+def test_fewest_plates():
+    table = PlateTable(PlateInventory(plates={20: 4, 10: 4, 5: 4, 2.5: 4, 1.25: 4}))
+    assert table.lookup(20) == Loading(())
+    assert table.lookup(100).plates == (20, 20)
+    assert table.lookup(87.5).plates == (20, 10, 2.5, 1.25)
+    assert str(table.lookup(87.5)) == "20 + 10 + 2.5 + 1.25"
+    assert str(table.lookup(20)) == "bar"
+
+
+def test_limited_inventory():
+    # Only two 1.25 kg plates (one per side), and an odd 5 kg plate that is
+    # never used
+    table = PlateTable(PlateInventory(plates={5: 3, 1.25: 2}))
+    assert table.lookup(22.5).plates == (1.25,)
+    assert table.lookup(25) is None
+    assert table.lookup(32.5).plates == (5, 1.25)
+    assert table.lookup(35) is None
+    assert table.max_weight == 32.5
+
+
+def test_unreachable_weights():
+    table = PlateTable(FULL)
+    # Below the bar, off the plate grid, above everything loaded
+    for weight in (15, 21, table.max_weight + 2.5):
+        assert table.lookup(weight) is None
+        assert table.candidates(weight) == []
+    # An unreachable set starts over from an empty bar
+    assert plates(table, [40, 21, 40]) == [(10,), None, (10,)]
+    assert plate_column(table, [40, 21, ""]) == ["10", "n/a", ""]
+
+
+def test_fewer_changes_between_sets():
+    table = PlateTable(FULL)
+    # Alone, 70 kg is 20 + 5 (heavier plates first), after 40 kg (10 a
+    # side) 15 + 10 has as many plates and needs one change instead of three
+    assert table.lookup(70).plates == (20, 5)
+    assert plates(table, [40, 70]) == [(10,), (15, 10)]
+    assert plates(table, [70]) == [(20, 5)]
+
+
+def test_inventory_validation():
+    with pytest.raises(ValidationError):
+        PlateInventory(plates={-5: 2})
+    with pytest.raises(ValidationError):
+        PlateInventory(plates={5: -2})
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import sqlite3
+
+import pytest
+
+import profiles
+from profiles import ProfileStore
+
+
+@pytest.fixture
+def flaky():
+    # A store whose writes raise the errors in `errors` first, one per write
+    store = ProfileStore(":memory:", batch_secs=0.01)
+    write = store._write
+    errors = []
+
+    def flaky_write(rows):
+        if errors:
+            raise errors.pop(0)
+        write(rows)
+
+    store._write = flaky_write
+    return store, errors
+
+
+def test_failed_write_keeps_the_batch(flaky):
+    store, errors = flaky
+    errors.append(sqlite3.OperationalError("database is locked"))
+
+    async def run():
+        store.update("sara", rm1_s=100)
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+        assert store.errors == 1
+        assert store._pending == {"sara": {"rm1_s": 100}}
+        await store.flush()
+        assert store.writes == 1
+        assert store._read_all() == {"sara": {"rm1_s": 100}}
+        await store.close()
+    asyncio.run(run())
+
+
+def test_writer_backs_off_and_logs_once(flaky, monkeypatch, caplog):
+    store, errors = flaky
+    errors.extend(sqlite3.OperationalError("disk I/O error") for _ in range(4))
+    monkeypatch.setattr(profiles, "RETRY_MAX_SECS", 0.05)
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record(delay):
+        delays.append(delay)
+        await sleep(0)
+
+    async def run():
+        monkeypatch.setattr(asyncio, "sleep", record)
+        store.update("sara", rm1_s=100)
+        while not store.writes:
+            await sleep(0.001)
+        monkeypatch.setattr(asyncio, "sleep", sleep)
+        await store.close()
+
+    with caplog.at_level(logging.INFO, logger="profiles"):
+        asyncio.run(run())
+    assert store.errors == 4
+    # Doubled after every failure, capped at RETRY_MAX_SECS
+    assert delays == [0.01, 0.02, 0.04, 0.05, 0.05]
+    assert sum(r.exc_info is not None for r in caplog.records) == 1
+    assert [r.levelname for r in caplog.records] == ["ERROR", "WARNING", "WARNING", "WARNING", "INFO"]
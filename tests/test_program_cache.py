@@ -0,0 +1,60 @@
+import pytest
+
+from program_cache import CacheInfo, ProgramCache
+
+
+def test_hits_and_misses():
+    cache = ProgramCache(maxsize=2)
+    calls = []
+    for key in ("a", "b", "a", "a"):
+        assert cache.get_or_create(key, lambda: calls.append(key) or key.upper()) == key.upper()
+    assert calls == ["a", "b"]
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+
+
+def test_evicts_least_recently_used():
+    cache = ProgramCache(maxsize=2)
+    cache.get_or_create("a", lambda: 1)
+    cache.get_or_create("b", lambda: 2)
+    # "a" is now the most recently used, so "b" goes
+    cache.get_or_create("a", lambda: 0)
+    cache.get_or_create("c", lambda: 3)
+    assert cache.peek("b") is None
+    assert cache.peek("a") == 1
+    assert cache.peek("c") == 3
+    assert cache.info().currsize == 2
+
+
+def test_clear_resets_counts():
+    cache = ProgramCache(maxsize=2)
+    cache.get_or_create("a", lambda: 1)
+    cache.get_or_create("a", lambda: 1)
+    cache.clear()
+    assert cache.info() == CacheInfo(hits=0, misses=0, maxsize=2, currsize=0)
+
+
+def test_maxsize_at_least_one():
+    with pytest.raises(ValueError):
+        ProgramCache(maxsize=0)
+
+
+def test_peek_counts_hits_and_misses():
+    cache = ProgramCache(maxsize=2)
+    assert cache.peek("a") is None
+    cache.put("a", 1)
+    assert cache.peek("a") == 1
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_setup_weigth_calc_is_cached():
+    from app import setup_weigth_calc
+    from program_cache import weight_calc_cache
+
+    before = weight_calc_cache.info()
+    wc = setup_weigth_calc(s=100, b=80, d=140, s0=20, b0=20, d0=60)
+    assert setup_weigth_calc(s=100.0, b=80, d=140, s0=20, b0=20, d0=60) is wc
+    after = weight_calc_cache.info()
+    assert (after.hits, after.misses) == (before.hits + 1, before.misses + 1)
+    assert wc.get_weights("squats")[2][-2] == 90
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from config import load_model
+from roster import compute_roster, iter_roster, roster_frame
+from weight_calc import WeightCalc, WeightManager
+
+WM = "gym_calculation/params/weight_manager.json"
+
+
+@pytest.fixture(scope="module")
+def roster():
+    rng = np.random.default_rng(3)
+    n = 25
+    one_rm = rng.uniform(40, 250, (3, n)).round(1)
+    starting = rng.choice([20, 40, 60], (3, n))
+    return one_rm, starting
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 10_000])
+def test_matches_weight_calc_per_athlete(roster, chunk_size):
+    wm = load_model(WM, WeightManager)
+    (s, b, d), (s0, b0, d0) = roster
+    program = compute_roster(s, b, d, s0, b0, d0, wm, 3, 2, chunk_size=chunk_size)
+    assert len(program) == len(s)
+    for i in range(len(s)):
+        calc = WeightCalc(wm, s[i], b[i], d[i], s0[i], b0[i], d0[i], warmup_sets=3, warmup_sets_sec=2)
+        for j, lift in enumerate(calc.lifts):
+            assert program.main[i, j].tolist() == calc.weights[lift]
+            assert program.sec[i, j].tolist() == calc.weights_sec[lift]
+            assert program.deload[i, j].tolist() == calc.deload_weights[lift]
+
+
+def test_frame_rows_point_back_to_the_athlete(roster):
+    wm = load_model(WM, WeightManager)
+    (s, b, d), (s0, b0, d0) = roster
+    for offset, program in iter_roster(s, b, d, s0, b0, d0, wm, chunk_size=10):
+        frame = roster_frame(program, offset)
+        assert frame["athlete"].min() == offset
+        rows = frame[(frame["athlete"] == offset + 1) & (frame["lift"] == "deadlift")]
+        calc = WeightCalc(wm, s[offset + 1], b[offset + 1], d[offset + 1],
+                          s0[offset + 1], b0[offset + 1], d0[offset + 1])
+        assert rows[rows["part"] == "main"].query("week == 2")["weight"].tolist() == calc.weights["deadlift"][1]
+        assert rows[rows["part"] == "deload"]["weight"].tolist() == calc.deload_weights["deadlift"]
+
+
+def test_rejects_bad_rosters():
+    with pytest.raises(ValueError):
+        compute_roster([100, np.nan], [80, 80], [140, 140], [20, 20], [20, 20], [60, 60], WM)
+    with pytest.raises(ValueError):
+        compute_roster([100, 110], [80, 80], [140, 140], [20], [20], [60], WM)
+    assert len(compute_roster([], [], [], [], [], [], WM)) == 0
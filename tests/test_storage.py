@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+from config import load_model
+from create_schedule import ExerciseBucket, MonthlySchedule
+from roster import compute_roster, roster_frame
+from storage import TrainingStore
+from weight_calc import WeightManager
+
+WM = "gym_calculation/params/weight_manager.json"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TrainingStore(str(tmp_path / "training.db"), pool_size=2)
+    yield store
+    store.close()
+
+
+def test_athletes_are_reused(store):
+    ids = store.add_athletes(["sara", "kim"])
+    assert store.add_athletes(["kim", "alex", "sara"]) == [ids[1], ids[1] + 1, ids[0]]
+    assert store.athlete_id("kim") == ids[1]
+    assert store.athlete_id("nobody") is None
+
+
+def test_completed_sets_round_trip(store):
+    sara, kim = store.add_athletes(["sara", "kim"])
+    store.add_completed_sets([
+        (sara, "squats", datetime.date(2024, 1, 8), 5, 5, 100.0),
+        (sara, "squats", "2024-01-01", 5, 5, 97.5),
+        (sara, "bench", "2024-01-03", 3, 8, 60.0),
+        (kim, "squats", "2024-01-02", 5, 5, 120.0),
+    ])
+    history = store.history(sara)
+    assert history.values.tolist() == [
+        [sara, "bench", "2024-01-03", 3, 8, 60.0],
+        [sara, "squats", "2024-01-01", 5, 5, 97.5],
+        [sara, "squats", "2024-01-08", 5, 5, 100.0],
+    ]
+    assert store.history(sara, "squats", start="2024-01-02")["weight"].tolist() == [100.0]
+    assert store.history(sara, end=datetime.date(2024, 1, 2))["weight"].tolist() == [97.5]
+    assert store.history(kim, "bench").empty
+
+    store.add_one_rm_tests([(kim, "deadlift", "2024-01-05", 180)])
+    assert store.one_rm_history(kim).values.tolist() == [[kim, "deadlift", "2024-01-05", 180.0]]
+
+
+def test_failed_write_rolls_back(store):
+    sara, = store.add_athletes(["sara"])
+    with pytest.raises(Exception):
+        store.add_completed_sets([(sara, "squats", "2024-01-01", 5, 5, 100), (sara, "squats", "2024-01-02", 5, 5, None)])
+    assert store.history(sara).empty
+
+
+def test_planned_sets_round_trip(store):
+    wm = load_model(WM, WeightManager)
+    gym = MonthlySchedule(load_model("gym_calculation/params/exercises_acc.json", ExerciseBucket),
+                          load_model("gym_calculation/params/exercises_prehab.json", ExerciseBucket))
+    program = compute_roster([100, 140], [80, 60], [140, 180], [20, 20], [20, 20], [60, 60], wm,
+                             gym.sets_main - 1, gym.sets_sec - 1)
+    ids = store.add_athletes(["sara", "kim"])
+    assert store.add_planned_sets(ids, program, gym, "2024-01-01") == len(roster_frame(program))
+
+    frame = roster_frame(program)
+    expected = frame[(frame["athlete"] == 1) & (frame["lift"] == "bench")]
+    planned = store.planned(ids[1], "bench")
+    assert len(planned) == len(expected)
+    assert sorted(planned["weight"]) == sorted(expected["weight"])
+    assert set(planned["date"]) == {"2024-01-01", "2024-01-08", "2024-01-15", "2024-01-22"}
+    assert store.planned(ids[1], "bench", start="2024-01-22")["part"].unique().tolist() == ["deload"]
+
+
+@pytest.mark.parametrize("table,index", [
+    ("completed_sets", "ix_completed_sets"),
+    ("planned_sets", "ix_planned_sets"),
+    ("one_rm_tests", "ix_one_rm_tests"),
+])
+def test_reads_use_the_athlete_lift_date_index(store, table, index):
+    with store.pool.connection() as conn:
+        plan = conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {table} WHERE athlete_id = ? AND lift = ? AND date >= ? "
+            "ORDER BY lift, date", (1, "squats", "2024-01-01")).fetchall()
+    detail = " ".join(row[-1] for row in plan)
+    assert f"USING INDEX {index}" in detail
+    assert "TEMP B-TREE" not in detail
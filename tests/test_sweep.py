@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from config import load_model
+from sweep import compute_sweep
+from weight_calc import WeightManager
+from weight_engine import SEC_FACTOR, SEC_WORKING_FACTOR, compute_programs, round_to_increment
+
+WM = "gym_calculation/params/weight_manager.json"
+
+
+def brute_round(x: float, increment: float) -> float:
+    # Every multiple of the increment from ten below the nearest multiple of
+    # ten up past x, the nearest wins and ties go to the lower one
+    base = round(x, -1) - 10
+    candidates = [base + increment * k for k in range(int(30 / increment) + 2)]
+    return min(candidates, key=lambda c: (abs(c - x), c))
+
+
+def legacy_round(x: float, increment: float) -> float:
+    # The original WeightCalc._round_set: only ten candidates
+    base = round(x, -1) - 10
+    candidates = [base + increment * k for k in range(10)]
+    return min(candidates, key=lambda c: (abs(c - x), c))
+
+
+@pytest.mark.parametrize("increment", [1, 1.25, 2.5, 5])
+def test_rounding_matches_brute_force(increment):
+    x = np.round(np.random.default_rng(0).uniform(20, 300, 2000), 3)
+    got = round_to_increment(x, increment)
+    assert got.tolist() == [brute_round(v, increment) for v in x]
+
+
+def test_rounding_keeps_legacy_increments():
+    x = np.arange(20, 300, 0.05)
+    for increment in (2.5, 5):
+        assert round_to_increment(x, increment).tolist() == [legacy_round(v, increment) for v in x]
+
+
+def test_sweep_matches_brute_force():
+    wm = load_model(WM, WeightManager)
+    increments = (1.25, 2.5, 5)
+    s = compute_sweep(wm, {"squats": (100, 140), "bench": (60, 90), "deadlift": (120, 160)},
+                      increments=increments)
+    prc = {"squats": wm.prc_squats, "bench": wm.prc_bench, "deadlift": wm.prc_deadlift}
+    for n, inc in enumerate(increments):
+        for i, lift in enumerate(("squats", "bench", "deadlift")):
+            for p, rm in enumerate(s.one_rm[i]):
+                if np.isnan(rm):
+                    continue
+                for w, (pl, pw) in enumerate(zip(prc[lift], wm.prc_working)):
+                    top = brute_round(pl * rm, inc)
+                    working = brute_round(top * pw, inc)
+                    assert s.weights["top"][0, n, i, p, w] == top
+                    assert s.weights["working"][0, n, i, p, w] == working
+                    assert s.weights["top_sec"][0, n, i, p, w] == brute_round(top * SEC_FACTOR, inc)
+                    assert s.weights["working_sec"][0, n, i, p, w] == brute_round(working * SEC_WORKING_FACTOR, inc)
+                assert s.weights["deload"][0, n, i, p] == brute_round(wm.prc_deload * rm, inc)
+
+
+def test_sweep_small_increment_reaches_top_set():
+    wm = load_model(WM, WeightManager)
+    s = compute_sweep(wm, {"squats": (127.5, 127.5), "bench": (100, 100), "deadlift": (140, 140)},
+                      increments=(1.25,))
+    assert s.weights["top"][0, 0, 0, 0, 2] == 115.0
+
+
+@pytest.mark.parametrize("increment", [1.25, 2.5, 5])
+def test_sweep_matches_programs(increment):
+    # The sweep's weights are the ones the app prescribes for the same 1RMs
+    wm = load_model(WM, WeightManager)
+    s = compute_sweep(wm, {"squats": (100, 140), "bench": (60, 90), "deadlift": (120, 160)},
+                      increments=(increment,))
+    one_rm = s.one_rm.T
+    keep = ~np.isnan(one_rm).any(axis=1)
+    p = compute_programs(wm.model_copy(update={"weight_increase": increment}),
+                         one_rm[keep], np.full((int(keep.sum()), 3), 20.0))
+    for i in range(3):
+        assert np.array_equal(s.weights["top"][0, 0, i][keep], p.main[:, i, :, -2])
+        assert np.array_equal(s.weights["working"][0, 0, i][keep], p.main[:, i, :, -1])
+        assert np.array_equal(s.weights["top_sec"][0, 0, i][keep], p.sec[:, i, :, -2])
+        assert np.array_equal(s.weights["working_sec"][0, 0, i][keep], p.sec[:, i, :, -1])
+        assert np.array_equal(s.weights["deload"][0, 0, i][keep], p.deload[:, i, 1])
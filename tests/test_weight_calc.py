@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from weight_calc import WeightCalc
+from weight_engine import compute_programs
+
+WM = "gym_calculation/params/weight_manager.json"
+
+# Tables of the original, set by set WeightCalc for the same inputs
+BASELINE = {
+    (100, 80, 140, 20, 20, 60): {
+        "main": {
+            "squats": [[20, 40, 52.5, 70, 55], [20, 40, 60, 80, 67.5], [20, 42.5, 67.5, 90, 80]],
+            "bench": [[20, 30, 47.5, 67.5, 55], [20, 30, 50, 72.5, 62.5], [20, 30, 52.5, 77.5, 70]],
+            "deadlift": [[60, 77.5, 95, 112.5, 90], [60, 80, 102.5, 122.5, 105], [60, 85, 107.5, 132.5, 120]],
+        },
+        "sec": {
+            "squats": [[20, 40, 62.5, 52.5], [20, 45, 72.5, 65], [20, 50, 80, 77.5]],
+            "bench": [[20, 30, 60, 52.5], [20, 30, 65, 60], [20, 30, 70, 67.5]],
+            "deadlift": [[60, 80, 100, 87.5], [60, 85, 110, 102.5], [60, 90, 120, 117.5]],
+        },
+        "deload": {"squats": [20, 60], "bench": [20, 47.5], "deadlift": [40, 85]},
+    },
+    (142.5, 97.5, 182.5, 40, 20, 60): {
+        "main": {
+            "squats": [[40, 60, 80, 100, 80], [40, 65, 90, 115, 97.5], [40, 70, 97.5, 127.5, 115]],
+            "bench": [[20, 30, 55, 82.5, 65], [20, 30, 57.5, 87.5, 75], [20, 30, 62.5, 95, 85]],
+            "deadlift": [[60, 87.5, 117.5, 145, 115], [60, 92.5, 127.5, 160, 135], [60, 97.5, 135, 172.5, 155]],
+        },
+        "sec": {
+            "squats": [[40, 65, 90, 77.5], [40, 70, 102.5, 95], [40, 77.5, 115, 112.5]],
+            "bench": [[20, 30, 75, 62.5], [20, 30, 77.5, 72.5], [20, 30, 85, 82.5]],
+            "deadlift": [[60, 95, 130, 112.5], [60, 102.5, 145, 132.5], [60, 107.5, 155, 150]],
+        },
+        "deload": {"squats": [20, 85], "bench": [20, 57.5], "deadlift": [40, 110]},
+    },
+}
+
+
+@pytest.mark.parametrize("args", list(BASELINE))
+def test_weight_calc_matches_baseline(args):
+    w = WeightCalc(WM, *args)
+    expected = BASELINE[args]
+    for lift in w.lifts:
+        assert w.get_weights(lift) == expected["main"][lift]
+        assert w.get_weights(lift, main=False) == expected["sec"][lift]
+        assert w.deload_weights[lift] == expected["deload"][lift]
+
+
+def test_engine_matches_weight_calc_per_athlete():
+    args = list(BASELINE)
+    p = compute_programs(WeightCalc(WM, *args[0]).weight_manager,
+                         one_rm=[a[:3] for a in args], starting_weights=[a[3:] for a in args])
+    for n, a in enumerate(args):
+        for i, lift in enumerate(("squats", "bench", "deadlift")):
+            assert p.main[n, i].tolist() == BASELINE[a]["main"][lift]
+            assert p.sec[n, i].tolist() == BASELINE[a]["sec"][lift]
+            assert p.deload[n, i].tolist() == BASELINE[a]["deload"][lift]
+
+
+def test_round_set_ties_go_down():
+    w = WeightCalc(WM, *list(BASELINE)[0])
+    assert w._round_set(101.25) == 100
+    assert w._round_set(98.75) == 97.5
+    assert np.isclose(w._round_set(103.8), 105)